@@ -16,6 +16,19 @@ WORD_STYLE = False
 # This can be toggled in the GUI with "Toggle Speed Display"
 DISPLAY_SPEED_BAR = True
 
+# What the speed bar shows: "window" for speed and accuracy over the last
+# SPEED_WINDOW_WORDS words and SPEED_WINDOW_SECONDS seconds (None for no
+# limit), "decaying" for an average where words count half as much every 
+# SPEED_HALF_LIFE_SECONDS seconds, or "session" for the whole session.
+SPEED_METER = "window"
+SPEED_WINDOW_WORDS = 20
+SPEED_WINDOW_SECONDS = 60
+SPEED_HALF_LIFE_SECONDS = 20
+
+# Accuracy of the percentiles of time taken per word on the info panel.
+# Higher keeps more of each lesson's word times in memory.
+LATENCY_SKETCH_COMPRESSION = 100
+
 # Display info
 # This can be toggled in the GUI with "Toggle Info Display"
 DISPLAY_INFO_PANEL = True
@@ -55,4 +68,12 @@ HINT_OPTIONS="KeyHighlighting, ChordToTypeDisplay"
 """For lessons only"""
 # Force translation of lesson files to chords when Fly starts, even if 
 # translation files already exist (useful only if code has changed)
-FORCE_LESSON_REGENERATION = False
\ No newline at end of file
+FORCE_LESSON_REGENERATION = False
+
+# Most processes used to translate lesson files to chords. None uses one 
+# per CPU.
+LESSON_BUILD_PROCESSES = None
+
+# Seed for the words drawn by randomized lessons, so runs can be repeated,
+# e.g. for benchmarks. None seeds from the system.
+RANDOM_SEED = None
\ No newline at end of file
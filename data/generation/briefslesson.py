@@ -78,7 +78,7 @@ if __name__ == "__main__":
     output_file_chd = os.path.join(lessons_dir, "briefs.chd")
 
     dict_filepath = fileutils.get_plover_dict_path()
-    dictionary = dictionaryreader.load_dict(dict_filepath)
+    dictionary = dictionaryreader.load_plover_dict(dict_filepath)
 
     # Generate lessons/briefs.chd
     logger.info("Generating files: %s, %s..." % (output_file_les, 
@@ -86,12 +86,10 @@ def get_words_to_categorise(dictionary, word_list, category_dict):
 
     word_chord_holder_dict = {}
     for word in word_list:
-        first_try_handler = wordstochords.WordAsIs(inverse_dict)
-        second_try_handler = wordstochords.WordLowerCase(inverse_dict)
+        first_try_handler = wordstochords.WordAsIsOrLowerCase(inverse_dict)
         default_handler = wordstochords.WordUndefined(inverse_dict)
         
-        first_try_handler.successor = second_try_handler
-        second_try_handler.successor = default_handler
+        first_try_handler.successor = default_handler
 
         # Translate word--get all chords corresponding to word
         chord_holder = first_try_handler.handle(word)
@@ -169,7 +167,7 @@ def main():
     # Generate plover dict
     dict_filename = fileutils.get_plover_dict_path()
     print("Loading plover dict...")
-    dictionary = dictionaryreader.load_dict(dict_filename)
+    dictionary = dictionaryreader.load_plover_dict(dict_filename)
 
     # Get words from lessons
     lessons_dir = fileutils.get_lessons_directory()
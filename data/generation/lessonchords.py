@@ -0,0 +1,56 @@
+#!/usr/bin/python
+# Copyright (c) 2011 Pragma Nolint.
+# See LICENSE.txt for details.
+
+"""Command line script to bring the chords files of every lesson up to date.
+
+The game translates a lesson when it is first chosen, in its own process.
+This translates every lesson that is out of date at once, across a pool of
+processes, e.g. after changing plover's dictionary or many lessons.
+Call from the fly directory with the following command:
+    python -m data.generation.lessonchords
+"""
+
+import os
+import sys
+import time
+
+# Hack so that all modules can be imported from Fly,
+# but this can be called as a script
+sys.path.append(os.path.dirname(os.getcwd()))
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+from fly.utils import files as fileutils
+from fly.utils import dictionaryreader
+from fly.lessons.helpers.catalog import LessonCatalog
+from fly.lessons.helpers.tochords import LessonToChords
+
+
+def main():
+
+    """Load plover's dictionary and build the chords of every lesson.
+
+    Nothing else may run threads here, as the pool forks its processes.
+    """
+
+    dict_filename = fileutils.get_plover_dict_path()
+    print("Loading plover dict...")
+    dictionary = dictionaryreader.load_plover_dict(dict_filename)
+
+    lessons_dir = fileutils.get_lessons_directory()
+    lesson_paths = [lesson.file_path for lesson in
+                    LessonCatalog(lessons_dir).find_lessons()]
+    print("Building chords of %s lessons in %s..." % (len(lesson_paths),
+                                                     lessons_dir))
+
+    start = time.time()
+    chord_helper = LessonToChords(dictionary)
+    built = sum(1 for _ in chord_helper.build(lesson_paths))
+    print("%s lessons up to date in %.1f seconds." % (built,
+                                                     time.time() - start))
+
+
+if __name__ == '__main__':
+    main()
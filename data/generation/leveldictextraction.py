@@ -18,7 +18,6 @@ Call from main game directory to regenerate dictionaries:
 """
 
 import json
-import re
 
 import logging
 logging.basicConfig(level=logging.INFO)
@@ -26,6 +25,7 @@ logger = logging.getLogger(__name__)
 
 import fly.utils.files as fileutils
 import fly.utils.dictionaryreader as dictionaryreader
+from fly.translation import chordfeatures
 
 
 class LevelDictionaryCreator(object):
@@ -50,6 +50,7 @@ class LevelDictionaryCreator(object):
         """
 
         self.dictionary = dictionary
+        self.features = chordfeatures.get_feature_table(dictionary)
 
     def dump_dicts(self):
 
@@ -108,8 +109,7 @@ class LevelDictionaryCreator(object):
             level_dict[key] = value
         return level_dict        
 
-    @staticmethod
-    def get_level_four_dict(dictionary):
+    def get_level_four_dict(self, dictionary):
 
         """Generate fourth easiest dictionary. Two chords only, no numbers.
 
@@ -118,16 +118,9 @@ class LevelDictionaryCreator(object):
         @type dictionary: dict
         """
 
-        level_dict = {}
-        for key, value in dictionary.iteritems():
-            if len(re.sub('[\w*]', '', key)) > 1: 
-                continue
+        return self.filter_dict(dictionary, self.features.stroke_count <= 2)
 
-            level_dict[key] = value
-        return level_dict        
-
-    @staticmethod
-    def get_level_three_dict(dictionary):
+    def get_level_three_dict(self, dictionary):
 
         """Generate third easiest dictionary. One chord only, any length.
 
@@ -136,16 +129,9 @@ class LevelDictionaryCreator(object):
         @type dictionary: dict
         """
 
-        level_dict = {}
-        for key, value in dictionary.iteritems():
-            if key.find('/') != -1:
-                continue
-
-            level_dict[key] = value
-        return level_dict        
+        return self.filter_dict(dictionary, self.features.stroke_count == 1)
 
-    @staticmethod
-    def get_level_two_dict(dictionary):
+    def get_level_two_dict(self, dictionary):
 
         """Generate second easiest dictionary. 4 keys or less.
 
@@ -154,16 +140,9 @@ class LevelDictionaryCreator(object):
         @type dictionary: dict
         """
 
-        level_dict = {}
-        for key, value in dictionary.iteritems():
-            if len(key.lstrip('-')) > 4:
-                continue
+        return self.filter_dict(dictionary, self.features.key_count <= 4)
 
-            level_dict[key] = value
-        return level_dict        
-
-    @staticmethod
-    def get_level_one_dict(dictionary):
+    def get_level_one_dict(self, dictionary):
 
         """Generate easiest dictionary. 2 keys or less. 
 
@@ -172,13 +151,22 @@ class LevelDictionaryCreator(object):
         @type dictionary: dict
         """
 
-        level_dict = {}
-        for key, value in dictionary.iteritems():
-            if len(key.lstrip('-')) > 2:
-                continue
+        return self.filter_dict(dictionary, self.features.key_count <= 2)
 
-            level_dict[key] = value
-        return level_dict        
+    def filter_dict(self, dictionary, mask):
+
+        """Keep the entries whose chords are selected by mask.
+
+        @param dictionary: prefiltered dict with chords from self.dictionary
+        @param mask: feature table rows to keep, e.g. 
+                     C{self.features.stroke_count == 1}
+
+        @type dictionary: dict
+        @type mask: numpy array of bool
+        """
+
+        return dict((key, dictionary[key]) 
+                    for key in self.features.select(mask, dictionary.keys()))
 
 
 def dump(dictionary, filepath):
@@ -208,15 +196,11 @@ def writeFilteredDict(dictionary, dict_filepath):
     @type filepath: str
     """
 
-    new_dictionary = {}
-
-    for key, value in dictionary.iteritems():
-        # Chords containing numbers are currently not supported. When they 
-        # are, perhaps move this to Level 4 to introduce numbers earlier.
-        if re.search('\d', key) != None:
-            continue
-
-        new_dictionary[key] = value
+    # Chords containing numbers are currently not supported. When they 
+    # are, perhaps move this to Level 4 to introduce numbers earlier.
+    features = chordfeatures.get_feature_table(dictionary)
+    new_dictionary = dict((key, dictionary[key]) for key in 
+                          features.select(~features.number_bar))
         
     # Removing "he is" from dictionary since the two strokes are defined
     # separately ("he": "E", "is": "S"). They're an artifact from some 
@@ -234,7 +218,7 @@ if __name__ == "__main__":
     logger.info("Generating dictionaries...")
 
     dict_filepath = fileutils.get_plover_dict_path()
-    dictionary = dictionaryreader.load_dict(dict_filepath)
+    dictionary = dictionaryreader.load_plover_dict(dict_filepath)
 
     writeFilteredDict(dictionary, dict_filepath)
 
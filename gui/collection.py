@@ -3,6 +3,9 @@
 
 """Collect all elements to display on screen."""
 
+import pygame
+
+from fly.gui import constants
 from fly.gui.elements import infopanel
 from fly.gui.elements import keyboard
 from fly.gui.elements import optionspanel
@@ -40,16 +43,70 @@ class ElementsCollection(object):
                              self.text_input, self.options_panel,
                              self.info_panel, self.speed_bar]
 
+        # Draw state and screen area of each drawable as of the last frame,
+        # keyed by id. None until the first frame has been drawn.
+        self.drawn = None
+
     def draw(self, surface):
 
-        """Paint element on screen.
+        """Paint the parts of elements that changed since the last frame.
+
+        Each drawable whose draw state changed, appeared or disappeared marks
+        its old and new areas dirty. Each dirty area is cleared and everything
+        that overlaps it is drawn again, clipped to the area, in the usual
+        drawing order. The first frame paints the whole surface.
 
         @param surface: screen to draw on.
         @type surface: pygame.Surface
+
+        @return: areas of the surface that were painted
+        @rtype: list of pygame.Rect
         """
 
+        drawables = []
         for element in self.gui_elements:
-            element.draw(surface)
+            drawables.extend(element.get_drawables())
+
+        if self.drawn is None:
+            dirty_rects = [surface.get_rect()]
+        else:
+            dirty_rects = []
+            for drawable in drawables:
+                drawn = self.drawn.pop(id(drawable), None)
+                if drawn is None:
+                    dirty_rects.append(drawable.get_screen_rect())
+                elif drawn[1] != drawable.get_draw_state():
+                    dirty_rects.append(drawn[2])
+                    dirty_rects.append(drawable.get_screen_rect())
+            # Whatever is left is no longer drawn.
+            for drawable, state, rect in self.drawn.itervalues():
+                dirty_rects.append(rect)
+
+        # An area inside another dirty area is painted with it.
+        dirty_rects = [rect for i, rect in enumerate(dirty_rects)
+                       if not any(other.contains(rect) 
+                                  for other in dirty_rects[:i])]
+
+        for rect in dirty_rects:
+            surface.set_clip(rect)
+            surface.fill(constants.CANVAS_COLOR)
+            for drawable in drawables:
+                if drawable.get_screen_rect().colliderect(rect):
+                    drawable.blit_on(surface)
+        surface.set_clip(None)
+
+        # Drawing may update the state of a drawable, so record it after.
+        self.drawn = dict((id(drawable), (drawable, 
+                                          drawable.get_draw_state(),
+                                          drawable.get_screen_rect()))
+                          for drawable in drawables)
+        return dirty_rects
+
+    def redraw_all(self):
+
+        """Paint the whole screen on the next call to draw."""
+
+        self.drawn = None
 
     def on_mouse_motion(self, event):
 
@@ -161,6 +218,20 @@ class ElementsCollection(object):
         self.speed_bar.set_words_per_minute(words_per_minute)
         self.speed_bar.set_accuracy(fractional_accuracy)
 
+    def update_latencies(self, lesson_latencies, overall_latencies):
+
+        """Update display of percentiles of time taken per word.
+
+        @param lesson_latencies: seconds at p50, p90 and p99 on the lesson,
+                                 or None if no word has been typed
+        @param overall_latencies: the same over every lesson
+
+        @type lesson_latencies: tuple of float
+        @type overall_latencies: tuple of float
+        """
+
+        self.info_panel.set_latencies(lesson_latencies, overall_latencies)
+
     def toggle_text_field_style(self):
 
         """Toggle draw style of text field display and input. 
@@ -6,6 +6,8 @@
 import logging
 logger = logging.getLogger(__name__)
 
+import pygame
+
 from fly import __version__
 from fly import config
 
@@ -24,8 +26,13 @@ else:
         from fly.gui.color.classic import *
 
 
+# Posted by the options panel when the user chooses another lesson, with 
+# the lesson's nice name as lesson_name.
+LESSON_CHOSEN_EVENT = pygame.USEREVENT + 3
+
 SCREEN_WIDTH = 1024
 SCREEN_HEIGHT = 600
+MAX_FRAMES_PER_SECOND = 30
 MENU_BAR_WIDTH = 200
 
 # Word field
@@ -73,6 +80,7 @@ INFO_PANEL_CAPTION_HEIGHT = INFO_PANEL_HEIGHT-40
 # Misc
 SMALL_GAP = 8
 CAPTION_FONT_SIZE = 20
+TEXT_SURFACE_CACHE_SIZE = 512 # Rendered pieces of text kept for reuse
 CAPTION_SIZE = (TEXT_INPUT_WIDTH, 50)
 
 # Keyboard layout
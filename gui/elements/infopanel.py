@@ -42,13 +42,13 @@ class InfoPanelGUI(interface.GUIElementInterface):
                             text_color=c.INFO_PANEL_CAPTION_TEXT_COLOR, 
                             background_color=c.INFO_PANEL_BACKGROUND_COLOR)
 
-    def draw(self, surface):
+    def get_drawables(self):
 
-        """Draw info panel on screen."""
+        """Info panel and its text, if the panel is displayed."""
 
-        if self.display_panel:
-            self.option_panel.blit_on(surface)
-            self.info_caption.blit_on(surface)
+        if not self.display_panel:
+            return []
+        return [self.option_panel, self.info_caption]
 
     def toggle_info_panel(self):
 
@@ -67,4 +67,26 @@ class InfoPanelGUI(interface.GUIElementInterface):
         self.display_panel = True
         self.info_caption.set_text(new_text)
 
+    def set_latencies(self, lesson_latencies, overall_latencies):
+
+        """Show percentiles of time taken per word next to the panel title.
+
+        @param lesson_latencies: seconds at p50, p90 and p99 on the lesson,
+                                 or None if no word has been typed
+        @param overall_latencies: the same over every lesson
+
+        @type lesson_latencies: tuple of float
+        @type overall_latencies: tuple of float
+        """
+
+        self.option_panel.clear_text()
+        if overall_latencies is None:
+            return
+        self.option_panel.append_text(" - seconds per word p50/p90/p99: ")
+        if lesson_latencies is not None:
+            self.option_panel.append_text("lesson %.2f/%.2f/%.2f, " %
+                                          lesson_latencies)
+        self.option_panel.append_text("all %.2f/%.2f/%.2f" %
+                                      overall_latencies)
+
 
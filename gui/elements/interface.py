@@ -8,6 +8,19 @@ class GUIElementInterface(object):
 
     """Interface for GUI elements. Not all methods need be implemented."""
     
+    def get_drawables(self):
+
+        """The parts of the element currently shown, in drawing order.
+
+        Only these are drawn, and the screen is only repainted where they 
+        have changed since the last frame.
+
+        @return: drawable parts of element
+        @rtype: list of L{gui.genericelements.DrawableElementInterface}
+        """
+
+        return []
+
     def draw(self, surface):
 
         """Paint element on surface.
@@ -16,7 +29,8 @@ class GUIElementInterface(object):
         @type surface: pygame.Surface
         """
 
-        pass
+        for drawable in self.get_drawables():
+            drawable.blit_on(surface)
     
     def reset(self):
 
@@ -45,11 +45,17 @@ class Tinter(object):
         'Y': (115, 44, 174),
         '*': (100, 100, 100)}
 
+    # Tuple of qwerty letters to the tint map worked out for them.
+    tint_maps = {}
+
     @classmethod
     def get_tint_on_letters(cls, qwerty_letter_list):
 
         """Get the color each qwerty letter should be tinted.
 
+        Tints are worked out once per list of letters and shared, so the
+        dict returned must not be changed.
+
         @param qwerty_letter_list: list of keyboard letters for qwerty keyboard
         @type qwerty_letter_list: list of str
 
@@ -58,6 +64,18 @@ class Tinter(object):
                 green, blue where each is between 0 and 255)
         """
 
+        key = tuple(qwerty_letter_list)
+        tint_map = cls.tint_maps.get(key)
+        if tint_map is None:
+            tint_map = cls.__get_tint_on_letters(qwerty_letter_list)
+            cls.tint_maps[key] = tint_map
+        return tint_map
+
+    @classmethod
+    def __get_tint_on_letters(cls, qwerty_letter_list):
+
+        """Work out the tints for L{get_tint_on_letters}."""
+
         tint_map = {}
         qwerty_keys = ''.join(qwerty_letter_list)
         qwerty_key_groups = []
@@ -304,11 +322,10 @@ class KeyboardGUI(interface.GUIElementInterface):
             key.pressed = False
             self.previous_keys_pressed.remove(key)
 
-    def draw(self, surface):
+    def get_drawables(self):
 
-        """Draw keyboard on screen."""
+        """Keys of keyboard."""
 
-        for key in self.keys:
-            key.blit_on(surface)
+        return self.keys
 
 
@@ -3,6 +3,8 @@
 
 """Right-most panel in the game, displaying options that the user can click."""
 
+import pygame
+
 from fly.gui.elements import interface
 from fly.gui import constants as c
 from fly.gui import genericelements as gel
@@ -101,15 +103,13 @@ class OptionsPanelGUI(interface.GUIElementInterface):
 
         self.display_options_panel.act_on_hint_key_press()
     
-    def draw(self, surface):
+    def get_drawables(self):
 
-        """Draw captions for both panels and display them."""
+        """Captions for both panels, then the panels."""
 
-        self.menu_bar.blit_on(surface)
-        self.display_option_caption.blit_on(surface)
-        
-        self.game_options_panel.draw(surface)
-        self.display_options_panel.draw(surface)
+        return ([self.menu_bar, self.display_option_caption] +
+                self.game_options_panel.get_drawables() +
+                self.display_options_panel.get_drawables())
 
 
 class GameOptionsPanelGUI(interface.GUIElementInterface):
@@ -195,13 +195,19 @@ class GameOptionsPanelGUI(interface.GUIElementInterface):
 
     def __display_next_lesson_name(self):
 
-        """When '>' is clicked, the next lesson name is displayed."""
+        """When '>' is clicked, the next lesson name is displayed.
+        
+        The game is told about the lesson chosen with a 
+        LESSON_CHOSEN_EVENT.
+        """
 
         self.lesson_index += 1
         if self.lesson_index >= len(self.lesson_names):
             self.lesson_index = 0
         self.current_lesson_name = self.lesson_names[self.lesson_index]
         self.lesson_name_button.set_text(self.current_lesson_name)
+        pygame.event.post(pygame.event.Event(
+            c.LESSON_CHOSEN_EVENT, lesson_name=self.current_lesson_name))
     
     def __get_button_and_sub_button(self, display_slot, caption, 
                                     sub_button_caption="?", indent=False):
@@ -278,12 +284,11 @@ class GameOptionsPanelGUI(interface.GUIElementInterface):
                 button.onclick()
             button.pressed = False
     
-    def draw(self, surface):
+    def get_drawables(self):
 
-        """Draw game options panel on screen."""
+        """Buttons of game options panel."""
 
-        for button in self.buttons:
-            button.blit_on(surface)
+        return self.buttons
 
 
 class DisplayOptionsPanelGUI(interface.GUIElementInterface):
@@ -517,11 +522,10 @@ class DisplayOptionsPanelGUI(interface.GUIElementInterface):
                 self.text_to_type.set_chord_to_type_display(True)
             self.hints_on = True
 
-    def draw(self, surface):
+    def get_drawables(self):
 
-        """Draw display options panel on screen."""
+        """Buttons of display options panel."""
 
-        for button in self.buttons:
-            button.blit_on(surface)
+        return self.buttons
 
 
@@ -72,6 +72,7 @@ class SpeedBarGUI(interface.GUIElementInterface):
         @type words_per_minute: float
         """
 
+        self.speed_bar_underlay.clear_text()
         self.speed_bar_underlay.append_text(" wpm: %s, " 
                                             % int(round(words_per_minute, 0)))
         speed_bar_len_float = min(words_per_minute/c.SPEED_BAR_MAX_SPEED, 1)
@@ -105,14 +106,13 @@ class SpeedBarGUI(interface.GUIElementInterface):
         for speed_bar_block in self.speed_blocks:
             speed_bar_block.set_color(speed_bar_color)
     
-    def draw(self, surface):
+    def get_drawables(self):
 
-        """Draw speed bar on screen."""
+        """Speed bar and as many blocks of the stripe as the speed fills."""
 
-        if self.display_bar:
-            self.speed_bar_underlay.blit_on(surface)
-
-            for i in range(self.number_of_bars_to_display):
-                self.speed_blocks[i].blit_on(surface)
+        if not self.display_bar:
+            return []
+        return ([self.speed_bar_underlay] + 
+                self.speed_blocks[:self.number_of_bars_to_display])
 
 
@@ -140,15 +140,12 @@ class TextInputGUI(interface.GUIElementInterface):
         self.input_sentence.set_text("")
         self.sentence_info_caption.set_text("Input:")
 
-    def draw(self, surface):
+    def get_drawables(self):
 
-        """Draw GUI element on screen."""
+        """Captions of the current display style."""
 
         if self.word_style:
-            for caption in self.word_captions:
-                caption.blit_on(surface)
-        else:
-            for caption in self.sentence_captions:
-                caption.blit_on(surface)
+            return self.word_captions
+        return self.sentence_captions
 
 
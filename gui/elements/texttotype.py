@@ -167,15 +167,12 @@ class TextToTypeGUI(interface.GUIElementInterface):
         else:
             self.sentence_caption.set_text(translation)
 
-    def draw(self, surface):
+    def get_drawables(self):
 
-        """Display word to type on screen."""
+        """Captions of the current display style."""
 
         if self.word_style:
-            for caption in self.word_captions:
-                caption.blit_on(surface)
-        else:
-            for caption in self.sentence_captions:
-                caption.blit_on(surface)
+            return self.word_captions
+        return self.sentence_captions
 
 
@@ -6,11 +6,167 @@
 import pygame
 import logging
 logger = logging.getLogger(__name__)
+from collections import OrderedDict
 
 from fly import config
 from fly.gui import constants
 
 
+class FontRegistry(object):
+
+    """Fonts shared by all elements, loaded once per face and size."""
+
+    def __init__(self):
+        self.fonts = {}
+
+    def get_font(self, face, size):
+
+        """Return the font of the given face and size, loading it if needed.
+
+        @param face: path of font file, None for pygame's default font
+        @param size: height of font in pixels
+
+        @type face: str or None
+        @type size: int
+
+        @return: loaded font
+        @rtype: pygame.font.Font
+        """
+
+        key = (face, size)
+        font = self.fonts.get(key)
+        if font is None:
+            font = pygame.font.Font(face, size)
+            self.fonts[key] = font
+        return font
+
+    def clear(self):
+
+        """Forget all loaded fonts, needed after pygame.font is restarted."""
+
+        self.fonts.clear()
+
+
+class TextSurfaceCache(object):
+
+    """Least recently used cache of rendered text surfaces.
+
+    The returned surfaces are shared, so they must only be blitted from,
+    never drawn on.
+    """
+
+    def __init__(self, font_registry, 
+                 max_size=constants.TEXT_SURFACE_CACHE_SIZE, face=None):
+
+        """
+        @param font_registry: where fonts to render with come from
+        @param max_size: most surfaces to keep
+        @param face: path of font file, None for pygame's default font
+
+        @type font_registry: L{FontRegistry}
+        @type max_size: int
+        @type face: str or None
+        """
+
+        self.font_registry = font_registry
+        self.max_size = max_size
+        self.face = face
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text, size, color, antialias=True):
+
+        """Return text rendered in the given font size and colour.
+
+        @param text: text to render, on a single line
+        @param size: height of font in pixels
+        @param color: colour of text
+        @param antialias: whether to smooth the edges of characters
+
+        @type text: str
+        @type size: int
+        @type color: tuple (int, int, int) representing red,
+                     green, blue where each is between 0 and 255
+        @type antialias: bool
+
+        @return: rendered text
+        @rtype: pygame.Surface
+        """
+
+        key = (text, size, tuple(color), bool(antialias))
+        surface = self.surfaces.pop(key, None)
+        if surface is None:
+            self.misses += 1
+            font = self.font_registry.get_font(self.face, size)
+            surface = font.render(text, antialias, color)
+            if len(self.surfaces) >= self.max_size:
+                self.surfaces.popitem(last=False)
+        else:
+            self.hits += 1
+        self.surfaces[key] = surface
+        return surface
+
+    def get_hit_rate(self):
+
+        """Fraction of renders served from the cache.
+
+        @return: hits divided by lookups, 0 before any lookup
+        @rtype: float
+        """
+
+        lookups = self.hits + self.misses
+        if not lookups:
+            return 0.0
+        return float(self.hits)/lookups
+
+    def get_stats(self):
+
+        """Counters for tuning the cache size.
+
+        @return: hits, misses, hit_rate, size and max_size of the cache
+        @rtype: dict
+        """
+
+        return {"hits": self.hits, "misses": self.misses, 
+                "hit_rate": self.get_hit_rate(), 
+                "size": len(self.surfaces), "max_size": self.max_size}
+
+    def clear(self):
+
+        """Forget all rendered surfaces and reset the counters."""
+
+        self.surfaces.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+fonts = FontRegistry()
+text_surfaces = TextSurfaceCache(fonts)
+
+
+def render_text(text, size, color, antialias=True):
+
+    """Render text in pygame's default font through the shared cache.
+
+    @param text: text to render, on a single line
+    @param size: height of font in pixels
+    @param color: colour of text
+    @param antialias: whether to smooth the edges of characters
+
+    @type text: str
+    @type size: int
+    @type color: tuple (int, int, int) representing red,
+                 green, blue where each is between 0 and 255
+    @type antialias: bool
+
+    @return: rendered text, shared so do not draw on it
+    @rtype: pygame.Surface
+    """
+
+    return text_surfaces.render(text, size, color, antialias)
+
+
 class DrawableElementInterface(pygame.Surface):
 
     """Interface that all drawable elements must conform to."""
@@ -26,6 +182,29 @@ class DrawableElementInterface(pygame.Surface):
         raise NotImplementedError("Child classes should implement "
                                   "this method!")
 
+    def get_screen_rect(self):
+
+        """Area of the screen that the element covers when drawn.
+
+        @return: rectangle covered by element
+        @rtype: pygame.Rect
+        """
+
+        width, height = self.get_size()
+        return pygame.Rect(int(self.pos[0]), int(self.pos[1]), width, height)
+
+    def get_draw_state(self):
+
+        """Everything that decides how the element looks on screen.
+        
+        If this changes between two frames, the element must be redrawn.
+
+        @return: copy of the attributes of the element
+        @rtype: dict
+        """
+
+        return dict(self.__dict__)
+
 
 class Caption(DrawableElementInterface):
 
@@ -72,7 +251,6 @@ class Caption(DrawableElementInterface):
         """Draw element on screen."""
         
         self.fill(self.background_color)
-        font = pygame.font.Font(None, self.font_size)
         
         if self.display_text:
             line_number = 0
@@ -80,7 +258,7 @@ class Caption(DrawableElementInterface):
             # Handle multi-line text
             text_lines = self.text.split("\n")
             for line in text_lines:
-                text = font.render(line, 1, self.text_color)
+                text = render_text(line, self.font_size, self.text_color)
                 self.blit(text, (self.margin, self.margin)) 
                 line_number += 1
                 blit_here = (self.pos[0], self.pos[1] + \
@@ -88,6 +266,20 @@ class Caption(DrawableElementInterface):
                 surface.blit(self, blit_here)
                 self.fill(self.background_color)
 
+    def get_screen_rect(self):
+
+        """Area of the screen covered by all lines of the caption.
+
+        @return: rectangle covered by caption
+        @rtype: pygame.Rect
+        """
+
+        line_count = len(self.text.split("\n"))
+        return pygame.Rect(int(self.pos[0]), 
+                           int(self.pos[1] + self.font_size), 
+                           self.size[0],
+                           (line_count - 1)*self.font_size + self.size[1])
+
     def set_text(self, word):
 
         """Set text in caption to word.
@@ -207,9 +399,9 @@ class KeyboardKey(DrawableElementInterface):
             if self.pressed:
                 self.fill(self.pressed_color)
             
-        font = pygame.font.Font(None, int(self.font_size))
+        font_size = int(self.font_size)
         if self.caption and self.display_qwerty:
-            text = font.render(self.caption, 1, self.text_color)
+            text = render_text(self.caption, font_size, self.text_color)
             self.blit(text, (self.margin,self.margin))
        
         if self.steno_caption and self.display_steno:
@@ -222,7 +414,8 @@ class KeyboardKey(DrawableElementInterface):
                 self.steno_color = constants.HIGHLIGHTED_KEY_TEXT_COLOR
 
             # Render the steno label on the screen
-            steno_text = font.render(self.steno_caption, 1, self.steno_color)
+            steno_text = render_text(self.steno_caption, font_size, 
+                                     self.steno_color)
             self.blit(steno_text, 
                       (constants.KEY_WIDTH-self.font_size/2.0-self.margin, 
                        constants.KEY_WIDTH-self.font_size/2.0-self.margin))
@@ -333,17 +526,21 @@ class DisplayPanel(DrawableElementInterface):
 
         self.text += text
 
+    def clear_text(self):
+
+        """Remove text added to the panel label, leaving the caption."""
+
+        self.text = self.caption
+
     def blit_on(self, surface):
 
         """Draw panel on screen."""
 
         self.fill(self.color)
             
-        font = pygame.font.Font(None, 16)
-        text = font.render(self.text, 1, self.text_color)
+        text = render_text(self.text, 16, self.text_color)
         self.blit(text, (self.margin,self.margin))
         surface.blit(self, self.pos)
-        self.text = self.caption
 
 
 class SpeedBarBlock(DrawableElementInterface):
@@ -466,8 +663,7 @@ class Button(DrawableElementInterface):
             if self.active:
                 self.fill(self.active_color)
                 
-            font = pygame.font.Font(None, 16)
-            text = font.render(self.caption, 1, self.text_color)
+            text = render_text(self.caption, 16, self.text_color)
             self.blit(text, (self.margin,self.margin))
             surface.blit(self, self.pos)
 
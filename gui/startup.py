@@ -34,3 +34,12 @@ class StartupCaption(object):
         self.caption.blit_on(screen)
 
 
+
+    def get_screen_rect(self):
+
+        """Area of the screen covered by the caption.
+
+        @rtype: pygame.Rect
+        """
+
+        return self.caption.get_screen_rect()
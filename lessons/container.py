@@ -15,6 +15,11 @@ class Lesson(object):
         self.display_directive = None
 
         self.chords_list = []
+        # Words of the lesson file as translated to chords, None until the
+        # lesson file has been read.
+        self.token_list = None
+        # Compiled lesson the lists above are read from, once populated.
+        self.bundle = None
         self.translation_list = []
         self.chord_translation_dict = {}
         self.sentences_list = []
@@ -41,6 +46,22 @@ class Lesson(object):
                      self.sentences_list, self.chord_sentences_list, 
                      self.sentence_map)
 
+    def find_sentence(self, word_index):
+
+        """Return the number of the sentence the word belongs to, or None.
+
+        @param word_index: index of word in lesson
+        @type word_index: int
+
+        @rtype: int
+        """
+
+        if self.bundle is not None:
+            return self.bundle.sentence_map.find_sentence(word_index)
+        for sentence_ind, word_inds in self.sentence_map.iteritems():
+            if word_index in word_inds:
+                return sentence_ind
+
     def __eq__(self, other):
         return self.name == other or self.nice_name == other
 
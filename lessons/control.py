@@ -3,75 +3,217 @@
 
 """
 The lessons directory contains lesson files (extension .les) and chord files
-(extension .chd). Chord files are generated if they don't exist. Lesson files
-are plain text files with directive in first line. See file 
-HOW_TO_ADD_LESSONS in data/lessons for more info.
+(extension .chd). Chord files are generated if they don't exist or are out
+of date. Lesson files are plain text files with directive in first line. See
+file HOW_TO_ADD_LESSONS in data/lessons for more info.
+
+Lessons are listed from a catalog, and only read and translated when they
+are chosen. A lesson chosen while another is in use is prepared in the
+background, so the lesson in use can be typed until the new one is ready.
+The lesson after the one chosen is prepared in the background too, as it
+is likely to be chosen next. The last few lessons prepared are kept warm so
+that switching back to them is instant.
 """
 
-from fly.lessons.helpers.finder import LessonFinder
+import threading
+import collections
+
+from fly.lessons.helpers.catalog import LessonCatalog
 from fly.lessons.helpers.tochords import LessonToChords
-from fly.lessons.helpers.directive import DirectiveInterpreter
 from fly.lessons.helpers.filler import LessonFiller
 from fly.lessons.helpers.mapper import LessonWordChooserMapper
+from fly.models.keyhighlighting import KeyHighlighter
 from fly.utils import files as fileutils
 
+import logging
+logger = logging.getLogger(__name__)
+
 
 class LessonControl(object):
 
     """Deals with reading lesson from text file and translating."""
 
-    def __init__(self, dictionary):
+    # Most lessons kept prepared, besides the one in use.
+    WARM_LESSON_COUNT = 4
+
+    def __init__(self, dictionary=None, progress_store=None, 
+                 difficulty_weights=None):
         
         """
+        Lessons are found straight away from the catalog, so their names 
+        are known. Without a dictionary, they are only ready to use once 
+        L{set_dictionary} has been called, which may be done in the 
+        background with L{prepare_lessons}.
+
         @param dictionary: plover keystroke to translation dict
+        @param progress_store: where word choosers carry on from and 
+                               record the user's progress, if anywhere
+        @param difficulty_weights: how hard the user finds each chord, see
+                                   L{statistics.summary}
+
         @type dictionary: dict
+        @type progress_store: L{statistics.progress.ProgressStore}
+        @type difficulty_weights: dict of str: float
         """
 
         self.current_lesson = None
-        self.dir_helper = LessonFinder(fileutils.get_lessons_directory())
-        self.chord_helper = LessonToChords(dictionary)
+        self.progress_store = progress_store
+        self.catalog = LessonCatalog(fileutils.get_lessons_directory())
+        self.chord_helper = None
         self.populate_helper = LessonFiller()
-        self.word_chooser_helper = LessonWordChooserMapper()
+        self.word_chooser_helper = LessonWordChooserMapper(difficulty_weights)
+        self.key_highlighter = KeyHighlighter()
+
+        # Only one lesson is prepared at a time, whether chosen or 
+        # prefetched, as they share the translator and the manifests.
+        self.prepare_lock = threading.RLock()
+        self.prefetcher = None
+        self.warm_lessons = collections.OrderedDict()
+
+        # Lesson last chosen with choose_lesson, the thread preparing it,
+        # and the lesson and its word chooser once ready, or the error if
+        # it failed. The lesson in use only changes when its word chooser 
+        # is taken.
+        self.choice_lock = threading.Lock()
+        self.chosen_name = None
+        self.chooser = None
+        self.chosen_lesson = None
+        self.chosen_word_chooser = None
+        self.choice_error = None
         
-        self.lesson_list = self.dir_helper.find_lessons()
-        for lesson in self.lesson_list:
-            self.__add_directives_to_lesson_obj(lesson)
-            self.__add_chords_to_lesson(lesson.file_path, lesson)
+        self.lesson_list = self.catalog.find_lessons()
+        if dictionary is not None:
+            self.set_dictionary(dictionary)
+            self.prepare_lessons()
+
+    def set_dictionary(self, dictionary):
+
+        """Index the dictionary that chords for lessons are generated from.
+
+        @param dictionary: plover keystroke to translation dict
+        @type dictionary: dict
+        """
+
+        self.chord_helper = LessonToChords(dictionary)
+
+    def prepare_lessons(self, first_lesson_name=None, progress=None):
+
+        """Prepare the lesson the user will start with.
+
+        Other lessons are prepared when they are chosen, see 
+        L{get_word_chooser}.
+
+        @param first_lesson_name: lesson to prepare, e.g. the one the user 
+                                  will start with. Can be name or nice name.
+                                  By default the first lesson.
+        @param progress: called with the number of lessons prepared so far
+                         and the number of lessons to prepare.
+
+        @type first_lesson_name: str
+        @type progress: function of (int, int)
+        """
 
-    def __add_directives_to_lesson_obj(self, lesson):
+        first_lesson = self.get_lesson(first_lesson_name)
+        if first_lesson is None and self.lesson_list:
+            first_lesson = self.lesson_list[0]
+        if first_lesson is not None:
+            self.prepare_lesson(first_lesson)
+        if progress is not None:
+            progress(1, 1)
 
-        """Read directives from lesson file and add to lesson object.
+    def prepare_lesson(self, lesson):
 
-        Directives are specified at the top of the lesson file and contain
-        information about how the lesson should be presented.
+        """Read/generate the chords of a lesson and read its bundle.
 
-        @param lesson: lesson object to add directives to
+        Records the lesson's directives in the catalog. Does nothing if the
+        lesson has been prepared already, apart from keeping it warm.
+
+        @param lesson: lesson to prepare
         @type lesson: L{lessons.container.Lesson}
         """
 
-        first_line = ""
-        with open(lesson.file_path) as f:
-            first_line = f.readline().strip()
-        interpreter = DirectiveInterpreter(first_line)
-        lesson.retrieval_directive = interpreter.get_retrieval_directive()
-        lesson.display_directive = interpreter.get_display_directive()
+        with self.prepare_lock:
+            if lesson.bundle is None:
+                lesson.chords_file_path = \
+                    self.chord_helper.get_chords_file_path(lesson.file_path)
+                self.populate_helper.populate_lesson(lesson)
+                self.catalog.record(lesson)
+                self.catalog.save()
+            self.__keep_warm(lesson)
 
-    def __add_chords_to_lesson(self, lesson_path, lesson):    
+    def __keep_warm(self, lesson):
 
-        """Generate/read the steno chords that correspond to the lesson.
-        
-        If the chords file exists, use that. Otherwise generate one. Add
-        the chords file path to the lesson.
-        
-        @param lesson_path: path to lesson file.
-        @param lesson: lesson object to add chords to.
-        
-        @type lesson_path: str
+        """Mark lesson as the most recently used, and release the least
+        recently used lessons beyond L{WARM_LESSON_COUNT}.
+
+        Word choosers read their lesson as they go, e.g. the sentences of
+        an in order lesson, so lessons with a word chooser in use or 
+        waiting to be taken are never released.
+
+        @param lesson: lesson just prepared or chosen
         @type lesson: L{lessons.container.Lesson}
         """
-        
-        chords_file_path = self.chord_helper.get_chords_file_path(lesson_path)
-        lesson.chords_file_path = chords_file_path
+
+        with self.choice_lock:
+            in_use = (self.current_lesson, self.chosen_lesson, lesson)
+        self.warm_lessons.pop(lesson.name, None)
+        self.warm_lessons[lesson.name] = lesson
+        for name, warm_lesson in self.warm_lessons.items():
+            if len(self.warm_lessons) <= self.WARM_LESSON_COUNT:
+                break
+            if any(warm_lesson is used for used in in_use):
+                continue
+            del self.warm_lessons[name]
+            self.populate_helper.release_lesson(warm_lesson)
+
+    def is_lesson_ready(self, name):
+
+        """Whether the lesson has been prepared and can be used.
+
+        @param name: lesson name or nice name
+        @type name: str
+
+        @rtype: bool
+        """
+
+        lesson = self.get_lesson(name)
+        return lesson is not None and lesson.bundle is not None
+
+    def prefetch_after(self, lesson):
+
+        """Prepare the lesson after lesson given in the background.
+
+        @param lesson: lesson chosen
+        @type lesson: L{lessons.container.Lesson}
+        """
+
+        following = [other is lesson for other in self.lesson_list[:-1]]
+        if True not in following:
+            return
+        next_lesson = self.lesson_list[following.index(True) + 1]
+        if next_lesson.bundle is not None:
+            return
+
+        self.prefetcher = threading.Thread(target=self.__prefetch, 
+                                           args=(next_lesson,),
+                                           name="LessonPrefetcher")
+        self.prefetcher.daemon = True
+        self.prefetcher.start()
+
+    def __prefetch(self, lesson):
+
+        """Prepare a lesson on the prefetch thread.
+
+        Failing is not fatal, as the lesson is prepared again if chosen.
+
+        @param lesson: lesson to prepare
+        @type lesson: L{lessons.container.Lesson}
+        """
+
+        try:
+            self.prepare_lesson(lesson)
+        except Exception:
+            logger.exception("Could not prefetch %s" % lesson.name)
 
     def get_lesson_names(self):
 
@@ -101,6 +243,12 @@ class LessonControl(object):
         
         For example, if the lesson has retrieval directive "randomize", get
         a word chooser that will present lesson content in a random order.
+        The lesson is prepared first if it has not been already, and the 
+        lesson after it is prefetched. The word chooser carries on from the
+        progress the user made on the lesson before.
+
+        The lesson becomes the lesson in use, so call this on the thread 
+        that uses the word chooser.
 
         @param lesson_name: lesson name to get chooser for. Can be name
                             or nice name.
@@ -108,13 +256,142 @@ class LessonControl(object):
         """
 
         lesson = self.get_lesson(lesson_name)
-        if self.current_lesson == lesson:
+        if lesson is None or self.chord_helper is None:
             return 
 
-        self.populate_helper.populate_lesson(lesson)
+        with self.prepare_lock:
+            if self.current_lesson is lesson:
+                return
+            word_chooser = self.__make_word_chooser(lesson)
+            with self.choice_lock:
+                self.current_lesson = lesson
+        self.prefetch_after(lesson)
+
+        return word_chooser
+
+    def __make_word_chooser(self, lesson):
+
+        """Prepare the lesson and make a word chooser for it.
+
+        The word chooser carries on from the progress on the lesson. Must
+        be called with L{prepare_lock} held.
+
+        @param lesson: lesson to make word chooser for
+        @type lesson: L{lessons.container.Lesson}
+
+        @rtype: class implementing L{models.wordchooser.interface}
+        """
+
+        self.prepare_lesson(lesson)
+        self.key_highlighter.precompute(lesson.chord_translation_dict.keys())
         word_chooser = self.word_chooser_helper.get_word_chooser(lesson)
-        self.current_lesson = lesson
+        if self.progress_store is not None:
+            word_chooser.set_progress(
+                self.progress_store.get_lesson_progress(lesson.name))
+        return word_chooser
+
+    def choose_lesson(self, lesson_name, on_ready=None):
+
+        """Get a word chooser for the lesson in the background.
+
+        Returns straight away, so the lesson in use can still be typed. 
+        Once the word chooser is ready, it can be taken with 
+        L{take_word_chooser}. If another lesson is chosen before then, 
+        only the word chooser of the last lesson chosen is kept.
+
+        @param lesson_name: lesson name or nice name
+        @param on_ready: called on the background thread when the word 
+                         chooser is ready, or preparing the lesson failed,
+                         e.g. to wake up the main loop
+
+        @type lesson_name: str
+        @type on_ready: function
+        """
+
+        with self.choice_lock:
+            self.chosen_name = lesson_name
+            self.chosen_lesson = None
+            self.chosen_word_chooser = None
+            self.choice_error = None
+        self.chooser = threading.Thread(target=self.__choose,
+                                        args=(lesson_name, on_ready),
+                                        name="LessonChooser")
+        self.chooser.daemon = True
+        self.chooser.start()
+
+    def __choose(self, lesson_name, on_ready):
+
+        """Get a word chooser for the lesson on the chooser thread.
+
+        Does nothing if another lesson has been chosen since, as only the 
+        last one matters, or if the lesson is the one in use. Failing is 
+        logged and kept for L{raise_choice_error}, and the lesson in use 
+        stays.
+
+        @param lesson_name: lesson name or nice name
+        @param on_ready: called when the word chooser is ready or failing
+                         has been recorded, or None
+
+        @type lesson_name: str
+        @type on_ready: function
+        """
+
+        lesson = self.get_lesson(lesson_name)
+        if lesson is None or self.chord_helper is None:
+            return
+
+        try:
+            with self.prepare_lock:
+                if lesson_name != self.chosen_name or \
+                   lesson is self.current_lesson:
+                    return
+                word_chooser = self.__make_word_chooser(lesson)
+                with self.choice_lock:
+                    if lesson_name != self.chosen_name:
+                        return
+                    self.chosen_lesson = lesson
+                    self.chosen_word_chooser = word_chooser
+        except Exception as e:
+            logger.exception("Could not prepare %s" % lesson_name)
+            with self.choice_lock:
+                if lesson_name != self.chosen_name:
+                    return
+                self.choice_error = e
+        else:
+            self.prefetch_after(lesson)
 
+        if on_ready is not None:
+            on_ready()
+
+    def take_word_chooser(self):
+
+        """Take the word chooser of the lesson last chosen, if it is ready.
+
+        Its lesson becomes the lesson in use, so call this on the thread 
+        that uses the word chooser.
+
+        @return: word chooser, or None if not ready or already taken
+        @rtype: class implementing L{models.wordchooser.interface}
+        """
+
+        with self.choice_lock:
+            word_chooser = self.chosen_word_chooser
+            if word_chooser is not None:
+                self.current_lesson = self.chosen_lesson
+            self.chosen_lesson = None
+            self.chosen_word_chooser = None
         return word_chooser
 
-        
+    def raise_choice_error(self):
+
+        """Raise the error that stopped the lesson last chosen from being 
+        prepared, if any, in the caller.
+
+        For when no other lesson is in use to carry on with, e.g. the 
+        lesson the user starts with.
+        """
+
+        with self.choice_lock:
+            error = self.choice_error
+        if error is not None:
+            raise error
@@ -0,0 +1,463 @@
+# Copyright (c) 2011 Pragma Nolint.
+# See LICENSE.txt for details.
+
+"""
+Compiled lesson bundles, which hold a lesson and its chords in one file.
+
+A bundle is compiled from a lesson file and its chords file the first time
+the lesson is used, and stored next to them with extension .lsb. It is
+compiled again if either file changes. Each distinct string is stored once.
+Chords, words and sentences are arrays of string numbers, so a bundle is
+memory mapped and read in place: opening one takes the same time for a
+book as for a few words, and only the parts that are used are read.
+
+Layout, all numbers little-endian:
+    - header, see L{HEADER}
+    - string offsets, string count + 1 uint32s into the blob
+    - arrays of uint32 string numbers, in the order of L{ARRAYS}
+    - sentence starts, sentence map count + 1 uint32s into translations
+    - chord table slots, uint32s of unique chord index + 1, 0 when empty
+    - blob of the strings
+"""
+
+import os
+import mmap
+import zlib
+import struct
+import collections
+
+from fly.lessons.helpers import parser
+from fly.lessons.helpers import tochords
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+BUNDLE_FILE_EXTENSION = '.lsb'
+
+MAGIC = 'FLYLSB\0\0'
+VERSION = 1
+
+# Arrays of string numbers in a bundle, in the order they are stored.
+ARRAYS = ('chords', 'tokens', 'translations', 'sentences', 'chord_sentences',
+          'unique_chords', 'unique_translations')
+
+# Magic, version, size and modification time of lesson file and of chords
+# file, string number of the directive line, string count, length of each
+# array, sentence map count and chord table slot count.
+HEADER = struct.Struct('<8sIQdQdII%dIII' % len(ARRAYS))
+
+UINT32 = struct.Struct('<I')
+UINT32_PAIR = struct.Struct('<II')
+
+# At most this share of chord table slots are used.
+LOAD_FACTOR = 0.5
+
+
+def get_bundle_path(lesson_path):
+
+    """Return the file path to the bundle of a lesson.
+
+    @param lesson_path: file path to lesson
+    @type lesson_path: str
+
+    @rtype: str
+    """
+
+    return '%s%s' % (os.path.splitext(lesson_path)[0], BUNDLE_FILE_EXTENSION)
+
+
+def open_bundle(lesson_path, chords_path):
+
+    """Open the bundle of a lesson, compiling it if it is missing or stale.
+
+    If the bundle cannot be stored, it is kept in memory instead.
+
+    @param lesson_path: file path to lesson
+    @param chords_path: file path to chords file of lesson
+
+    @type lesson_path: str
+    @type chords_path: str
+
+    @rtype: L{LessonBundle}
+    """
+
+    bundle_path = get_bundle_path(lesson_path)
+    fingerprint = get_fingerprint(lesson_path, chords_path)
+    if os.path.exists(bundle_path):
+        try:
+            bundle = LessonBundle.from_file(bundle_path)
+        except (ValueError, struct.error, EnvironmentError) as e:
+            logger.warning("Ignoring unreadable bundle %s: %s" %
+                           (bundle_path, e))
+        else:
+            if bundle.fingerprint == fingerprint:
+                return bundle
+            bundle.close()
+
+    content = compile_bundle(lesson_path, chords_path, fingerprint)
+    try:
+        tochords.write_atomically(bundle_path, content)
+    except (IOError, OSError) as e:
+        logger.warning("Could not store bundle %s: %s" % (bundle_path, e))
+        return LessonBundle(content)
+    logger.info("Compiled %s" % bundle_path)
+    return LessonBundle.from_file(bundle_path)
+
+
+def get_fingerprint(lesson_path, chords_path):
+
+    """Return size and modification time of the lesson and chords files.
+
+    @param lesson_path: file path to lesson
+    @param chords_path: file path to chords file of lesson
+
+    @type lesson_path: str
+    @type chords_path: str
+
+    @rtype: tuple of (int, float, int, float)
+    """
+
+    lesson_stat = os.stat(lesson_path)
+    chords_stat = os.stat(chords_path)
+    return (lesson_stat.st_size, lesson_stat.st_mtime,
+            chords_stat.st_size, chords_stat.st_mtime)
+
+
+def compile_bundle(lesson_path, chords_path, fingerprint):
+
+    """Read a lesson and its chords and lay them out as a bundle.
+
+    @param lesson_path: file path to lesson
+    @param chords_path: file path to chords file of lesson
+    @param fingerprint: see L{get_fingerprint}
+
+    @type lesson_path: str
+    @type chords_path: str
+    @type fingerprint: tuple
+
+    @return: contents of bundle file
+    @rtype: str
+    """
+
+    text = parser.parse_lesson_file(lesson_path)
+    chord_sentences, chords = parser.parse_chords_file(chords_path)
+
+    # Each chord translates to the last token it lines up with, in the order
+    # chords first appear.
+    translation_for_chord = {}
+    unique_chords = []
+    for chord, token in zip(chords, text.token_list):
+        if chord not in translation_for_chord:
+            unique_chords.append(chord)
+        translation_for_chord[chord] = token
+    unique_translations = [translation_for_chord[chord]
+                           for chord in unique_chords]
+
+    strings = []
+    string_numbers = {}
+    def number_of(string):
+        number = string_numbers.get(string)
+        if number is None:
+            number = string_numbers[string] = len(strings)
+            strings.append(string)
+        return number
+
+    directive_number = number_of(text.directive_line)
+    arrays = {'chords': chords, 'tokens': text.token_list,
+              'translations': text.translation_list,
+              'sentences': text.sentences_list,
+              'chord_sentences': chord_sentences,
+              'unique_chords': unique_chords,
+              'unique_translations': unique_translations}
+    arrays = [[number_of(string) for string in arrays[name]] 
+              for name in ARRAYS]
+
+    sentence_starts = []
+    for sentence_number in xrange(len(text.sentence_map)):
+        sentence_starts.append(text.sentence_map[sentence_number][0])
+    sentence_starts.append(len(text.translation_list))
+
+    slot_count = 1
+    while slot_count*LOAD_FACTOR < len(unique_chords):
+        slot_count *= 2
+    slots = [0]*slot_count
+    for index, chord in enumerate(unique_chords):
+        slot = get_slot(chord, slot_count)
+        while slots[slot]:
+            slot = (slot + 1) % slot_count
+        slots[slot] = index + 1
+
+    string_offsets = [0]
+    for string in strings:
+        string_offsets.append(string_offsets[-1] + len(string))
+
+    parts = [HEADER.pack(MAGIC, VERSION, *(fingerprint +
+                         (directive_number, len(strings)) +
+                         tuple(len(array) for array in arrays) +
+                         (len(sentence_starts) - 1, slot_count)))]
+    for numbers in [string_offsets] + arrays + [sentence_starts, slots]:
+        parts.append(struct.pack('<%dI' % len(numbers), *numbers))
+    parts.extend(strings)
+    return ''.join(parts)
+
+
+def get_slot(chord, slot_count):
+
+    """Return the chord table slot to start looking for chord at.
+
+    @param chord: steno chord
+    @param slot_count: slots in the table, a power of two
+
+    @type chord: str
+    @type slot_count: int
+
+    @rtype: int
+    """
+
+    if isinstance(chord, unicode):
+        chord = chord.encode('utf-8')
+    return (zlib.crc32(chord) & 0xffffffff) & (slot_count - 1)
+
+
+class LessonBundle(object):
+
+    """A compiled lesson, read in place.
+
+    Attributes, read lazily from the bundle:
+        - directive_line: first line of lesson file
+        - chords: every chord, as L{lessons.container.Lesson.chords_list}
+        - tokens: word each chord was translated from
+        - translations: displayed words, as
+          L{lessons.container.Lesson.translation_list}
+        - sentences, chord_sentences: sentences of lesson and chords files
+        - sentence_map: L{SentenceMap} of sentence number to word indices
+        - chord_translations: L{ChordTranslations} of chord to translation
+    """
+
+    def __init__(self, data, file_handle=None):
+
+        """
+        @param data: contents of bundle file
+        @param file_handle: file data was mapped from, closed with bundle
+
+        @type data: str or mmap
+        @type file_handle: file
+        """
+
+        self.data = data
+        self.file_handle = file_handle
+
+        header = HEADER.unpack_from(data)
+        magic, version = header[:2]
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a lesson bundle of version %d" % VERSION)
+        self.fingerprint = header[2:6]
+        directive_number, string_count = header[6:8]
+        array_lengths = header[8:8 + len(ARRAYS)]
+        sentence_count, slot_count = header[8 + len(ARRAYS):]
+
+        offset = HEADER.size
+        self.string_offsets = offset
+        offset += 4*(string_count + 1)
+        arrays = {}
+        for name, length in zip(ARRAYS, array_lengths):
+            arrays[name] = StringArray(self, offset, length)
+            offset += 4*length
+        sentence_starts = offset
+        offset += 4*(sentence_count + 1)
+        slots = offset
+        offset += 4*slot_count
+        self.blob = offset
+        if len(data) < self.blob + self.get_number(self.string_offsets +
+                                                   4*string_count):
+            raise ValueError("Lesson bundle is truncated")
+
+        self.directive_line = self.get_string(directive_number)
+        self.chords = arrays['chords']
+        self.tokens = arrays['tokens']
+        self.translations = arrays['translations']
+        self.sentences = arrays['sentences']
+        self.chord_sentences = arrays['chord_sentences']
+        self.sentence_map = SentenceMap(self, sentence_starts, sentence_count)
+        self.chord_translations = ChordTranslations(
+            self, arrays['unique_chords'], arrays['unique_translations'],
+            slots, slot_count)
+
+    @classmethod
+    def from_file(cls, bundle_path):
+
+        """Memory map the bundle file.
+
+        @param bundle_path: file path to bundle
+        @type bundle_path: str
+
+        @rtype: L{LessonBundle}
+        """
+
+        f = open(bundle_path, 'rb')
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return cls(data, f)
+        except Exception:
+            f.close()
+            raise
+
+    def get_number(self, offset):
+
+        """Return the uint32 at offset."""
+
+        return UINT32.unpack_from(self.data, offset)[0]
+
+    def get_string(self, number):
+
+        """Return the string with the number given."""
+
+        start, end = UINT32_PAIR.unpack_from(self.data,
+                                             self.string_offsets + 4*number)
+        return self.data[self.blob + start:self.blob + end]
+
+    def close(self):
+        if self.file_handle is not None:
+            self.data.close()
+            self.file_handle.close()
+            self.file_handle = None
+
+
+class StringArray(collections.Sequence):
+
+    """Read-only list of strings stored in a bundle as string numbers."""
+
+    def __init__(self, bundle, offset, length):
+        self.bundle = bundle
+        self.offset = offset
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in xrange(*index.indices(self.length))]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("Bundle array index out of range")
+        bundle = self.bundle
+        return bundle.get_string(bundle.get_number(self.offset + 4*index))
+
+    def __eq__(self, other):
+        if not isinstance(other, collections.Sequence):
+            return NotImplemented
+        return len(self) == len(other) and list(self) == list(other)
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+
+    def __repr__(self):
+        return 'StringArray(%d strings)' % self.length
+
+
+class SentenceMap(collections.Mapping):
+
+    """Read-only map of sentence number to the indices of its words."""
+
+    def __init__(self, bundle, offset, sentence_count):
+        self.bundle = bundle
+        self.offset = offset
+        self.sentence_count = sentence_count
+
+    def __len__(self):
+        return self.sentence_count
+
+    def __iter__(self):
+        return iter(xrange(self.sentence_count))
+
+    def __getitem__(self, sentence_number):
+        if not 0 <= sentence_number < self.sentence_count:
+            raise KeyError(sentence_number)
+        start, end = UINT32_PAIR.unpack_from(self.bundle.data,
+                                             self.offset + 4*sentence_number)
+        return range(start, end)
+
+    def find_sentence(self, word_index):
+
+        """Return the number of the sentence with the word, or None.
+
+        @param word_index: index of word in translations
+        @type word_index: int
+
+        @rtype: int
+        """
+
+        low, high = 0, self.sentence_count
+        get_number = self.bundle.get_number
+        while low < high:
+            middle = (low + high)//2
+            if get_number(self.offset + 4*(middle + 1)) <= word_index:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.sentence_count and \
+           get_number(self.offset + 4*low) <= word_index:
+            return low
+        return None
+
+
+class ChordTranslations(collections.Mapping):
+
+    """Read-only map of each chord in a bundle to its translation.
+
+    Chords are found through a hash table, so lookups take the same time
+    however long the lesson is.
+    """
+
+    def __init__(self, bundle, chords, translations, offset, slot_count):
+        self.bundle = bundle
+        self.chords = chords
+        self.translations = translations
+        self.offset = offset
+        self.slot_count = slot_count
+
+    def __len__(self):
+        return len(self.chords)
+
+    def __iter__(self):
+        return iter(self.chords)
+
+    def keys(self):
+
+        """Return the chords, without copying them.
+
+        @rtype: L{StringArray}
+        """
+
+        return self.chords
+
+    def __contains__(self, chord):
+        return self.__find(chord) is not None
+
+    def __getitem__(self, chord):
+        index = self.__find(chord)
+        if index is None:
+            raise KeyError(chord)
+        return self.translations[index]
+
+    def __find(self, chord):
+
+        """Return the index of chord in self.chords, or None."""
+
+        if not self.chords:
+            return None
+        get_number = self.bundle.get_number
+        slot = get_slot(chord, self.slot_count)
+        while True:
+            entry = get_number(self.offset + 4*slot)
+            if not entry:
+                return None
+            if self.chords[entry - 1] == chord:
+                return entry - 1
+            slot = (slot + 1) % self.slot_count
@@ -0,0 +1,138 @@
+# Copyright (c) 2011 Pragma Nolint.
+# See LICENSE.txt for details.
+
+"""
+Catalog of the lessons in a directory, so they are known without reading
+them.
+
+The catalog is stored in the lessons directory. For each lesson file it
+records the lesson's name and nice name, the size and modification time of
+the file, and the directives found in it the last time it was used. Only
+the directory listing and the size and modification time of each file are
+read at startup.
+"""
+
+import os
+import json
+
+from fly.lessons import container
+from fly.lessons.helpers.finder import LessonFinder
+from fly.lessons.helpers import tochords
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class LessonCatalog(object):
+
+    """Lessons found in a directory, with what is known about each."""
+
+    FILE_NAME = 'catalog.json'
+    VERSION = 1
+
+    def __init__(self, lessons_dir):
+
+        """
+        @param lessons_dir: file path for lessons directory
+        @type lessons_dir: str
+        """
+
+        self.lessons_dir = lessons_dir
+        self.file_path = os.path.join(lessons_dir, self.FILE_NAME)
+        self.finder = LessonFinder(lessons_dir)
+        self.entries = self.__read()
+        self.changed = False
+
+    def __read(self):
+
+        """Read the catalog, or start afresh if it is missing or invalid.
+
+        @return: entry of each lesson, by lesson file name
+        @rtype: dict
+        """
+
+        if not os.path.exists(self.file_path):
+            return {}
+        try:
+            with open(self.file_path) as f:
+                catalog = json.load(f)
+        except (IOError, ValueError) as e:
+            logger.warning("Ignoring unreadable %s: %s" % (self.file_path, e))
+            return {}
+        if catalog.get('version') != self.VERSION:
+            return {}
+        return catalog.get('lessons', {})
+
+    def find_lessons(self):
+
+        """Return a lesson object for each lesson file in the directory.
+
+        Lessons whose file has not changed since it was last used get their
+        directives from the catalog. Others get theirs when they are used.
+
+        @return: lessons, sorted by file name
+        @rtype: list of L{lessons.container.Lesson}
+        """
+
+        lesson_list = []
+        for file_name in sorted(self.finder.get_file_list()):
+            file_path = os.path.join(self.lessons_dir, file_name)
+            entry = self.entries.get(file_name)
+            if entry is None or entry['stat'] != get_stat(file_path):
+                name = os.path.splitext(file_name)[0]
+                lesson_list.append(container.Lesson(
+                    name, self.finder.get_nice_name(name), file_path))
+                continue
+
+            lesson = container.Lesson(entry['name'], entry['nice_name'],
+                                      file_path)
+            lesson.retrieval_directive = entry['retrieval_directive']
+            lesson.display_directive = entry['display_directive']
+            lesson_list.append(lesson)
+        return lesson_list
+
+    def record(self, lesson):
+
+        """Record what is known about a lesson that has been used.
+
+        @param lesson: lesson with its directives read
+        @type lesson: L{lessons.container.Lesson}
+        """
+
+        entry = {'name': lesson.name, 'nice_name': lesson.nice_name,
+                 'stat': get_stat(lesson.file_path),
+                 'retrieval_directive': lesson.retrieval_directive,
+                 'display_directive': lesson.display_directive}
+        file_name = os.path.basename(lesson.file_path)
+        if self.entries.get(file_name) != entry:
+            self.entries[file_name] = entry
+            self.changed = True
+
+    def save(self):
+
+        """Write the catalog, if it changed."""
+
+        if not self.changed:
+            return
+        catalog = {'version': self.VERSION, 'lessons': self.entries}
+        try:
+            tochords.write_atomically(self.file_path, json.dumps(catalog))
+        except (IOError, OSError) as e:
+            logger.warning("Could not write %s: %s" % (self.file_path, e))
+            return
+        self.changed = False
+
+
+def get_stat(file_path):
+
+    """Return size and modification time of a file.
+
+    @param file_path: path to file
+    @type file_path: str
+
+    @return: as a list, as read back from the catalog
+    @rtype: list of (int, float)
+    """
+
+    stat = os.stat(file_path)
+    return [stat.st_size, stat.st_mtime]
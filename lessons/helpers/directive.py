@@ -40,6 +40,8 @@ class DirectiveInterpreter(object):
     DEFAULT_DIRECTIVES = [DEFAULT_RETRIEVAL_DIRECTIVE, 
                           DEFAULT_DISPLAY_DIRECTIVE]
 
+    DIRECTIVE_PATTERN = re.compile("<(.*)>")
+
     def __init__(self, first_line_in_lesson):       
 
         """Find directives in first line of lesson, or fall back to defaults.
@@ -55,7 +57,7 @@ class DirectiveInterpreter(object):
             self.__set_default_directives()
             return
         
-        directiveMatch = re.search("<(.*)>", first_line_in_lesson)
+        directiveMatch = self.DIRECTIVE_PATTERN.search(first_line_in_lesson)
         if not directiveMatch:
             self.__set_default_directives()
             return
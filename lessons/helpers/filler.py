@@ -3,42 +3,69 @@
 
 """Populates lesson object by reading lesson files and interpreting data."""
 
-import re
 import logging
 logger = logging.getLogger(__name__)
 
-from fly.translation import wordstochords
+from fly.lessons.helpers import parser
+from fly.lessons.helpers import bundle
+from fly.lessons.helpers.directive import DirectiveInterpreter
 
 
 class LessonFiller(object):
 
-    """Reads lesson and chords file and populates lesson with information."""
+    """Reads lesson and chords file and populates lesson with information.
+
+    The files are compiled into a bundle which the lesson reads in place,
+    see L{lessons.helpers.bundle}.
+    """
 
     def populate_lesson(self, lesson):
 
-        """Read the files belonging to the lesson to populate the lesson.
+        """Open the bundle of the lesson's files to populate the lesson.
 
         @param lesson: lesson object to populate.
         @type lesson: L{lessons.container.Lesson}
         """
 
-        # Read lesson and chords file to get lists of content, store on lesson
-        translation_sentence_list = self.get_sentences_list(lesson.file_path)
-        lesson.sentences_list = translation_sentence_list
+        lesson_bundle = bundle.open_bundle(lesson.file_path, 
+                                           lesson.chords_file_path)
+        lesson.bundle = lesson_bundle
+
+        interpreter = DirectiveInterpreter(lesson_bundle.directive_line)
+        lesson.retrieval_directive = interpreter.get_retrieval_directive()
+        lesson.display_directive = interpreter.get_display_directive()
+
+        # The translation list has punctuation split out as well, and the 
+        # map tells us which sentence each chord belongs to.
+        lesson.sentences_list = lesson_bundle.sentences
+        lesson.chord_sentences_list = lesson_bundle.chord_sentences
+        lesson.chords_list = lesson_bundle.chords
+        lesson.token_list = lesson_bundle.tokens
+        lesson.translation_list = lesson_bundle.translations
+        lesson.sentence_map = lesson_bundle.sentence_map
+        
+        # For convenience, map from chord to translation.
+        lesson.chord_translation_dict = lesson_bundle.chord_translations
 
-        chord_sentence_list = self.get_sentences_list(lesson.chords_file_path)
-        lesson.chord_sentences_list = chord_sentence_list
+    def release_lesson(self, lesson):
 
-        chords_list = self.get_chords_list(lesson)
-        lesson.chords_list = chords_list
+        """Let go of what the lesson read from its bundle.
 
-        # Generate a translation list, which has punctuation split out as well,
-        # and a map so we know which sentence each chord belongs to.
-        lesson.translation_list, lesson.sentence_map =\
-            self.generate_translation_for_sentences(translation_sentence_list)
-        
-        # For convenience, map from chord to translation.
-        lesson.chord_translation_dict = self.get_translation_dict(lesson)
+        The bundle is closed once nothing else refers to it, e.g. word
+        choosers made from the lesson. The lesson can be populated again.
+
+        @param lesson: lesson object populated before
+        @type lesson: L{lessons.container.Lesson}
+        """
+
+        lesson.bundle = None
+        lesson.sentences_list = []
+        lesson.chord_sentences_list = []
+        lesson.chords_list = []
+        lesson.token_list = None
+        lesson.translation_list = []
+        lesson.sentence_map = {}
+        lesson.chord_translation_dict = {}
 
     @staticmethod
     def get_chords_list(lesson):
@@ -52,11 +79,7 @@ class LessonFiller(object):
         @rtype: list of str
         """
         
-        with open(lesson.chords_file_path) as f:
-            chords_list = f.read().split()
-            chords_list = [s.strip() for s in chords_list]
-
-        return chords_list
+        return parser.parse_chords_file(lesson.chords_file_path)[1]
 
     @staticmethod
     def get_sentences_list(file_path):
@@ -73,22 +96,10 @@ class LessonFiller(object):
         @rtype: list of str
         """
 
-        sentence_list = []
-
-        with open(file_path) as f:
-            split_list = f.read().split('\n')
-
-        for line in split_list:
-            if line.find("<") != -1 or line.find(">") != -1:
-                continue
-            if line == "":
-                continue
-
-            sentence_list.append(line)
-        return sentence_list
+        return parser.parse_lesson_file(file_path).sentences_list
 
-    @classmethod
-    def generate_translation_for_sentences(cls, translation_sentence_list):
+    @staticmethod
+    def generate_translation_for_sentences(translation_sentence_list):
 
         """Generate a list of chords and a map from sentence to chord.
 
@@ -102,55 +113,10 @@ class LessonFiller(object):
         @rtype: tuple (list of string, dict of int: list of int.)
         """
 
-        final_translations_list = []
-        sentence_map = {}
-        total_word_count = 0
-        i = 0
-
+        text = parser.LessonText()
         for sentence in translation_sentence_list:
-            word_count = 0
-            translation_list = cls.get_translations_from_sentence(sentence)
-
-            for word in translation_list:
-                split_words = re.split("([-.,?!:;\"])", word)
-                words_and_punctuation = [w for w in split_words if w is not ""]
-                final_translations_list.extend(words_and_punctuation)
-                word_count += len(words_and_punctuation)
-                total_word_count += len(words_and_punctuation)
-
-            if word_count == 0:
-                continue
-
-            word_indices = cls.generate_word_indices(word_count, 
-                                                     total_word_count)
-            sentence_map[i] = word_indices
-            i += 1
-
-        return final_translations_list, sentence_map
-
-    @staticmethod
-    def get_translations_from_sentence(sentence):
-
-        """Split sentence into words and reject directives.
-
-        @param sentence: translated sentence to split
-        @type sentence: str
-
-        @return: list of words in sentence, with punctuation still attached.
-        @rtype: list of str
-        """
-
-        translation_list = sentence.split()
-        valid_translation_list = []
-        for t in translation_list:
-            # Directives are not allowed
-            if t.find("<") != -1 or t.find(">") != -1:
-                continue
-
-            t = t.lower().strip()
-            valid_translation_list.append(t)
-
-        return valid_translation_list
+            parser.add_sentence_translations(text, sentence)
+        return text.translation_list, text.sentence_map
 
     @staticmethod
     def generate_word_indices(word_count, total_word_count):
@@ -168,15 +134,7 @@ class LessonFiller(object):
         @rtype: list of int
         """
 
-        end = total_word_count - 1
-        start = total_word_count - word_count
-        index = start
-        word_indices = []
-        while index <= end:
-            word_indices.append(index)
-            index += 1
-
-        return word_indices
+        return range(total_word_count - word_count, total_word_count)
 
     @staticmethod
     def get_translation_dict(lesson):
@@ -190,18 +148,7 @@ class LessonFiller(object):
         @rtype: dict of str: str 
         """
 
-        word_getter = wordstochords.WordToChordTranslator.yield_word
-        translation_list = []
-        
-        with open(lesson.file_path) as f:
-            data = f.readlines()
-            for line in data:
-                for word in word_getter(line):
-                    translation_list.append(word)
-
-        chord_translation_dict = {}
-        for chord, translation in zip(lesson.chords_list, translation_list):
-            chord_translation_dict[chord] = translation
-        return chord_translation_dict
-
-
+        token_list = lesson.token_list
+        if token_list is None:
+            token_list = parser.parse_lesson_file(lesson.file_path).token_list
+        return dict(zip(lesson.chords_list, token_list))
@@ -22,6 +22,17 @@ class LessonWordChooserMapper(object):
 
     """Maps lesson to word chooser based on information in lesson object."""
 
+    def __init__(self, difficulty_weights=None):
+
+        """
+        @param difficulty_weights: how hard the user finds each chord, so
+                                   that randomized lessons bring up hard 
+                                   chords more often
+        @type difficulty_weights: dict of str: float
+        """
+
+        self.difficulty_weights = difficulty_weights
+
     # Map retrieval directives to word choosers.
     RETRIEVAL_MAP = {DirectiveInterpreter.RETRIEVAL_RANDOMIZED_DIRECTIVE:\
                      randomized.RetrieveRandomized,
@@ -57,6 +68,10 @@ class LessonWordChooserMapper(object):
             else:
                 return inorder.RetrieveInOrderSentence(lesson)
 
-        return self.RETRIEVAL_MAP[retrieval_directive]\
-                                (lesson.chord_translation_dict, 
-                                 lesson.chords_list)
+        word_chooser_class = self.RETRIEVAL_MAP[retrieval_directive]
+        if word_chooser_class is randomized.RetrieveRandomized:
+            return word_chooser_class(lesson.chord_translation_dict,
+                                      lesson.chords_list,
+                                      weights=self.difficulty_weights)
+        return word_chooser_class(lesson.chord_translation_dict, 
+                                  lesson.chords_list)
@@ -0,0 +1,135 @@
+# Copyright (c) 2011 Pragma Nolint.
+# See LICENSE.txt for details.
+
+"""
+Read lesson and chords files in a single pass each.
+
+Everything the game needs from a lesson file, its directive, sentences,
+words to display and words that were translated to chords, is collected
+while going through the file line by line. The chords file is read the same
+way, and its chords line up with the words that were translated.
+"""
+
+import re
+
+from fly.translation import wordstochords
+
+# Lines and words containing either of these are directives, not content.
+DIRECTIVE_MARK_PATTERN = re.compile('[<>]')
+
+# Punctuation that is displayed as a word of its own.
+PUNCTUATION_PATTERN = re.compile('([-.,?!:;"])')
+
+
+class LessonText(object):
+
+    """What a lesson file contains.
+
+    Attributes:
+        - directive_line: first line of the file, stripped
+        - sentences_list: lines of the file that are not directives or empty
+        - translation_list: lower case words of the sentences, with
+          punctuation split out, as displayed
+        - sentence_map: sentence number to the indices in translation_list
+          of its words
+        - token_list: words as they were translated to chords, one for each
+          chord in the chords file
+    """
+
+    def __init__(self):
+        self.directive_line = ""
+        self.sentences_list = []
+        self.translation_list = []
+        self.sentence_map = {}
+        self.token_list = []
+
+
+def parse_lesson_file(file_path):
+
+    """Read a lesson file once and collect what it contains.
+
+    @param file_path: path to lesson file
+    @type file_path: str
+
+    @rtype: L{LessonText}
+    """
+
+    with open(file_path) as f:
+        return parse_lesson_lines(f)
+
+
+def parse_lesson_lines(lines):
+
+    """Collect what a lesson contains from its lines, in one pass.
+
+    @param lines: lines of lesson file, e.g. the open file
+    @type lines: iterable of str
+
+    @rtype: L{LessonText}
+    """
+
+    text = LessonText()
+    yield_word = wordstochords.WordToChordTranslator.yield_word
+
+    for line_number, line in enumerate(lines):
+        if line_number == 0:
+            text.directive_line = line.strip()
+        text.token_list.extend(yield_word(line))
+
+        sentence = line.rstrip('\n')
+        if sentence == "" or DIRECTIVE_MARK_PATTERN.search(sentence):
+            continue
+        text.sentences_list.append(sentence)
+        add_sentence_translations(text, sentence)
+
+    return text
+
+
+def add_sentence_translations(text, sentence):
+
+    """Add the displayed words of sentence and map the sentence to them.
+
+    Sentences without words are not mapped, so later sentences take their
+    number.
+
+    @param text: lesson text collected so far
+    @param sentence: sentence from lesson file
+
+    @type text: L{LessonText}
+    @type sentence: str
+    """
+
+    start = len(text.translation_list)
+    for word in sentence.split():
+        # Directives are not allowed
+        if DIRECTIVE_MARK_PATTERN.search(word):
+            continue
+        split_words = PUNCTUATION_PATTERN.split(word.lower())
+        text.translation_list.extend(w for w in split_words if w)
+
+    end = len(text.translation_list)
+    if end > start:
+        text.sentence_map[len(text.sentence_map)] = range(start, end)
+
+
+def parse_chords_file(file_path):
+
+    """Read a chords file once and collect its sentences and chords.
+
+    @param file_path: path to chords file
+    @type file_path: str
+
+    @return: sentences of chords, and every chord in order
+    @rtype: tuple of (list of str, list of str)
+    """
+
+    chord_sentences_list = []
+    chords_list = []
+    with open(file_path) as f:
+        for line in f:
+            chords_list.extend(line.split())
+            sentence = line.rstrip('\n')
+            if sentence == "" or DIRECTIVE_MARK_PATTERN.search(sentence):
+                continue
+            chord_sentences_list.append(sentence)
+    return chord_sentences_list, chords_list
@@ -1,13 +1,43 @@
 # Copyright (c) 2011 Pragma Nolint.
 # See LICENSE.txt for details.
 
-"""Translate lesson file (plain text english) to steno chords file."""
+"""
+Translate lesson file (plain text english) to steno chords file.
+
+Chords files are only regenerated when they would change. For each lesson,
+a manifest in the lessons directory records a hash of the lesson text and
+the english words in the dictionary that its chords were taken from, with
+a hash of their entries. A lesson is regenerated if its text changed or if
+the dictionary entry of any of its words changed. Lessons to regenerate
+are translated across a pool of processes.
+
+Python forks the processes of a pool, which is only safe while no other
+threads run: a lock held by another thread at the fork stays held in the
+child. So the pool is only used when building from a single thread, e.g.
+when rebuilding every lesson offline, and lessons built while the game
+runs are translated in its own process. Each worker loads the dictionary
+itself, from its compiled file if it has one, rather than inheriting it.
+"""
 
 import os
+import json
+import hashlib
+import tempfile
+import threading
+import multiprocessing
 
 from fly import config
+from fly.plover.dictionary import compiled
 from fly.translation import wordstochords
 
+import logging
+logger = logging.getLogger(__name__)
+
+# Translator of each worker process in the pool, and the dictionary hash
+# it records in manifests.
+_worker_translator = None
+_worker_dictionary_hash = None
+
 
 class LessonToChords(object):
 
@@ -15,45 +45,368 @@ class LessonToChords(object):
 
     CHORDS_FILE_EXTENSION = '.chd'
 
-    def __init__(self, dictionary): 
+    def __init__(self, dictionary, processes=None):
 
         """
         @param dictionary: plover keystroke to translation dict
+        @param processes: most processes to translate lessons with, by
+                          default config.LESSON_BUILD_PROCESSES
+
         @type dictionary: dict
+        @type processes: int
         """
 
+        self.dictionary = dictionary
         self.translator = wordstochords.WordToChordTranslator(dictionary)
+        if processes is None:
+            processes = config.LESSON_BUILD_PROCESSES
+        self.processes = processes
+
+        # Each lesson has its own source hash, but if the dictionary has
+        # one too, a lesson built from the same dictionary is up to date
+        # without checking its words.
+        self.dictionary_hash = None
+        source_hash = getattr(dictionary, 'source_hash', None)
+        if source_hash and source_hash != compiled.NO_SOURCE_HASH:
+            self.dictionary_hash = source_hash.encode('hex')
 
     def get_chords_file_path(self, lesson_file_path):
-        
+
         """Read or create chords file and return path to file.
-        
+
         @param lesson_file_path: file path to lesson to read/create chords for.
         @type lesson_file_path: str
         """
 
-        chords_file_path = '%s%s' % (os.path.splitext(lesson_file_path)[0], 
-                                     self.CHORDS_FILE_EXTENSION)
-        
+        for _, chords_file_path in self.build([lesson_file_path]):
+            return chords_file_path
+
+    def build(self, lesson_paths):
+
+        """Bring the chords files of the lessons up to date.
+
+        Lessons that are already up to date come first, then the others as
+        they are translated. Lessons are otherwise kept in the order given,
+        so put the one needed first at the start.
+
+        @param lesson_paths: file paths of lessons
+        @type lesson_paths: list of str
+
+        @return: generator of each lesson file path and its chords file path
+        @rtype: generator of (str, str)
+        """
+
+        manifests = {}
+        stale = []
+        try:
+            for lesson_path in lesson_paths:
+                manifest = self.__get_manifest(manifests, lesson_path)
+                if self.__is_up_to_date(lesson_path, manifest):
+                    yield lesson_path, get_chords_path(lesson_path)
+                else:
+                    stale.append(lesson_path)
+
+            for lesson_path, chord_lines, record in self.__translate(stale):
+                chords_file_path = get_chords_path(lesson_path)
+                write_atomically(chords_file_path, '\n'.join(chord_lines))
+                manifests[os.path.dirname(lesson_path)].set_record(
+                    lesson_path, record)
+                logger.info("Generated %s" % chords_file_path)
+                yield lesson_path, chords_file_path
+        finally:
+            for manifest in manifests.itervalues():
+                manifest.save()
+
+    def __get_manifest(self, manifests, lesson_path):
+
+        """Return the manifest of the lesson's directory, reading it once.
+
+        @param manifests: manifests read so far, by directory
+        @param lesson_path: file path to lesson
+
+        @type manifests: dict of str to L{ChordsManifest}
+        @type lesson_path: str
+
+        @rtype: L{ChordsManifest}
+        """
+
+        lessons_dir = os.path.dirname(lesson_path)
+        if lessons_dir not in manifests:
+            manifests[lessons_dir] = ChordsManifest(lessons_dir)
+        return manifests[lessons_dir]
+
+    def __is_up_to_date(self, lesson_path, manifest):
+
+        """Whether the lesson's chords file matches its text and dictionary.
+
+        @param lesson_path: file path to lesson
+        @param manifest: manifest of the lesson's directory
+
+        @type lesson_path: str
+        @type manifest: L{ChordsManifest}
+
+        @rtype: bool
+        """
+
         if config.FORCE_LESSON_REGENERATION or \
-           not os.path.exists(chords_file_path):
-            self.__generate_chords(lesson_file_path, chords_file_path)
+           not os.path.exists(get_chords_path(lesson_path)):
+            return False
+
+        record = manifest.get_record(lesson_path)
+        if record is None or \
+           record['source_hash'] != hash_lesson(read_lesson(lesson_path)):
+            return False
+        if self.dictionary_hash is not None and \
+           record['dictionary_hash'] == self.dictionary_hash:
+            return True
+        return record['words_hash'] == \
+               self.translator.get_dependency_hash(record['words'])
+
+    def __translate(self, lesson_paths):
+
+        """Translate lessons, in a pool of processes if there are several
+        and no other threads are running.
+
+        @param lesson_paths: file paths of lessons to translate
+        @type lesson_paths: list of str
+
+        @return: generator of each lesson path, its lines of chords and its
+                 manifest record, in the order lessons are finished
+        @rtype: generator of (str, list of str, dict)
+        """
+
+        processes = min(self.processes or multiprocessing.cpu_count(),
+                        len(lesson_paths))
+        if processes > 1 and threading.active_count() > 1:
+            logger.info("Translating %d lessons in this process, other "
+                        "threads are running" % len(lesson_paths))
+            processes = 1
+        if processes <= 1:
+            for lesson_path in lesson_paths:
+                yield translate_lesson(self.translator, lesson_path,
+                                       self.dictionary_hash)
+            logger.info("Translation cache %s" %
+                        self.translator.get_cache_stats())
+            return
+
+        # Workers open a compiled dictionary from its file, so that it
+        # need not be pickled or inherited.
+        cache_path = getattr(self.dictionary, 'cache_path', None)
+        dictionary = None if cache_path else self.dictionary
+        pool = multiprocessing.Pool(processes, _start_worker,
+                                    (cache_path, dictionary,
+                                     self.dictionary_hash))
+        try:
+            for result in pool.imap_unordered(_translate_in_worker,
+                                              lesson_paths):
+                yield result
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+
+
+class ChordsManifest(object):
+
+    """Record of what each chords file in a lessons directory was built from.
+
+    The record of a lesson is a dict with:
+        - source_hash: hex digest of the lesson file
+        - dictionary_hash: hex digest of the dictionary file, if known
+        - words: english words in the index its chords depend on
+        - words_hash: hex digest of the dictionary entries of those words
+    """
+
+    FILE_NAME = 'chords_manifest.json'
+    VERSION = 1
+
+    def __init__(self, lessons_dir):
+
+        """
+        @param lessons_dir: directory of lessons and their chords files
+        @type lessons_dir: str
+        """
+
+        self.file_path = os.path.join(lessons_dir, self.FILE_NAME)
+        self.records = self.__read()
+        self.changed = False
+
+    def __read(self):
 
-        return chords_file_path
+        """Read the records, or start afresh if they are missing or invalid.
 
-    def __generate_chords(self, lesson_path, chords_file_path):
-        
-        """Generate chords and write to file.
+        @return: record of each lesson, by lesson file name
+        @rtype: dict
+        """
+
+        if not os.path.exists(self.file_path):
+            return {}
+        try:
+            with open(self.file_path) as f:
+                manifest = json.load(f)
+        except (IOError, ValueError) as e:
+            logger.warning("Ignoring unreadable %s: %s" % (self.file_path, e))
+            return {}
+        if manifest.get('version') != self.VERSION:
+            return {}
+        return manifest.get('lessons', {})
+
+    def get_record(self, lesson_path):
+
+        """Return what the lesson's chords file was built from, or None.
+
+        @param lesson_path: file path to lesson
+        @type lesson_path: str
+
+        @rtype: dict
+        """
+
+        return self.records.get(os.path.basename(lesson_path))
+
+    def set_record(self, lesson_path, record):
+
+        """Record what the lesson's chords file was built from.
 
         @param lesson_path: file path to lesson
-        @param chords_file_path: file path to chords file corresponding to
-                                 lesson file.
+        @param record: see L{ChordsManifest}
 
         @type lesson_path: str
-        @type chords_file_path: str
+        @type record: dict
         """
 
-        chord_lines_list = self.translator.translate_from_file(lesson_path)
-        chord_lines = '\n'.join(chord_lines_list)
-        with open(chords_file_path, 'w') as f:
-            f.write(chord_lines)
+        self.records[os.path.basename(lesson_path)] = record
+        self.changed = True
+
+    def save(self):
+
+        """Write the records, if any changed."""
+
+        if not self.changed:
+            return
+        manifest = {'version': self.VERSION, 'lessons': self.records}
+        try:
+            write_atomically(self.file_path, json.dumps(manifest))
+        except (IOError, OSError) as e:
+            logger.warning("Could not write %s: %s" % (self.file_path, e))
+            return
+        self.changed = False
+
+
+def translate_lesson(translator, lesson_path, dictionary_hash):
+
+    """Translate a lesson, and record what the translation depends on.
+
+    @param translator: translator of the dictionary
+    @param lesson_path: file path to lesson
+    @param dictionary_hash: hex digest of the dictionary file, if known
+
+    @type translator: L{translation.wordstochords.WordToChordTranslator}
+    @type lesson_path: str
+    @type dictionary_hash: str
+
+    @return: lesson path, its lines of chords and its manifest record
+    @rtype: tuple of (str, list of str, dict)
+    """
+
+    lesson_text = read_lesson(lesson_path)
+    lines = lesson_text.splitlines(True)
+    chord_lines = translator.translate_lines(lines)
+
+    keys = set()
+    for line in lines:
+        for word in translator.yield_word(line):
+            keys.update(translator.get_index_keys(word))
+    keys = sorted(keys)
+
+    record = {'source_hash': hash_lesson(lesson_text),
+              'dictionary_hash': dictionary_hash,
+              'words': keys,
+              'words_hash': translator.get_dependency_hash(keys)}
+    return lesson_path, chord_lines, record
+
+
+def _start_worker(cache_path, dictionary, dictionary_hash):
+    # Set up a process of the pool to translate lessons, with the
+    # dictionary compiled at cache_path or else the dictionary given.
+    global _worker_translator, _worker_dictionary_hash
+    if cache_path:
+        dictionary = compiled.CompiledDictionary(cache_path)
+    _worker_translator = wordstochords.WordToChordTranslator(dictionary)
+    _worker_dictionary_hash = dictionary_hash
+
+
+def _translate_in_worker(lesson_path):
+    # Translate a lesson in a process of the pool.
+    return translate_lesson(_worker_translator, lesson_path,
+                            _worker_dictionary_hash)
+
+
+def get_chords_path(lesson_path):
+
+    """Return the file path to the chords file of a lesson.
+
+    @param lesson_path: file path to lesson
+    @type lesson_path: str
+
+    @rtype: str
+    """
+
+    return '%s%s' % (os.path.splitext(lesson_path)[0],
+                     LessonToChords.CHORDS_FILE_EXTENSION)
+
+
+def read_lesson(lesson_path):
+
+    """Return the text of a lesson file.
+
+    @param lesson_path: file path to lesson
+    @type lesson_path: str
+
+    @rtype: str
+    """
+
+    with open(lesson_path) as f:
+        return f.read()
+
+
+def hash_lesson(lesson_text):
+
+    """Return hex digest of the text of a lesson.
+
+    @param lesson_text: contents of lesson file
+    @type lesson_text: str
+
+    @rtype: str
+    """
+
+    return hashlib.sha1(lesson_text).hexdigest()
+
+
+def write_atomically(file_path, content):
+
+    """Write content to a temporary file and rename it over file_path.
+
+    Readers see either the old file or the new one, never part of it.
+
+    @param file_path: file to write
+    @param content: new contents of file
+
+    @type file_path: str
+    @type content: str
+    """
+
+    directory, name = os.path.split(file_path)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=name)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        try:
+            os.rename(temp_path, file_path)
+        except OSError:
+            # Windows does not rename over an existing file.
+            os.remove(file_path)
+            os.rename(temp_path, file_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
@@ -0,0 +1,145 @@
+# Copyright (c) 2011 Pragma Nolint.
+# See LICENSE.txt for details.
+
+"""
+Load plover's dictionary and the lessons in the background, so the game
+window is usable while they load.
+"""
+
+import threading
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class StartupLoader(threading.Thread):
+
+    """Worker thread that loads everything typing depends on.
+
+    Loading happens in three stages: reading plover's dictionary, indexing
+    it from english to chords, and preparing each lesson. The progress of
+    each stage is measured in bytes read or lessons prepared, and weighted
+    to give the overall progress.
+    """
+
+    # Share of overall progress that each stage accounts for.
+    DICTIONARY_SHARE = 0.5
+    INDEX_SHARE = 0.1
+    LESSONS_SHARE = 0.4
+
+    def __init__(self, plover_control, lesson_control, first_lesson_name,
+                 on_progress):
+
+        """
+        @param plover_control: plover, with its steno machine set up
+        @param lesson_control: lessons, without a dictionary yet
+        @param first_lesson_name: lesson to make ready before the others
+        @param on_progress: called on this thread each time progress is
+                            made, and when loading finishes or fails.
+
+        @type plover_control: L{translation.ploverfacade.PloverControl}
+        @type lesson_control: L{lessons.control.LessonControl}
+        @type first_lesson_name: str
+        @type on_progress: function
+        """
+
+        threading.Thread.__init__(self, name="StartupLoader")
+        self.daemon = True
+
+        self.plover_control = plover_control
+        self.lesson_control = lesson_control
+        self.first_lesson_name = first_lesson_name
+        self.on_progress = on_progress
+
+        self.progress = 0.0
+        self.dictionary_loaded = False
+        self.finished = False
+        self.error = None
+
+    def run(self):
+        try:
+            self.plover_control.load_dictionary(self.on_dictionary_progress)
+            self.dictionary_loaded = True
+            self.set_progress(self.DICTIONARY_SHARE)
+
+            self.lesson_control.set_dictionary(
+                self.plover_control.get_dictionary())
+            self.set_progress(self.DICTIONARY_SHARE + self.INDEX_SHARE)
+
+            self.lesson_control.prepare_lessons(self.first_lesson_name,
+                                                self.on_lesson_progress)
+        except Exception as e:
+            logger.exception("Loading failed")
+            self.error = e
+        finally:
+            self.finished = True
+            self.set_progress(1.0)
+
+    def on_dictionary_progress(self, bytes_read, size):
+
+        """Report progress of reading the dictionary file.
+
+        @param bytes_read: bytes of the dictionary file read so far
+        @param size: bytes in the dictionary file
+
+        @type bytes_read: int
+        @type size: int
+        """
+
+        if size:
+            self.set_progress(self.DICTIONARY_SHARE*bytes_read/size)
+
+    def on_lesson_progress(self, lessons_done, lesson_count):
+
+        """Report progress of preparing lessons.
+
+        @param lessons_done: lessons prepared so far
+        @param lesson_count: lessons to prepare
+
+        @type lessons_done: int
+        @type lesson_count: int
+        """
+
+        self.set_progress(self.DICTIONARY_SHARE + self.INDEX_SHARE +
+                          self.LESSONS_SHARE*lessons_done/lesson_count)
+
+    def set_progress(self, progress):
+
+        """Record overall progress and tell whoever is listening."""
+
+        self.progress = progress
+        self.on_progress()
+
+    def get_percent_done(self):
+
+        """Return how much has loaded as a percentage.
+
+        @rtype: int
+        """
+
+        return int(100*self.progress)
+
+    def is_lesson_ready(self, name):
+
+        """Whether the lesson given can be chosen to start typing with.
+
+        Plover needs its dictionary to translate strokes, and the lesson
+        needs its chords. Only the first lesson is prepared while loading;
+        once loading has finished, any other lesson can be chosen and is
+        prepared in the background.
+
+        @param name: lesson name or nice name
+        @type name: str
+
+        @rtype: bool
+        """
+
+        return self.dictionary_loaded and \
+               (self.finished or self.lesson_control.is_lesson_ready(name))
+
+    def raise_error(self):
+
+        """Raise the error that stopped loading, if any, in the caller."""
+
+        if self.error is not None:
+            raise self.error
@@ -6,6 +6,9 @@
 
 import os
 import sys
+import time
+import Queue
+import collections
 
 # Hack so that all modules can be imported from Fly, 
 # but the game can still be run just by calling
@@ -19,18 +22,41 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 from fly import __version__
+from fly import loader
 from fly.translation import ploverfacade
 from fly.models import threemode
 from fly.lessons import control
 from fly.statistics import gatherer
+from fly.statistics import progress
+from fly.statistics import summary
+from fly.statistics.helpers import strokelog
 from fly.gui import startup as startup_caption
 from fly.gui import constants
 from fly.gui import collection
 
 
-# Global variables, so can be accessed in main
-translation = ""
-chord = ""
+# Posted by plover's capture thread to wake up the main loop.
+STROKE_RECEIVED_EVENT = pygame.USEREVENT
+
+# Posted by a timer so that the display is refreshed while the user is idle.
+REFRESH_EVENT = pygame.USEREVENT + 1
+REFRESH_INTERVAL_MS = 1000
+
+# Posted by the startup loader each time it makes progress.
+LOADING_PROGRESS_EVENT = pygame.USEREVENT + 2
+
+# USEREVENT + 3 is constants.LESSON_CHOSEN_EVENT, posted by the GUI.
+
+# Posted by the lesson control once the word chooser of a lesson chosen 
+# in the GUI is ready.
+LESSON_READY_EVENT = pygame.USEREVENT + 4
+
+# A translation from plover, with the time it was received.
+StrokeEvent = collections.namedtuple("StrokeEvent", 
+                                     "time chord translation")
+
+# Strokes waiting for the main loop, in the order they were typed.
+stroke_queue = Queue.Queue()
 
 
 def translation_received(translationObj, overflow):
@@ -38,8 +64,9 @@ def translation_received(translationObj, overflow):
     """
     Callback function used to listen to plover's interpretation of key presses.
 
-    This is used to set global variables that can be read by the models when 
-    needed.
+    This runs on plover's capture thread. The translation is queued for the 
+    main loop, which is woken up by a posted event, so that no stroke is lost
+    however fast the user types.
 
     @param translationObj: A data model for the mapping between a sequence of
                            strokes and a string. 
@@ -49,9 +76,23 @@ def translation_received(translationObj, overflow):
     @type overflow: unused.
     """
 
-    global translation, chord
-    translation = translationObj.english
-    chord = translationObj.rtfcre
+    stroke_queue.put(StrokeEvent(time.time(), translationObj.rtfcre,
+                                 translationObj.english))
+    pygame.event.post(pygame.event.Event(STROKE_RECEIVED_EVENT))
+
+
+def loading_progress_made():
+
+    """Callback used by the startup loader to wake up the main loop."""
+
+    pygame.event.post(pygame.event.Event(LOADING_PROGRESS_EVENT))
+
+
+def lesson_ready():
+
+    """Callback used by the lesson control to wake up the main loop."""
+
+    pygame.event.post(pygame.event.Event(LESSON_READY_EVENT))
 
 
 class Main(object):
@@ -73,55 +114,120 @@ class Main(object):
                                    "v%s" % __version__)
         self.screen.fill(constants.CANVAS_COLOR)
 
-        # Display "Loading [X%]" caption on screen before GUI displays, as game
-        # can take a while to load.
+        # Display "Loading [X%]" caption over the GUI until everything has
+        # loaded, as the dictionary and lessons can take a while.
         self.startupCaption = startup_caption.StartupCaption()
-        self.update_startup_caption("Loading [0%]")
+        self.showing_startup_caption = True
 
-        # Set up plover
+        # Set up plover. Its dictionary is loaded in the background.
         self.plover_control = ploverfacade.PloverControl()
-        self.plover_control.set_up_steno(translation_received)
-        dictionary = self.plover_control.get_dictionary()
+        self.plover_control.set_up_machine(translation_received)
 
-        # Set up lesson reading and statistics
-        self.lesson_control = control.LessonControl(dictionary)
-        self.stats = gatherer.StatisticGatherer()
+        # Set up lesson reading and statistics. Lessons are found now and 
+        # prepared in the background. Progress on lessons is kept between
+        # sessions, and randomized lessons favour the chords the user finds
+        # hard in the summary of past sessions. Progress saved by a newer
+        # version of Fly is left alone, and this session is not saved.
+        try:
+            self.progress_store = progress.ProgressStore()
+        except ValueError as e:
+            logger.error("Not saving progress: %s" % e)
+            self.progress_store = None
+        self.lesson_control = control.LessonControl(
+            progress_store=self.progress_store,
+            difficulty_weights=summary.load_difficulty_weights())
+        self.stats = gatherer.StatisticGatherer(
+            strokelog.StrokeLog(strokelog.get_session_path()),
+            self.progress_store)
 
         # Set up GUI
         lesson_names = self.lesson_control.get_lesson_names()
         self.gui = collection.ElementsCollection(lesson_names)
-       
-        # Load lesson model
-        self.update_startup_caption("Loading [66%]")
-        self.lesson_model = threemode.get_lesson_model(self.gui,
-                                                       self.lesson_control)
-        self.update_startup_caption("Loading [100%]")
 
-        self.model = self.lesson_model
-        self.current_model_name = self.model.name
+        # The lesson model is created once its lesson has loaded.
+        self.lesson_model = None
+        self.model = None
+        self.current_model_name = None
+        # Name of the lesson being typed, for the stroke log, and of the
+        # lesson being prepared to start with.
+        self.lesson_name = ""
+        self.starting_lesson_name = None
+        self.clock = pygame.time.Clock()
 
-    def update_startup_caption(self, text):
+        self.loader = loader.StartupLoader(self.plover_control, 
+                                           self.lesson_control,
+                                           self.gui.get_current_lesson_name(),
+                                           loading_progress_made)
 
-        """Set caption on screen to display specified text.
-        
-        @param text: text to display
-        @type text: str
+    def update_startup_caption(self):
+
+        """Show loading progress over the GUI until loading has finished.
+
+        @return: area of the screen that changed
+        @rtype: list of pygame.Rect
         """
 
+        if not self.showing_startup_caption:
+            return []
+
+        if self.loader.finished and self.model is not None:
+            # Paint over the caption with the GUI.
+            self.showing_startup_caption = False
+            self.gui.redraw_all()
+            return []
+
+        text = "Loading [%d%%]" % self.loader.get_percent_done()
         self.startupCaption.display(self.screen, text)
-        pygame.display.update()
+        return [self.startupCaption.get_screen_rect()]
+
+    def start_lesson_when_ready(self):
+
+        """Create the lesson model and start translating once possible.
+
+        Until the dictionary and the lesson chosen in the GUI have loaded,
+        strokes are not captured. The lesson is prepared in the background
+        like any lesson chosen later, so the GUI keeps drawing meanwhile,
+        and if another lesson is chosen first only the last one is used.
+        """
+
+        self.loader.raise_error()
+        if self.model is not None:
+            return
+
+        lesson = self.gui.get_current_lesson_name()
+        if not self.loader.is_lesson_ready(lesson):
+            return
+        if lesson != self.starting_lesson_name:
+            self.starting_lesson_name = lesson
+            self.lesson_control.choose_lesson(lesson, lesson_ready)
+        word_chooser = self.lesson_control.take_word_chooser()
+        if not word_chooser:
+            # There is no lesson to carry on with if this one failed.
+            self.lesson_control.raise_choice_error()
+            return
+
+        self.lesson_model = threemode.get_lesson_model(word_chooser)
+        self.model = self.lesson_model
+        self.current_model_name = self.model.name
+        self.lesson_name = self.lesson_control.current_lesson.name
+        self.plover_control.start()
+        self.new_word_to_type()
+        self.stats.on_word_shown()
 
     def run(self):
 
         """Run the main loop of the game after starting plover.
 
-        In a try/finally so that plover will always be stopped whether
-        there's an error or the user exits normally.
+        In a try/finally so that plover will always be stopped, and progress
+        written, whether there's an error or the user exits normally.
         """
 
         try:
-            self.plover_control.start()
-            self.new_word_to_type()
+            self.loader.start()
+
+            # Draw the first frame straight away, then refresh periodically.
+            pygame.time.set_timer(REFRESH_EVENT, REFRESH_INTERVAL_MS)
+            pygame.event.post(pygame.event.Event(REFRESH_EVENT))
 
             running = True
             while running:
@@ -129,75 +235,148 @@ class Main(object):
 
         finally:
             self.plover_control.stop()
+            self.stats.close()
+            if self.progress_store is not None:
+                self.progress_store.close()
 
     def main_loop(self):
 
-        """This is executed as long as the game runs."""
+        """This is executed each time an event wakes the game up.
+
+        Waiting for events rather than polling means the game sleeps while 
+        the user is idle.
+        """
 
-        global translation, chord
         self.gui.reset()
     
-        # Check for mouse clicks or key presses etc.
-        running = self.process_events()
+        # Wait for mouse clicks, key presses, strokes or the refresh timer.
+        running = self.process_events(self.wait_for_events())
         if not running:
             return False
 
+        self.start_lesson_when_ready()
+
+        # Handle every stroke typed since the last frame, in order. Without
+        # any, user input is still checked so hints and the done state show.
+        if self.model is not None:
+            strokes = self.get_strokes()
+            if not strokes:
+                self.handle_input("", "")
+            for stroke in strokes:
+                self.handle_input(stroke.chord, stroke.translation, 
+                                  stroke.time)
+
+        # Switch to the lesson chosen in the GUI once it has been prepared
+        # in the background. Only applies if the lesson model is in use.
+        if self.lesson_model is not None:
+            word_chooser = self.lesson_control.take_word_chooser()
+            if word_chooser:
+                self.lesson_model.set_word_chooser(word_chooser)
+                self.lesson_name = self.lesson_control.current_lesson.name
+                self.new_word_to_type()
+                self.stats.on_word_shown()
+
+        # Update speed bar and times per word on the info panel
+        words_per_minute = self.stats.get_recent_words_per_min()
+        accuracy = self.stats.get_recent_fraction_accurate()
+        self.gui.update_speed_bar(words_per_minute, accuracy)
+        self.gui.update_latencies(
+            self.stats.get_latency_percentiles(self.lesson_name),
+            self.stats.get_latency_percentiles())
+
+        # Update the parts of the display that changed, at most
+        # MAX_FRAMES_PER_SECOND times a second.
+        dirty_rects = self.gui.draw(self.screen)
+        dirty_rects.extend(self.update_startup_caption())
+        pygame.display.update(dirty_rects)
+        self.clock.tick(constants.MAX_FRAMES_PER_SECOND)
+
+        return True
+
+    def handle_input(self, chord, translation, stroke_time=None):
+
+        """Tell the model about a stroke and react if a word was completed.
+
+        @param chord: steno chord user typed, or "" if there was no stroke.
+        @param translation: plover's translation of chord.
+        @param stroke_time: when the stroke was captured, if there was one.
+
+        @type chord: str
+        @type translation: str
+        @type stroke_time: float
+        """
+
         if self.model.is_done():
             # Show success message.
             self.gui.set_done()
+            return
+
+        # Chord the user should be typing, for the stroke log.
+        target_chord = self.model.word
+        correct = None
+
+        # Tell model about user input.
+        self.model.set_input_word_and_translation(chord, translation)
+
+        # Give model a chance to alter word and translation in case what
+        # plover provided is not what the model wants.
+        word, trans = self.model.get_chord_and_translation()
+
+        # Display user input.
+        self.gui.set_input_word_and_translation(word, trans)
+        
+        self.gui.act_on_hint_key_press()
+        
+        # Display word user should type.
+        self.gui.show_word_to_type(self.model.get_qwerty_letters_to_type())
+        if self.model.right_word_entered():
+            self.model.clear_inputs()
+            self.gui.on_right_word_entered()
+            self.model.on_right_word_entered()
+            self.stats.on_right_word_entered(stroke_time)
+            correct = True
+
+            # Reset with new word
+            self.new_word_to_type()
+
+        elif self.model.wrong_word_entered():
+            # Record that a wrong word was entered for the accuracy count.
+            self.model.on_wrong_word_entered()
+            self.stats.on_wrong_word_entered(stroke_time)
+            correct = False
+
         else:
-            # Tell model about user input.
-            self.model.set_input_word_and_translation(chord, translation)
+            # Word has not been completed
+            pass
 
-            # Give model a chance to alter word and translation in case what
-            # plover provided is not what the model wants.
-            word, trans = self.model.get_chord_and_translation()
+        if stroke_time is not None:
+            self.stats.on_stroke(stroke_time, target_chord, chord, correct,
+                                 self.lesson_name)
 
-            # Display user input.
-            self.gui.set_input_word_and_translation(word, trans)
-            self.set_translation_blank()
-            
-            self.gui.act_on_hint_key_press()
-            
-            # Display word user should type.
-            self.gui.show_word_to_type(self.model.get_qwerty_letters_to_type())
-            if self.model.right_word_entered():
-                self.model.clear_inputs()
-                self.gui.on_right_word_entered()
-                self.model.on_right_word_entered()
-                self.stats.on_right_word_entered()
-
-                # Reset with new word
-                self.new_word_to_type()
+    def get_strokes(self):
 
-            elif self.model.wrong_word_entered():
-                # Record that a wrong word was entered for the accuracy count.
-                self.model.on_wrong_word_entered()
-                self.stats.on_wrong_word_entered()
+        """Take all strokes plover has queued since they were last taken.
 
-            else:
-                # Word has not been completed
-                pass
+        @return: strokes in the order they were typed
+        @rtype: list of L{StrokeEvent}
+        """
 
-        # Update speed bar
-        words_per_minute = self.stats.get_words_per_min()
-        accuracy = self.stats.get_fraction_accurate()
-        self.gui.update_speed_bar(words_per_minute, accuracy)
+        strokes = []
+        while True:
+            try:
+                strokes.append(stroke_queue.get_nowait())
+            except Queue.Empty:
+                return strokes
 
-        # Update display
-        self.screen.fill(constants.CANVAS_COLOR)
-        self.gui.draw(self.screen)
-        pygame.display.flip()
+    def wait_for_events(self):
 
-        # Set the lesson model word chooser based on the lesson chosen in UI.
-        # Only applies to the game if lesson model in use.
-        lesson = self.gui.get_current_lesson_name()
-        word_chooser = self.lesson_control.get_word_chooser(lesson)
-        if word_chooser:
-            self.lesson_model.set_word_chooser(word_chooser)
-            self.new_word_to_type()
+        """Sleep until at least one event arrives, then take all pending.
 
-        return True
+        @return: pending events, oldest first
+        @rtype: list of pygame.event.Event
+        """
+
+        return [pygame.event.wait()] + pygame.event.get()
 
     def new_word_to_type(self):
 
@@ -207,11 +386,21 @@ class Main(object):
         target_chord, target_translation = self.model.get_display_word_and_translation()
         self.gui.set_word_to_type(target_chord, target_translation)
     
-    def process_events(self):
+    def process_events(self, events):
+
+        """Process events that have been triggered.
+
+        Stroke, refresh, loading progress and lesson ready events need no 
+        handling here; they only wake up the main loop.
+
+        @param events: events to process
+        @type events: list of pygame.event.Event
 
-        """Check if any events have been triggered and process them."""
+        @return: False if the user quit, else True
+        @rtype: bool
+        """
 
-        for event in pygame.event.get():
+        for event in events:
             if self.event_is_quit(event):
                 return False
             
@@ -222,6 +411,9 @@ class Main(object):
             elif self.event_is_gain_focus(event):
                 self.plover_control.resume()
                 pass
+
+            elif self.event_is_expose(event):
+                self.gui.redraw_all()
                 
             elif self.event_is_mouse_motion(event):
                 self.gui.on_mouse_motion(event)
@@ -235,8 +427,26 @@ class Main(object):
             elif self.event_is_key_down(event):
                 self.gui.on_key_down(event)
 
+            elif self.event_is_lesson_chosen(event):
+                self.choose_lesson(event.lesson_name)
+
         return True
 
+    def choose_lesson(self, lesson_name):
+
+        """Start preparing the lesson chosen in the GUI.
+
+        The lesson in use carries on until the new one is ready. Before the
+        lesson model exists, the lesson chosen is picked up when it is 
+        created instead.
+
+        @param lesson_name: nice name of lesson
+        @type lesson_name: str
+        """
+
+        if self.lesson_model is not None:
+            self.lesson_control.choose_lesson(lesson_name, lesson_ready)
+
     def event_is_quit(self, event):
         """Return True if event is quit game"""
         return event.type == pygame.QUIT
@@ -249,6 +459,10 @@ class Main(object):
         """Return True if window has just gained focus."""
         return event.type == pygame.ACTIVEEVENT and event.gain == 1
 
+    def event_is_expose(self, event):
+        """Return True if the window must be painted again."""
+        return event.type == pygame.VIDEOEXPOSE
+
     def event_is_mouse_motion(self, event):
         """Return True if event is mouse motion."""
         return event.type == pygame.MOUSEMOTION
@@ -265,11 +479,9 @@ class Main(object):
         """Return True if a key is pressed."""
         return event.type == pygame.KEYDOWN
 
-    def set_translation_blank(self):
-        """Clear global chord and translation ready for new user input."""
-        global translation, chord
-        translation = ""
-        chord = ""
+    def event_is_lesson_chosen(self, event):
+        """Return True if the user chose another lesson."""
+        return event.type == constants.LESSON_CHOSEN_EVENT
 
 
 if __name__ == "__main__":
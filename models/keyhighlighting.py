@@ -8,6 +8,8 @@ This module deals with keys that should be highlighted to indicate to the user
 the keys that need to be pressed.
 """
 
+from collections import namedtuple
+
 from fly.data import stenoqwerty
 from fly.data import alphabetdict as alphabet
 from fly.translation import ploverfacade
@@ -16,6 +18,11 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+# What to highlight for one stroke of a chord: the steno keys really pressed
+# and the qwerty letters they map to, both as tuples so they can be shared.
+ChordHighlight = namedtuple("ChordHighlight", "real_letters qwerty_letters")
+
+
 class KeyHighlighterInterface(object):
     
     """
@@ -48,13 +55,88 @@ class KeyHighlighter(KeyHighlighterInterface):
     """
     A class that gets keys to type given steno word to type and what has 
     been typed already.
+
+    What to highlight for each stroke of a chord is worked out once and kept
+    in a table shared by all instances, so it lasts across lessons.
     """
+
+    # (chord, stroke index) to L{ChordHighlight}
+    highlights = {}
     
     def get_qwerty_letters_to_type(self, word, input_word):
-        steno_word = self.get_stroke(word, input_word)
-        real_letters = self.get_real_letters(steno_word)
-        qwerty_letter_list = self.get_qwerty_letter_list(real_letters)
-        return qwerty_letter_list
+        stroke_index = self.get_stroke_index(word, input_word)
+        return list(self.get_highlight(word, stroke_index).qwerty_letters)
+
+    def get_highlight(self, steno_word, stroke_index):
+
+        """Return what to highlight for one stroke of a chord.
+
+        @param steno_word: word to type in steno letters, e.g. AU/ROR/RA
+        @param stroke_index: which stroke of steno_word, counting from 0
+
+        @type steno_word: str
+        @type stroke_index: int
+
+        @return: steno keys and qwerty letters for the stroke
+        @rtype: L{ChordHighlight}
+        """
+
+        key = (steno_word, stroke_index)
+        highlight = self.highlights.get(key)
+        if highlight is None:
+            stroke = steno_word.split('/')[stroke_index]
+            real_letters = self.get_real_letters(stroke)
+            qwerty_letters = self.get_qwerty_letter_list(real_letters)
+            highlight = ChordHighlight(tuple(real_letters), 
+                                       tuple(qwerty_letters))
+            self.highlights[key] = highlight
+        return highlight
+
+    def precompute(self, steno_words):
+
+        """Fill the highlight table for every stroke of the words given.
+
+        Called when a lesson loads so no highlighting is worked out while
+        the user types. Words already in the table are skipped.
+
+        @param steno_words: words to type in steno letters, e.g. AU/ROR/RA
+        @type steno_words: iterable of str
+        """
+
+        for steno_word in steno_words:
+            for stroke_index in range(steno_word.count('/') + 1):
+                if (steno_word, stroke_index) in self.highlights:
+                    continue
+                try:
+                    self.get_highlight(steno_word, stroke_index)
+                except KeyError:
+                    # Left for when the word is shown, as before.
+                    logger.debug("Cannot highlight %s" % steno_word)
+                    break
+
+    def get_stroke_index(self, steno_word, input_word):
+
+        """For multichorded words, return which chord the user needs to type.
+
+        See L{get_stroke}, which returns the chord itself.
+
+        @param steno_word: word to type in steno letters, e.g. AU/ROR/RA
+        @param input_word: what user has typed already in steno letters, 
+                           e.g. ROR
+
+        @type steno_word: str
+        @type input_word: str
+
+        @return: index of the chord in steno_word, counting from 0
+        @rtype: int
+        """
+
+        split_word = steno_word.split('/')
+        input_split = input_word.split('/')
+        for index, word in enumerate(split_word):
+            if index >= len(input_split) or word != input_split[index]:
+                return index
+        return 0
     
     def get_stroke(self, steno_word, input_word):
 
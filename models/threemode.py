@@ -15,25 +15,22 @@ from fly.data import alphabetdict as ad
 LESSON_MODEL_NAME = "lesson"
 
 
-def get_lesson_model(gui, lesson_control):
+def get_lesson_model(word_chooser):
 
     """Create game model to use for lesson model.
 
+    @param word_chooser: word chooser of the lesson to start with, see
+                         L{lessons.control.LessonControl.take_word_chooser}
+    @type word_chooser: class implementing L{models.wordchooser.interface}
+
     @return: model configured for lesson
     @rtype: L{game_model.GameModel)
     """
 
-    lesson = gui.get_current_lesson_name()
-    word_chooser = lesson_control.get_word_chooser(lesson)
-    if word_chooser:
-        lesson_word_chooser = word_chooser
-    else:
-        lesson_word_chooser = leveldicts.RetrieveFromLevelDictionaries()
-
     word_interpreter = input_word.InterpretForWord()
 
     lesson_model = game_model.GameModel(LESSON_MODEL_NAME,
-                                        lesson_word_chooser,
+                                        word_chooser,
                                         word_interpreter)
     return lesson_model
        
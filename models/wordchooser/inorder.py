@@ -27,6 +27,14 @@ class RetrieveInOrder(interface.WordChooserInterface):
         self.index = 0
         self.word_translation_dict = word_translation_dict
         self.word_list = word_list
+        self.progress = None
+
+    def set_progress(self, progress):
+
+        """Carry on from the word the user was typing last time."""
+
+        self.progress = progress
+        self.index = max(progress.state.get('index', 1) - 1, 0)
 
     def get_word_and_translation(self):
 
@@ -36,8 +44,18 @@ class RetrieveInOrder(interface.WordChooserInterface):
         word = self.word_list[self.index]
         self.index += 1
         translation = self.word_translation_dict[word]
+        if self.progress is not None:
+            self.progress.set_state(index=self.index)
         return word, translation
 
+    def on_right_word_entered(self):
+        if self.progress is not None:
+            self.progress.record_word(self.word_list[self.index - 1], True)
+
+    def on_wrong_word_entered(self):
+        if self.progress is not None:
+            self.progress.record_word(self.word_list[self.index - 1], False)
+
     def get_current_word_index(self):
         return self.index - 1
 
@@ -59,19 +77,28 @@ class RetrieveInOrderSentence(interface.WordChooserInterface):
         self.retriever = RetrieveInOrder(lesson.chord_translation_dict, 
                                          lesson.chords_list)
 
+    def set_progress(self, progress):
+        self.retriever.set_progress(progress)
+
     def get_word_and_translation(self):
 
         word, translation = self.retriever.get_word_and_translation()
         self.index = self.retriever.get_current_word_index()
         return word, translation
+
+    def on_right_word_entered(self):
+        self.retriever.on_right_word_entered()
+
+    def on_wrong_word_entered(self):
+        self.retriever.on_wrong_word_entered()
     
     def get_display_word_and_translation(self):
 
-        for sentence_ind, word_inds in self.lesson.sentence_map.iteritems():
-            if self.index in word_inds:
-                self.sentence_ind = sentence_ind
-                return self.lesson.chord_sentences_list[sentence_ind], \
-                       self.lesson.sentences_list[sentence_ind]
+        sentence_ind = self.lesson.find_sentence(self.index)
+        if sentence_ind is not None:
+            self.sentence_ind = sentence_ind
+            return self.lesson.chord_sentences_list[sentence_ind], \
+                   self.lesson.sentences_list[sentence_ind]
     
     def return_inputs(self, input_word, input_translation):
 
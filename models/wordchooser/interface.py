@@ -54,6 +54,19 @@ class WordChooserInterface(object):
 
         return input_word, input_translation
 
+    def set_progress(self, progress):
+
+        """Carry on from the progress made on the lesson before.
+
+        Optional. Word choosers that support it restore their state from 
+        progress, and record progress to it as the user types.
+
+        @param progress: progress on the lesson the words are from
+        @type progress: L{statistics.progress.LessonProgress}
+        """
+
+        pass
+
     def is_done(self):
         """Returns true if there are no more words to practice."""
 
@@ -1,46 +1,188 @@
 # Copyright (c) 2011 Pragma Nolint.
 # See LICENSE.txt for details.
 
-"""Random retrieval of words."""
+"""
+Random retrieval of words.
+
+Words are drawn with an alias table (Vose's alias method), built once when
+the word chooser is made, so each draw takes the same time however many
+words there are. Words can be weighted, e.g. by frequency or difficulty.
+"""
 
 import random
 
+from fly import config
 from fly.models.wordchooser import interface
 
 
 class RetrieveRandomized(interface.WordChooserInterface):
 
-    """Words are retrieved randomly from plover's dict."""
+    """Words are retrieved randomly from plover's dict.
+
+    Chords with the same translation are drawn as one, so the same
+    translation is never presented twice in a row.
+    """
 
-    def __init__(self, word_translation_dict, word_list):
+    def __init__(self, word_translation_dict, word_list, weights=None,
+                 seed=None):
 
         """
-        @param word_translation_dict: dict mapping steno chord to 
+        @param word_translation_dict: dict mapping steno chord to
                                       english translation for every
                                       chord in word_list
         @param word_list: list of steno words to present to user
+        @param weights: how often each chord should come up relative to
+                        others, 1 if not given
+        @param seed: seed for the random draws, by default
+                     config.RANDOM_SEED
 
         @type word_translation_dict: dict
         @type word_list: list
+        @type weights: dict of str: float
+        @type seed: hashable
         """
 
         self.word_translation_dict = word_translation_dict
-        self.previous_translation = ""
-    
+        self.words = word_translation_dict.keys()
+
+        if seed is None:
+            seed = config.RANDOM_SEED
+        self.random = random.Random(seed)
+
+        # One entry per translation, with the chords for it.
+        self.translations = []
+        self.chords = []
+        entry_weights = []
+        entries = {}
+        for word in self.words:
+            translation = word_translation_dict[word]
+            weight = 1.0 if weights is None else weights.get(word, 1.0)
+            if translation not in entries:
+                entries[translation] = len(self.translations)
+                self.translations.append(translation)
+                self.chords.append([])
+                entry_weights.append(0.0)
+            entry = entries[translation]
+            self.chords[entry].append(word)
+            entry_weights[entry] += weight
+
+        self.sampler = AliasSampler(entry_weights, self.random)
+        self.previous_entry = None
+        self.word = None
+        self.progress = None
+
+    def set_progress(self, progress):
+
+        """Record how often each word is typed right and wrong."""
+
+        self.progress = progress
+
     def get_word_and_translation(self):
-        word, translation = self.__get_word_and_translation_from_dict()
-        i = 0
-        while translation == self.previous_translation:
-            word, translation = self.__get_word_and_translation_from_dict()
-            i += 1
-            if i > 1000:
-                break
-        self.previous_translation = translation
-        return word, translation
-
-    def __get_word_and_translation_from_dict(self):
-        word = random.choice(self.word_translation_dict.keys())
-        translation = self.word_translation_dict[word]
-        return word, translation
+        if self.previous_entry is None:
+            entry = self.sampler.sample()
+        else:
+            entry = self.sampler.sample_other(self.previous_entry)
+        self.previous_entry = entry
 
+        chords = self.chords[entry]
+        if len(chords) == 1:
+            word = chords[0]
+        else:
+            word = self.random.choice(chords)
+        self.word = word
+        return word, self.translations[entry]
+
+    def on_right_word_entered(self):
+        if self.progress is not None:
+            self.progress.record_word(self.word, True)
+
+    def on_wrong_word_entered(self):
+        if self.progress is not None:
+            self.progress.record_word(self.word, False)
+
+
+class AliasSampler(object):
+
+    """Draws indices in proportion to their weights, each in constant time.
+
+    The weights are spread over one column per index, each holding the
+    same total weight: part of it for its own index and the rest for one
+    other index, its alias. A draw picks a column, then its index or its
+    alias.
+    """
+
+    def __init__(self, weights, random_source=random):
+
+        """
+        @param weights: weight of each index, not all zero
+        @param random_source: source of random numbers, e.g. a seeded
+                              random.Random
+
+        @type weights: list of float
+        @type random_source: random.Random
+        """
+
+        self.random = random_source
+        count = len(weights)
+        total = float(sum(weights))
+        if count and total <= 0:
+            raise ValueError("At least one weight must be positive")
+
+        # Share of each column that belongs to its own index.
+        self.probabilities = [1.0] * count
+        self.aliases = range(count)
+
+        scaled = [weight * count / total for weight in weights]
+        small = [i for i, share in enumerate(scaled) if share < 1.0]
+        large = [i for i, share in enumerate(scaled) if share >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probabilities[less] = scaled[less]
+            self.aliases[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # Whatever is left over is a full column, up to rounding.
+
+    def __len__(self):
+        return len(self.probabilities)
+
+    def sample(self):
+
+        """Draw an index.
+
+        @rtype: int
+        """
+
+        column = int(self.random.random() * len(self.probabilities))
+        if self.random.random() < self.probabilities[column]:
+            return column
+        return self.aliases[column]
+
+    def sample_other(self, excluded):
+
+        """Draw an index other than excluded, unless it is the only one.
+
+        The column of excluded is skipped, and where excluded is the alias
+        of another column, that column's own index is drawn instead. With
+        equal weights every other index is equally likely; otherwise they
+        are close to in proportion to their weights.
+
+        @param excluded: index not to draw, e.g. the one drawn last
+        @type excluded: int
+
+        @rtype: int
+        """
 
+        count = len(self.probabilities)
+        if count == 1:
+            return 0
+        column = int(self.random.random() * (count - 1))
+        if column >= excluded:
+            column += 1
+        if self.random.random() < self.probabilities[column] or \
+           self.aliases[column] == excluded:
+            return column
+        return self.aliases[column]
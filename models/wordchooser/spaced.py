@@ -4,12 +4,20 @@
 
 from fly.models.wordchooser import interface
 
-from collections import OrderedDict
-import random
+from collections import OrderedDict, deque
+import heapq
+import itertools
 
 class RetrieveSpaced(interface.WordChooserInterface):
 
-    """Words are shown in-order and then spaced out."""
+    """Words are shown in-order and then spaced out.
+
+    Words being learned are kept in a heap keyed on the position in the
+    lesson at which they are due, i.e. how many words have been shown before
+    them. Each word has an ease factor, as in SM-2: its spacing is multiplied
+    by its ease each time it is typed right, and the ease goes up when it is
+    typed right and down when it is typed wrong.
+    """
 
     def __init__(self, word_translation_dict, word_list):
 
@@ -29,33 +37,68 @@ class RetrieveSpaced(interface.WordChooserInterface):
         self.spacing_factor     = 2.0
         self.max_spacing        = self.spacing_factor**5
 
-        # put every (unique) word in the new word queue and store a spacing interval for them
-        self.new_queue = list(OrderedDict.fromkeys(word_list))
-        self.spacing   = {word: self.initial_spacing for word in word_translation_dict.keys()}
+        # SM-2 ease factor: starting value, lower bound and changes for
+        # right (quality 5) and wrong (quality 2) answers
+        self.initial_ease       = self.spacing_factor
+        self.minimum_ease       = 1.3
+        self.right_ease_change  = 0.1
+        self.wrong_ease_change  = -0.32
+
+        # put every (unique) word in the new word queue; spacing and ease are
+        # stored once a word has been answered
+        self.new_queue = deque(OrderedDict.fromkeys(word_list))
+        self.spacing   = {}
+        self.ease      = {}
 
-        # what words to display next
+        # heap of (due position, order queued, word) of words to display next
         self.queue     = []
+        self.position  = 0
+        self.order     = itertools.count()
         self.last_word = None
         self.open_word = False
 
+        # where progress is recorded, once set
+        self.progress  = None
+
         self.word_translation_dict = word_translation_dict
 
+    def set_progress(self, progress):
+        self.progress = progress
+        self.position = progress.state.get('position', 0)
+
+        # words typed before are scheduled where they were left, or not at
+        # all if they have been learned
+        restored = set()
+        for word, word_progress in progress.words.iteritems():
+            if word not in self.word_translation_dict or \
+               word_progress.spacing is None:
+                continue
+            restored.add(word)
+            self.spacing[word] = word_progress.spacing
+            self.ease[word] = word_progress.ease
+            if word_progress.due is not None:
+                self.queue.append((word_progress.due, next(self.order), word))
+        heapq.heapify(self.queue)
+        self.new_queue = deque(word for word in self.new_queue 
+                               if word not in restored)
+
     def get_word_and_translation(self):
-        # add new word to beginning of learning queue if it's small enough
+        # add new word to the front of learning queue if it's small enough
         if len(self.queue) < self.minimum_queue_size and self.new_queue:
-            new_word = self.new_queue.pop(0)
-            self.queue.insert(0, new_word)
+            new_word = self.new_queue.popleft()
+            self.schedule(new_word, 0)
 
         # remove word from learning queue
         if self.queue:
-            word = self.queue.pop(0)
+            due, order, word = heapq.heappop(self.queue)
 
             # try not to repeat words
             if word == self.last_word and self.queue:
-                word = self.queue.pop(0)
-                self.queue.insert(0, self.last_word)
+                due, order, word = heapq.heapreplace(self.queue,
+                                                     (due, order, word))
 
             # remember that we still have an unanswered word
+            self.position += 1
             self.last_word = word
             self.open_word = True
         else:
@@ -66,14 +109,40 @@ class RetrieveSpaced(interface.WordChooserInterface):
 
         return word, translation
 
+    def schedule(self, word, spacing):
+
+        """Queue word to be shown after spacing other words.
+
+        @param word: steno chord
+        @param spacing: how many words to show before it
+
+        @type word: str
+        @type spacing: float
+
+        @return: position at which word is due
+        @rtype: int
+        """
+
+        due = self.position + int(round(spacing))
+        heapq.heappush(self.queue, (due, next(self.order), word))
+        return due
+
     def on_right_word_entered(self):
         word = self.last_word
 
+        # a word typed wrong has been queued again already
+        if not self.open_word:
+            return
+
         # reinsert word into queue if necessary
-        spacing = self.spacing[word] * self.spacing_factor
+        ease = self.ease.get(word, self.initial_ease) + self.right_ease_change
+        spacing = self.spacing.get(word, self.initial_spacing) * ease
+        self.ease[word] = ease
+        due = None
         if spacing < self.max_spacing:
             self.spacing[word] = spacing
-            self.queue.insert(int(round(spacing)), word)
+            due = self.schedule(word, spacing)
+        self.record(word, True, due)
 
         # done with this word
         self.open_word = False
@@ -81,12 +150,24 @@ class RetrieveSpaced(interface.WordChooserInterface):
     def on_wrong_word_entered(self):
         word = self.last_word
 
-        # reset spacing and reinsert word into queue
+        # reset spacing, make word harder and reinsert word into queue
         if self.open_word == True:
+            ease = self.ease.get(word, self.initial_ease) + \
+                   self.wrong_ease_change
+            self.ease[word] = max(self.minimum_ease, ease)
             spacing = self.initial_spacing
             self.spacing[word] = spacing
-            self.queue.insert(int(round(spacing)), word)
+            due = self.schedule(word, spacing)
+            self.record(word, False, due)
             self.open_word = False
 
+    def record(self, word, right, due):
+        # keep the schedule of the word for the next session
+        if self.progress is None:
+            return
+        self.progress.record_word(word, right, spacing=self.spacing[word],
+                                  ease=self.ease[word], due=due)
+        self.progress.set_state(position=self.position)
+
     def is_done(self):
         return not (self.open_word or self.queue or self.new_queue)
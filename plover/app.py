@@ -18,10 +18,6 @@ interface.
 import os
 import logging
 import logging.handlers
-try :
-    import simplejson as json
-except ImportError :
-    import json
 
 # Import plover modules.
 import plover.config as conf
@@ -32,6 +28,7 @@ import plover.machine as machine
 import plover.machine.base
 import plover.machine.sidewinder
 import plover.dictionary as dictionary
+import plover.dictionary.compiled as compiled_dictionary
 
 class StenoEngine:
     """Top-level class for using a stenotype machine for text input.
@@ -112,12 +109,11 @@ class StenoEngine:
                              (conf.DICTIONARY_FILE_OPTION, dictionary_path))
         dictionary_extension = os.path.splitext(dictionary_path)[1]
         if dictionary_extension == conf.JSON_EXTENSION:
-            try:
-                with open(dictionary_path, 'r') as f:
-                    self.dictionary = json.load(f)
-            except UnicodeDecodeError:
-                with open(dictionary_path, 'r') as f:
-                    self.dictionary = json.load(f, conf.ALTERNATIVE_ENCODING)
+            # The compiled cache is shared with any other program that
+            # loads the same dictionary file.
+            self.dictionary = compiled_dictionary.load(
+                                                dictionary_path,
+                                                conf.DICTIONARY_CACHE_DIR)
         else:
             raise ValueError('The value of %s must end with %s.' %
                              (conf.DICTIONARY_FILE_OPTION, conf.JSON_EXTENSION))
@@ -193,6 +189,8 @@ class StenoEngine:
 
 
     def _log_stroke(self, steno_keys):
+        if isinstance(steno_keys, (int, long)):
+            steno_keys = steno.mask_to_steno_keys(steno_keys)
         self.logger.info('Stroke(%s)' % ' '.join(steno_keys))
 
 
@@ -16,6 +16,7 @@ ASSETS_DIR =  os.path.join(os.path.dirname(os.path.realpath(__file__)),
                            'assets')
 CONFIG_DIR = os.path.expanduser('~/.config/plover')
 CONFIG_FILE = os.path.join(CONFIG_DIR, 'plover.cfg')
+DICTIONARY_CACHE_DIR = os.path.join(CONFIG_DIR, 'cache')
 
 # General configuration sections and options.
 MACHINE_CONFIG_SECTION = 'Machine Configuration'
@@ -0,0 +1,434 @@
+# Copyright (c) 2011 Pragma Nolint.
+# See LICENSE.txt for details.
+
+"""A compiled, memory-mapped cache of JSON stenography dictionaries.
+
+Parsing a large JSON dictionary takes seconds, and every component that
+needs the dictionary would otherwise pay that cost on every start. This
+module compiles a JSON dictionary once into a binary file that can be
+memory-mapped and queried in place, without building a Python dict.
+
+A compiled file consists of a fixed header, the source file path, two
+open-addressing hash tables and a blob of UTF-8 encoded strings. The
+first table holds the dictionary entries. The second holds every proper
+prefix of a multi-stroke key, so that a translator can stop looking for
+longer translations as soon as no key continues the strokes it has. The
+header records the path, size, modification time and SHA-1 hash of the
+source file, so that a stale cache is detected and rebuilt from the JSON
+source, as well as the stroke delimiter and the largest number of
+strokes in any key.
+
+This is not a dictionary format module; it stores dictionaries that are
+already in RTF/CRE form and is used by load.
+
+"""
+
+import os
+import json
+import mmap
+import zlib
+import struct
+import hashlib
+import logging
+import tempfile
+import collections
+
+ALTERNATIVE_ENCODING = 'latin-1'
+
+CACHE_EXTENSION = '.cdict'
+
+MAGIC = 'PLVRDICT'
+VERSION = 2
+
+# magic, version, source size, source mtime, source SHA-1 digest,
+# length of source path, stroke delimiter, most strokes in a key,
+# number of entries and hash slots, number of prefixes and hash slots.
+HEADER = struct.Struct('<8sIQd20sIcIIIII')
+MTIME_OFFSET = struct.calcsize('<8sIQ')
+SLOT = struct.Struct('<I')
+# Offset and length of the key, then of the value, within the blob.
+ENTRY = struct.Struct('<IIII')
+
+STROKE_DELIMITER = '/'
+
+# Source hash of dictionaries compiled without one, e.g. from memory.
+NO_SOURCE_HASH = '\0' * 20
+
+# Fraction of hash slots left empty so that probe sequences stay short.
+LOAD_FACTOR = 0.5
+
+# Bytes read from a JSON dictionary between progress reports.
+READ_CHUNK_SIZE = 1 << 16
+
+logger = logging.getLogger(__name__)
+
+
+class CompiledDictionary(collections.Mapping):
+    """A read-only mapping backed by a memory-mapped compiled dictionary.
+
+    Lookups hash the key and probe the slot table in the mapped file,
+    and only the entry that is found is decoded. Keys and values are
+    returned as unicode strings, as json.load would return them.
+
+    In addition to the mapping interface, instances have these
+    attributes:
+
+    stroke_delimiter -- The delimiter between strokes in keys.
+
+    max_number_of_strokes -- The most strokes in any key.
+
+    stroke_prefixes -- A container of every key prefix, made of whole
+    strokes, that is a proper prefix of some key.
+
+    """
+
+    def __init__(self, cache_path):
+        """Memory-map a compiled dictionary file.
+
+        Arguments:
+
+        cache_path -- The path of a file written by compile_dictionary.
+
+        """
+        self.cache_path = cache_path
+        with open(cache_path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.source_size, self.source_mtime,
+         self.source_hash, path_length, self.stroke_delimiter,
+         self.max_number_of_strokes, entry_count, slot_count,
+         prefix_count, prefix_slot_count) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError('Not a compiled dictionary: %s' % cache_path)
+        start = HEADER.size
+        self.source_path = self._map[start:start + path_length]
+        start += path_length
+        blob_start = (start + (SLOT.size * (slot_count + prefix_slot_count))
+                      + ENTRY.size * (entry_count + prefix_count))
+        self._entries = _HashTable(self._map, start, slot_count,
+                                   entry_count, blob_start)
+        start += SLOT.size * slot_count + ENTRY.size * entry_count
+        self.stroke_prefixes = _HashTable(self._map, start, prefix_slot_count,
+                                          prefix_count, blob_start)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        i = self._entries.find(key)
+        if i is None:
+            return default
+        return self._entries.value(i)
+
+    def iteritems(self):
+        entries = self._entries
+        for i in xrange(len(entries)):
+            yield entries.key(i), entries.value(i)
+
+    def close(self):
+        """Release the memory map. The mapping is unusable afterwards."""
+        self._map.close()
+
+
+class _HashTable(object):
+    # An open-addressing hash table of UTF-8 keys in a memory map. The
+    # slots hold entry indices plus one, with zero marking an empty slot.
+
+    def __init__(self, map, start, slot_count, entry_count, blob_start):
+        self._map = map
+        self._slots_start = start
+        self._slot_count = slot_count
+        self._entries_start = start + SLOT.size * slot_count
+        self._entry_count = entry_count
+        self._blob_start = blob_start
+
+    def __len__(self):
+        return self._entry_count
+
+    def __iter__(self):
+        for i in xrange(self._entry_count):
+            yield self.key(i)
+
+    def __contains__(self, key):
+        return self.find(key) is not None
+
+    def key(self, i):
+        # Return the key of the entry at index i.
+        key_offset, key_length = struct.unpack_from('<II', self._map,
+                                                    self._entries_start +
+                                                    ENTRY.size * i)
+        start = self._blob_start + key_offset
+        return self._map[start:start + key_length].decode('utf-8')
+
+    def value(self, i):
+        # Return the value of the entry at index i.
+        value_offset, value_length = struct.unpack_from('<II', self._map,
+                                                        self._entries_start +
+                                                        ENTRY.size * i + 8)
+        start = self._blob_start + value_offset
+        return self._map[start:start + value_length].decode('utf-8')
+
+    def find(self, key):
+        # Return the entry index for key, or None if it is not present.
+        if not self._slot_count or not isinstance(key, basestring):
+            return None
+        if isinstance(key, unicode):
+            key = key.encode('utf-8')
+        mask = self._slot_count - 1
+        slot = _hash(key) & mask
+        while True:
+            index = SLOT.unpack_from(self._map,
+                                     self._slots_start + SLOT.size * slot)[0]
+            if index == 0:
+                return None
+            key_offset, key_length = struct.unpack_from('<II', self._map,
+                                                 self._entries_start +
+                                                 ENTRY.size * (index - 1))
+            start = self._blob_start + key_offset
+            if (key_length == len(key) and
+                self._map[start:start + key_length] == key):
+                return index - 1
+            slot = (slot + 1) & mask
+
+
+def load(dictionary_path, cache_dir, progress=None):
+    """Return the dictionary in a JSON file, using a compiled cache.
+
+    The compiled cache is used if it matches the path, size and
+    modification time of the JSON file. If only the modification time
+    differs, the content hash decides. Otherwise the JSON file is parsed
+    and a new compiled cache is written. If the cache cannot be written,
+    the parsed dictionary is returned as a plain dict.
+
+    Arguments:
+
+    dictionary_path -- The path to a JSON-formatted dictionary that maps
+    strings to strings.
+
+    cache_dir -- The directory in which compiled dictionaries are kept.
+
+    progress -- An optional function called with the number of bytes of
+    the JSON file read so far and its size, each time a chunk is read.
+
+    Returns a CompiledDictionary, or a dict if caching failed.
+
+    """
+    dictionary_path = os.path.realpath(dictionary_path)
+    cache_path = get_cache_path(dictionary_path, cache_dir)
+    stat = os.stat(dictionary_path)
+
+    compiled = _open_cache(cache_path)
+    if compiled is not None:
+        if (compiled.source_path == _encode(dictionary_path) and
+            compiled.source_size == stat.st_size):
+            if compiled.source_mtime == stat.st_mtime:
+                return compiled
+            source_hash = hash_file(dictionary_path, progress)
+            if compiled.source_hash == source_hash:
+                compiled.close()
+                _update_mtime(cache_path, stat.st_mtime)
+                return CompiledDictionary(cache_path)
+        compiled.close()
+
+    content = _read(dictionary_path, progress)
+    source_hash = hashlib.sha1(content).digest()
+    dictionary = _parse_json(content)
+    try:
+        compile_dictionary(dictionary, cache_path, dictionary_path,
+                           stat.st_size, stat.st_mtime, source_hash)
+    except (IOError, OSError) as e:
+        logger.warning('Could not cache dictionary %s: %s' %
+                       (dictionary_path, e))
+        return dictionary
+    return CompiledDictionary(cache_path)
+
+
+def load_json(dictionary_path):
+    """Parse a JSON dictionary, falling back to the alternative encoding."""
+    return _parse_json(_read(dictionary_path))
+
+
+def compile_dictionary(dictionary, cache_path, source_path='',
+                       source_size=0, source_mtime=0.0,
+                       source_hash=NO_SOURCE_HASH,
+                       stroke_delimiter=STROKE_DELIMITER):
+    """Write a dictionary to cache_path in the compiled format.
+
+    The file is written to a temporary name and renamed into place, so
+    readers never see a partially written cache.
+
+    Arguments:
+
+    dictionary -- A mapping of strings to strings.
+
+    cache_path -- The path of the compiled file to write.
+
+    source_path, source_size, source_mtime, source_hash -- The
+    fingerprint of the JSON file the dictionary was read from.
+
+    stroke_delimiter -- The delimiter between strokes in keys.
+
+    """
+    items = sorted((_encode(k), _encode(v)) for k, v in dictionary.iteritems())
+    prefixes = set()
+    max_number_of_strokes = 0
+    for key, _ in items:
+        strokes = key.split(stroke_delimiter)
+        max_number_of_strokes = max(max_number_of_strokes, len(strokes))
+        for i in xrange(1, len(strokes)):
+            prefixes.add(stroke_delimiter.join(strokes[:i]))
+    prefixes = [(prefix, '') for prefix in sorted(prefixes)]
+
+    blob = []
+    entries, slots, offset = _build_table(items, blob, 0)
+    prefix_entries, prefix_slots, offset = _build_table(prefixes, blob, offset)
+
+    source_path = _encode(source_path)
+    cache_dir = os.path.dirname(cache_path)
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    fd, temp_path = tempfile.mkstemp(dir=cache_dir, suffix=CACHE_EXTENSION)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, source_size, source_mtime,
+                                source_hash, len(source_path),
+                                stroke_delimiter, max_number_of_strokes,
+                                len(items), len(slots),
+                                len(prefixes), len(prefix_slots)))
+            f.write(source_path)
+            for table_slots, table_entries in ((slots, entries),
+                                               (prefix_slots, prefix_entries)):
+                f.write(struct.pack('<%dI' % len(table_slots), *table_slots))
+                f.write(''.join(table_entries))
+            f.write(''.join(blob))
+        _replace(temp_path, cache_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _build_table(items, blob, offset):
+    # Lay out (key, value) pairs as packed entries and hash slots,
+    # appending the strings to blob from offset. Returns the entries,
+    # the slots and the blob offset after the strings.
+    slot_count = 1
+    while slot_count * LOAD_FACTOR < len(items):
+        slot_count *= 2
+    slots = [0] * slot_count
+    mask = slot_count - 1
+    entries = []
+    for i, (key, value) in enumerate(items):
+        entries.append(ENTRY.pack(offset, len(key),
+                                  offset + len(key), len(value)))
+        blob.append(key)
+        blob.append(value)
+        offset += len(key) + len(value)
+        slot = _hash(key) & mask
+        while slots[slot]:
+            slot = (slot + 1) & mask
+        slots[slot] = i + 1
+    return entries, slots, offset
+
+
+def get_cache_path(dictionary_path, cache_dir):
+    """Return the compiled file path for a dictionary, keyed by its path."""
+    name = os.path.basename(dictionary_path)
+    key = hashlib.sha1(_encode(dictionary_path)).hexdigest()[:16]
+    return os.path.join(cache_dir, '%s-%s%s' % (name, key, CACHE_EXTENSION))
+
+
+def hash_file(path, progress=None):
+    """Return the SHA-1 digest of the contents of the file at path.
+
+    Arguments:
+
+    path -- The path of the file to hash.
+
+    progress -- An optional function called with the number of bytes
+    hashed so far and the size of the file, each time a chunk is read.
+
+    """
+    digest = hashlib.sha1()
+    for chunk in _iter_chunks(path, progress):
+        digest.update(chunk)
+    return digest.digest()
+
+
+def _read(path, progress=None):
+    # Return the contents of the file at path, reporting progress.
+    return ''.join(_iter_chunks(path, progress))
+
+
+def _iter_chunks(path, progress):
+    # Yield the contents of the file at path in chunks, calling progress
+    # with the bytes read so far and the file size after each one.
+    size = os.path.getsize(path)
+    done = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), ''):
+            done += len(chunk)
+            if progress is not None:
+                progress(done, size)
+            yield chunk
+
+
+def _parse_json(content):
+    # Parse a JSON dictionary, falling back to the alternative encoding.
+    try:
+        return json.loads(content)
+    except UnicodeDecodeError:
+        return json.loads(content, ALTERNATIVE_ENCODING)
+
+
+def _open_cache(cache_path):
+    # Return the compiled dictionary at cache_path, or None if it is
+    # missing or unreadable.
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        return CompiledDictionary(cache_path)
+    except (ValueError, struct.error, EnvironmentError) as e:
+        logger.warning('Ignoring unreadable dictionary cache %s: %s' %
+                       (cache_path, e))
+        return None
+
+
+def _update_mtime(cache_path, mtime):
+    # Record a new source modification time for unchanged content.
+    with open(cache_path, 'r+b') as f:
+        f.seek(MTIME_OFFSET)
+        f.write(struct.pack('<d', mtime))
+
+
+def _replace(source, destination):
+    # Rename source over destination, which os.rename refuses on Windows.
+    try:
+        os.rename(source, destination)
+    except OSError:
+        os.remove(destination)
+        os.rename(source, destination)
+
+
+def _hash(key):
+    # A hash of a UTF-8 string that is stable across processes.
+    return zlib.crc32(key) & 0xffffffff
+
+
+def _encode(s):
+    # Strings are stored and compared as UTF-8.
+    if isinstance(s, unicode):
+        return s.encode('utf-8')
+    return s
@@ -4,6 +4,7 @@
 """This module converts translations to printable text."""
 
 import re
+import itertools
 import orthography
 
 SPACE = ' '
@@ -55,6 +56,9 @@ META_RE = re.compile(r"""(?:%s%s|%s%s|[^%s%s])+ # One or more of anything
 #                                   # doesn't contain unescaped { or }
 #             """, re.VERBOSE)
 
+# The number of distinct translation strings whose atoms are kept.
+ATOM_CACHE_SIZE = 4096
+
     
 class Formatter:
     """A state machine for converting Translation objects into printable text.
@@ -62,6 +66,11 @@ class Formatter:
     Instances of this class take in one Translation object at a time
     through the consume_translation method and output printable text.
 
+    The text of the translations that a new Translation leaves in
+    place is not computed again. The formatter keeps its state after
+    each translation and resumes from the first translation that
+    changed.
+
     """
     
     def __init__(self, 
@@ -86,6 +95,8 @@ class Formatter:
         self.engine_command_callback = engine_command_callback
         self.keystrokes = ''
         self.key_combos = []
+        self._rendering = _Rendering([])
+        self._atoms = {}
         self.translator.add_callback(self.consume_translation)
 
     def consume_translation(self, translation, overflow):
@@ -105,13 +116,13 @@ class Formatter:
                 self.engine_command_callback(cmd)
             return
 
-        num_backspaces = 0
-        non_backspaces = ''
         if overflow:
             tBuffer = [overflow] + self.translator.translations
         else:
             tBuffer = self.translator.translations
-        new_keystrokes, new_key_combos = self._translations_to_string(tBuffer)
+        rendering = self._render(self._rendering, tBuffer)
+        new_keystrokes = ''.join(rendering.text)
+        new_key_combos = list(rendering.key_combinations)
         old_length = len(self.keystrokes)
         new_length = len(new_keystrokes)
         
@@ -121,21 +132,14 @@ class Formatter:
         
         # Compare old keystrokes to new keystrokes and reconcile them
         # by emitting zero or more backspaces and zero or more
-        # keystrokes.
-        for i in range(min(old_length, new_length)):
-            if self.keystrokes[i] != new_keystrokes[i]:
-                num_backspaces += old_length - i
-                non_backspaces = new_keystrokes[i:]
-                break
-        else:
-            # The old keystrokes and new keystrokes don't differ except
-            # for one is the same as the other with additional keystrokes
-            # appended.  As such, keystrokes must be removed or added,
-            # depending on which string is longer.
-            if old_length > new_length:
-                num_backspaces += old_length - new_length
-            else:
-                non_backspaces = new_keystrokes[old_length:]
+        # keystrokes. Everything after the common prefix of the two is
+        # erased and typed again.
+        common_length = _common_prefix_length(self._rendering.text,
+                                              rendering.text,
+                                              self.keystrokes,
+                                              new_keystrokes)
+        num_backspaces = old_length - common_length
+        non_backspaces = new_keystrokes[common_length:]
 
         # Don't send key combinations again if they've already been
         # sent.
@@ -163,54 +167,78 @@ class Formatter:
 
         # Keep track of the current state in preparation for the next
         # call to this method.
-        self.keystrokes, self.key_combos = self._translations_to_string( \
-                                                  self.translator.translations)
+        if overflow:
+            rendering = self._drop_first_translation(rendering)
+            new_keystrokes = ''.join(rendering.text)
+        self._rendering = rendering
+        self.keystrokes = new_keystrokes
+        self.key_combos = list(rendering.key_combinations)
 
-    def _translations_to_string(self, translations):
-        """ Converts a list of Translation objects into printable text.
+    def _render(self, previous, translations):
+        """Converts a list of Translation objects into printable text.
 
-        Argument:
+        Arguments:
+
+        previous -- A _Rendering of an earlier list of translations.
+        The state it recorded after the translations that both lists
+        start with is reused rather than computed again.
 
         translations -- A list of Translation objects.
 
-        Returns a two-tuple, the first element of which is a printable
-        string and the second element of which is a list of index, key
-        combination pairs. Each key combination should be invoked
-        after the sum of the number of emulated characters of the
-        printable string and the number of emulated key combinations
-        is equal to index.
+        Returns a new _Rendering of the translations.
 
         """
-        text_length = 0
-        text = []
-        key_combinations = []
-        previous_atom = None
-        for translation in translations:
-            
-            if self._get_engine_command(translation):
-                continue
-            # Reduce the translation to atoms. An atom is in
-            # irreducible string that is either entirely a single meta
-            # command or entirely text containing no meta commands.
-            if translation.english is not None:
-                to_atomize = translation.english
-                if to_atomize.isdigit():
-                    to_atomize = self._apply_glue(to_atomize)
-                atoms = META_RE.findall(to_atomize)
-            else:
-                to_atomize = translation.rtfcre
-                if to_atomize.isdigit():
-                    to_atomize = self._apply_glue(to_atomize)
-                atoms = [to_atomize]
-            for atom in atoms:
-                atom = atom.strip()
+        n = 0
+        common = min(len(previous.translations), len(translations))
+        while n < common and _same_text(previous.translations[n],
+                                        translations[n]):
+            n += 1
+        rendering = _Rendering(translations)
+        if n:
+            rendering.restore(previous, n)
+        for translation in translations[n:]:
+            self._render_translation(rendering, translation)
+        return rendering
+
+    def _drop_first_translation(self, rendering):
+        """Render all but the first translation of a rendering.
+
+        Only the first translation is missing, so the renderings can
+        only differ until the state of the formatter is the same in
+        both after some translation. From there on the rest of the
+        given rendering is reused.
+
+        Argument:
+
+        rendering -- A _Rendering of at least one translation.
+
+        Returns a new _Rendering.
+
+        """
+        new = _Rendering(rendering.translations[1:])
+        for n, translation in enumerate(new.translations, 2):
+            self._render_translation(new, translation)
+            checkpoint = rendering.checkpoints[n - 1]
+            if (new.text and new.text[-1] == checkpoint[1] and
+                new.previous_atom == checkpoint[4]):
+                new.splice(rendering, n)
+                break
+        return new
+
+    def _render_translation(self, rendering, translation):
+        # Render one translation onto the state in rendering and record
+        # a checkpoint after it.
+        text = rendering.text
+        key_combinations = rendering.key_combinations
+        text_length = rendering.text_length
+        previous_atom = rendering.previous_atom
+        if not self._get_engine_command(translation):
+            for atom, meta, unescaped in self._get_atoms(translation):
                 if text:
                     space = SPACE
                 else:
                     space = NO_SPACE
-                meta = self._get_meta(atom)
                 if meta is not None:
-                    meta = self._unescape_atom(meta)
                     english = meta
                     space = NO_SPACE  # Correct for most meta commands.
                     old_text = ''
@@ -254,7 +282,7 @@ class Formatter:
                         text_length += 1
                     text_length -= len(old_text)
                 else:
-                    english = self._unescape_atom(atom)
+                    english = unescaped
 
                 # Check if the previous atom is a meta command that
                 # influences the next atom, namely this atom.
@@ -275,8 +303,44 @@ class Formatter:
                 text_length += len(new_text)
                 text.append(new_text)
                 previous_atom = atom
-
-        return (''.join(text), key_combinations)
+        rendering.text_length = text_length
+        rendering.previous_atom = previous_atom
+        rendering.checkpoint()
+
+    def _get_atoms(self, translation):
+        # Reduce the translation to atoms. An atom is in irreducible
+        # string that is either entirely a single meta command or
+        # entirely text containing no meta commands. Returns a list of
+        # (atom, unescaped meta command or None, unescaped atom)
+        # triples, which is cached per translation string.
+        if translation.english is not None:
+            key = (translation.english, None)
+        else:
+            key = (None, translation.rtfcre)
+        atoms = self._atoms.get(key)
+        if atoms is not None:
+            return atoms
+        if translation.english is not None:
+            to_atomize = translation.english
+            if to_atomize.isdigit():
+                to_atomize = self._apply_glue(to_atomize)
+            atoms = META_RE.findall(to_atomize)
+        else:
+            to_atomize = translation.rtfcre
+            if to_atomize.isdigit():
+                to_atomize = self._apply_glue(to_atomize)
+            atoms = [to_atomize]
+        triples = []
+        for atom in atoms:
+            atom = atom.strip()
+            meta = self._get_meta(atom)
+            if meta is not None:
+                meta = self._unescape_atom(meta)
+            triples.append((atom, meta, self._unescape_atom(atom)))
+        if len(self._atoms) >= ATOM_CACHE_SIZE:
+            self._atoms.clear()
+        self._atoms[key] = triples
+        return triples
 
     def _get_meta(self, atom):
         # Return the meta command, if any, without surrounding meta markups. 
@@ -304,3 +368,123 @@ class Formatter:
     def _apply_glue(self, s):
         # Mark the given string as a glue stroke.
         return META_START + META_GLUE_FLAG + s + META_END
+
+
+class _Rendering:
+    """The printable text of a list of Translation objects.
+
+    The class contains the following attributes:
+
+    text -- A list of strings that join to the printable text.
+
+    key_combinations -- A list of index, key combination pairs. Each
+    key combination should be invoked after the sum of the number of
+    emulated characters of the printable string and the number of
+    emulated key combinations is equal to index.
+
+    checkpoints -- The state of the formatter after each translation,
+    so that rendering a list that starts with the same translations
+    can resume from there. Meta commands only ever replace the last
+    piece of text, so a checkpoint only needs the number of text
+    pieces and the last one.
+
+    """
+
+    def __init__(self, translations):
+        """Start an empty rendering of a list of translations.
+
+        Argument:
+
+        translations -- The list of Translation objects to be rendered.
+
+        """
+        self.translations = list(translations)
+        self.checkpoints = []
+        self.text = []
+        self.key_combinations = []
+        self.text_length = 0
+        self.previous_atom = None
+
+    def checkpoint(self):
+        """Record the state after the latest rendered translation."""
+        if self.text:
+            top = self.text[-1]
+        else:
+            top = None
+        self.checkpoints.append((len(self.text), top, self.text_length,
+                                 len(self.key_combinations),
+                                 self.previous_atom))
+
+    def restore(self, rendering, n):
+        """Take the state of another rendering after n translations.
+
+        Arguments:
+
+        rendering -- A _Rendering whose first n translations are the
+        first n translations of this one.
+
+        n -- The number of translations to take over.
+
+        """
+        (text_items, top, self.text_length, combo_count,
+         self.previous_atom) = rendering.checkpoints[n - 1]
+        self.checkpoints = rendering.checkpoints[:n]
+        self.text = rendering.text[:text_items]
+        if text_items:
+            self.text[-1] = top
+        self.key_combinations = rendering.key_combinations[:combo_count]
+
+    def splice(self, rendering, n):
+        """Append the rest of a rendering whose state matches this one.
+
+        Arguments:
+
+        rendering -- A _Rendering whose state after n translations has
+        the same last piece of text and previous atom as the state of
+        this one, and whose translations after n are the remaining
+        translations of this one.
+
+        n -- The number of translations of rendering that the
+        translations rendered so far stand in for.
+
+        """
+        (text_items, top, text_length, combo_count,
+         previous_atom) = rendering.checkpoints[n - 1]
+        text_offset = text_items - len(self.text)
+        length_offset = text_length - self.text_length
+        combo_offset = combo_count - len(self.key_combinations)
+        self.text[-1:] = rendering.text[text_items - 1:]
+        self.key_combinations.extend((i - length_offset, combo) for i, combo
+                                     in rendering.key_combinations[combo_count:])
+        self.checkpoints.extend((t - text_offset, p, l - length_offset,
+                                 c - combo_offset, a) for t, p, l, c, a
+                                in rendering.checkpoints[n:])
+        self.text_length = rendering.text_length - length_offset
+        self.previous_atom = rendering.previous_atom
+
+
+def _same_text(translation, other):
+    # Return whether two translations render the same way. A translator
+    # may build a new Translation for the same strokes.
+    return translation is other or (translation.rtfcre == other.rtfcre and
+                                    translation.english == other.english)
+
+
+def _common_prefix_length(old_text, new_text, old_string, new_string):
+    # Return the length of the common prefix of two strings, which are
+    # the concatenations of the lists of text pieces old_text and
+    # new_text. Whole pieces are compared first and the rest is found
+    # by bisection, so that characters are only compared in C.
+    start = 0
+    for old_piece, new_piece in itertools.izip(old_text, new_text):
+        if old_piece != new_piece:
+            break
+        start += len(old_piece)
+    low, high = start, min(len(old_string), len(new_string))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if old_string[start:middle] == new_string[start:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
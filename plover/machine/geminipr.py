@@ -3,6 +3,7 @@
 
 """Thread-based monitoring of a Gemini PR stenotype machine."""
 
+import plover.steno
 import plover.machine.base
 
 # In the Gemini PR protocol, each packet consists of exactly six bytes
@@ -19,6 +20,11 @@ STENO_KEY_CHART = ("Fn","#","#","#","#","#","#",
                    "-P","-B","-L","-G","-T","-S","-D",
                    "#","#","#","#","#","#","-Z")
 
+# The steno key mask of each key in the chart. Keys that are not steno
+# keys, such as the function and power keys, have no bits.
+STENO_KEY_MASK_CHART = tuple(plover.steno.STENO_KEY_MASKS.get(k, 0)
+                             for k in STENO_KEY_CHART)
+
 BYTES_PER_STROKE = 6
 
 class Stenotype(plover.machine.base.SerialStenotypeBase):
@@ -50,12 +56,12 @@ class Stenotype(plover.machine.base.SerialStenotypeBase):
                 serial_port.flushInput()
                 continue
     
-            # Convert the raw to a list of steno keys.
-            steno_keys= []
+            # Convert the raw to a mask of steno keys.
+            steno_keys = 0
             for i, b in enumerate(raw):
                 for j in range(1,8):
                     if (b & (0x80 >> j)):
-                        steno_keys.append(STENO_KEY_CHART[i*7 + j-1])
+                        steno_keys |= STENO_KEY_MASK_CHART[i*7 + j-1]
                 
             # Notify all subscribers.
             self._notify(steno_keys)
@@ -3,6 +3,7 @@
 """Works like the Sidewinder layout, except it's all shifted up one row. It also provides double keys so you don't awkwardly have to press two keys with one finger."""
 
 from plover.machine.base import StenotypeBase
+from plover import steno
 from plover import keyboardcontrol
 
 KEYCODE_TO_STENO_KEY = {
@@ -53,6 +54,11 @@ KEYCODE_TO_STENO_KEY = {
     59: "-E -U", # ,
 }
 
+# Keys that stand for several steno keys list them separated by spaces.
+KEYCODE_TO_STENO_MASK = dict(
+    (k, steno.steno_keys_to_mask(v.split(" ")))
+    for k, v in KEYCODE_TO_STENO_KEY.iteritems())
+
 class Stenotype(StenotypeBase):
     """Modified version of the Microsoft Sidewinder X4 keyboard machine."""
 
@@ -89,12 +95,11 @@ class Stenotype(StenotypeBase):
         self._released_keys.add(event.keycode)
         # A stroke is complete if all pressed keys have been released.
         if self._down_keys == self._released_keys:
-            # Map pressed keys into steno keys and plit multi-key keys into
-            # individual keys.
-            steno_keys = []
+            # Map pressed keys into a mask of steno keys, which also
+            # splits multi-key keys into individual keys.
+            steno_keys = 0
             for k in self._down_keys:
-                if k in KEYCODE_TO_STENO_KEY:
-                    steno_keys.extend(KEYCODE_TO_STENO_KEY[k].split(" "))
+                steno_keys |= KEYCODE_TO_STENO_MASK.get(k, 0)
                 
             self._down_keys.clear()
             self._released_keys.clear()
@@ -4,6 +4,7 @@
 """For use with a Microsoft Sidewinder X4 keyboard used as stenotype machine."""
 
 from plover.machine.base import StenotypeBase
+from plover import steno
 from plover import keyboardcontrol
 
 KEYCODE_TO_STENO_KEY = {38: "S-",  # a
@@ -45,6 +46,9 @@ KEYCODE_TO_STENO_KEY = {38: "S-",  # a
                         20: "#",   # -
                         21: "#",}  # =
 
+KEYCODE_TO_STENO_MASK = dict((k, steno.STENO_KEY_MASKS[v])
+                             for k, v in KEYCODE_TO_STENO_KEY.iteritems())
+
 class Stenotype(StenotypeBase):
     """Standard stenotype interface for a Microsoft Sidewinder X4 keyboard.
 
@@ -87,8 +91,9 @@ class Stenotype(StenotypeBase):
         self._released_keys.add(event.keycode)
         # A stroke is complete if all pressed keys have been released.
         if self._down_keys == self._released_keys:
-            steno_keys = [KEYCODE_TO_STENO_KEY[k] for k in self._down_keys
-                          if k in KEYCODE_TO_STENO_KEY]
+            steno_keys = 0
+            for k in self._down_keys:
+                steno_keys |= KEYCODE_TO_STENO_MASK.get(k, 0)
             self._down_keys.clear()
             self._released_keys.clear()
             self._notify(steno_keys)
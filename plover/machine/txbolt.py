@@ -3,6 +3,7 @@
 
 """Thread-based monitoring of a stenotype machine using the TX Bolt protocol."""
 
+import plover.steno
 import plover.machine.base
 
 # In the TX Bolt protocol, there are four sets of keys grouped in
@@ -29,6 +30,9 @@ STENO_KEY_CHART = ("S-", "T-", "K-", "P-", "W-", "H-",  # 00
                    "-F", "-R", "-P", "-B", "-L", "-G",  # 10
                    "-T", "-S", "-D", "-Z", "#")         # 11
 
+STENO_KEY_MASK_CHART = tuple(plover.steno.STENO_KEY_MASKS[k]
+                             for k in STENO_KEY_CHART)
+
 
 class Stenotype(plover.machine.base.SerialStenotypeBase):
     """TX Bolt interface.
@@ -44,7 +48,7 @@ class Stenotype(plover.machine.base.SerialStenotypeBase):
         self._reset_stroke_state()
     
     def _reset_stroke_state(self):
-        self._pressed_keys = []
+        self._pressed_keys = 0
         self._last_key_set = 0
         self._last_byte = 0
 
@@ -62,7 +66,7 @@ class Stenotype(plover.machine.base.SerialStenotypeBase):
             if isinstance(raw, str):
                 raw = [ord(x) for x in raw]
 
-            if not raw and len(self._pressed_keys) > 0:
+            if not raw and self._pressed_keys:
                 self._finish_stroke()
                 continue
 
@@ -75,4 +79,4 @@ class Stenotype(plover.machine.base.SerialStenotypeBase):
                     self._last_byte = byte
                     for i in xrange(6):
                         if (byte >> i) & 1:
-                            self._pressed_keys.append(STENO_KEY_CHART[(key_set * 6) + i])
+                            self._pressed_keys |= STENO_KEY_MASK_CHART[(key_set * 6) + i]
@@ -4,24 +4,30 @@
 """Generic stenography data models and translation engine.
 
 This module is the foundation for manipulating and understanding the
-output of a stenotype machine. Three classes copmose this module:
+output of a stenotype machine. Four classes copmose this module:
 
-Stroke -- A data model class that encapsulates a sequence of steno
-keys, which might be ASCII or raw binary data, in the context of a
-particular normalized dictionary format, essentially abstracting away
-the details of a particular stenotype machine's formatting.
+Stroke -- A data model class that encapsulates a set of steno keys,
+given as key names or as a bit mask of STENO_KEY_MASKS, in the context
+of a particular normalized dictionary format, essentially abstracting
+away the details of a particular stenotype machine's formatting.
 
 Translation -- A data model class that encapsulates a sequence of
 Stroke objects in the context of a particular dictionary. The
 dictionary in question maps stroke sequences to strings, which are
 typically English words or phrases, but could also be meta commands.
 
+StrokeIndex -- The stroke sequences a dictionary can continue, which
+lets a Translator find the longest translation in a single pass.
+
 Translator -- A state machine that takes in a single Stroke object at
 a time and emits one or more Translation objects based on a greedy
 conversion algorithm.
 
 """
 
+import itertools
+import collections
+
 STENO_KEY_NUMBERS = { 'S-':'1-', 
                       'T-': '2-',
                       'P-': '3-',
@@ -59,8 +65,43 @@ STENO_KEY_ORDER = {"#": -1,
 
 STENO_KEYS = tuple(STENO_KEY_ORDER.keys())
 
+# One bit per steno key, in steno order, so that a stroke fits in a
+# 23-bit integer.
+_ORDERED_STENO_KEYS = tuple(sorted(STENO_KEYS, key=STENO_KEY_ORDER.get))
+STENO_KEY_MASKS = dict((k, 1 << i) for i, k in enumerate(_ORDERED_STENO_KEYS))
+
+# Maps (mask, dictionary format) pairs to the ordered steno keys and
+# the RTF/CRE string of a stroke, so that each distinct chord is only
+# formatted once whichever dictionary format it is formatted for.
+_stroke_cache = {}
+
+
+def steno_keys_to_mask(steno_keys):
+    """Return the bit mask of a sequence of steno keys.
+
+    Arguments:
+
+    steno_keys -- A sequence of stenographic keys given in STENO_KEYS.
+
+    """
+    mask = 0
+    for k in steno_keys:
+        mask |= STENO_KEY_MASKS[k]
+    return mask
+
+
+def mask_to_steno_keys(mask):
+    """Return the steno keys in a bit mask, in steno order.
+
+    Arguments:
 
-class Stroke :
+    mask -- An integer made of values of STENO_KEY_MASKS.
+
+    """
+    return [k for k in _ORDERED_STENO_KEYS if mask & STENO_KEY_MASKS[k]]
+
+
+class Stroke(object):
     """A standardized data model for stenotype machine strokes.
 
     This class standardizes the representation of a stenotype chord
@@ -73,16 +114,24 @@ class Stroke :
     combines the keys into a single string (called RTFCRE for
     historical reasons) according to a particular dictionary format.
 
+    A stroke is backed by a bit mask of its keys. Strokes with the same
+    keys compare and hash as their masks, and the formatting of each
+    mask is cached so that repeated chords cost a dictionary lookup.
+
     """
-        
+
+    __slots__ = ('mask', 'steno_keys', 'dictionary_format', 'rtfcre',
+                 'is_correction')
+
     def __init__(self, steno_keys, dictionary_format) :
         """Create a steno stroke by formatting steno keys.
 
         Arguments:
 
-        steno_keys -- A sequence of unordered stenographic keys
-        composing this stroke. Valid stenographic keys are given in
-        STENO_KEYS.
+        steno_keys -- Either a sequence of unordered stenographic keys
+        composing this stroke, where valid stenographic keys are given
+        in STENO_KEYS, or an integer mask of such keys as given by
+        STENO_KEY_MASKS.
 
         dictionary_format -- A Python module that encapsulates a
         specific stenographic dictionary format. Typically, this is
@@ -91,27 +140,17 @@ class Stroke :
         toRTFCRE method that takes in a sequence and returns a string.
         
         """
-
-        # Remove duplicate keys and save local versions of the input
-        # parameters.
-        self.steno_keys = list(set(steno_keys))
+        if isinstance(steno_keys, (int, long)):
+            self.mask = steno_keys
+        else:
+            self.mask = steno_keys_to_mask(steno_keys)
         self.dictionary_format = dictionary_format
-
-        # Order the steno keys so comparisons can be made.
-        self.steno_keys.sort(key=lambda x: STENO_KEY_ORDER[x])
-                
-        # Convert strokes involving the number bar to numbers.
-        if '#' in self.steno_keys:
-            numeral = False
-            for i, e in enumerate(self.steno_keys):
-                if e in STENO_KEY_NUMBERS:
-                    self.steno_keys[i] = STENO_KEY_NUMBERS[e]
-                    numeral = True
-            if numeral:
-                self.steno_keys.remove('#')
-
-        # Convert the list of steno keys to the RTF/CRE format.
-        self.rtfcre = self.dictionary_format.toRTFCRE(self.steno_keys)
+        key = (self.mask, dictionary_format)
+        try:
+            self.steno_keys, self.rtfcre = _stroke_cache[key]
+        except KeyError:
+            self.steno_keys, self.rtfcre = _stroke_cache.setdefault(
+                key, _format_stroke(self.mask, dictionary_format))
 
         # Determine if this stroke is a correction stroke.
         self.is_correction = (self.rtfcre == '*')
@@ -124,15 +163,37 @@ class Stroke :
         return '%sStroke(%s : %s)' % (prefix, self.rtfcre, self.steno_keys)
     
     def __eq__(self, other):
-        return isinstance(other, Stroke) and self.steno_keys==other.steno_keys
+        return isinstance(other, Stroke) and self.mask == other.mask
 
     def __ne__(self, other):
         return not self.__eq__(other)
+
+    def __hash__(self):
+        return self.mask
     
     def __repr__(self):
         return str(self)
 
 
+def _format_stroke(mask, dictionary_format):
+    # Return the ordered steno keys of a mask, with number bar strokes
+    # converted to numbers, and their RTF/CRE string.
+    steno_keys = mask_to_steno_keys(mask)
+                
+    # Convert strokes involving the number bar to numbers.
+    if '#' in steno_keys:
+        numeral = False
+        for i, e in enumerate(steno_keys):
+            if e in STENO_KEY_NUMBERS:
+                steno_keys[i] = STENO_KEY_NUMBERS[e]
+                numeral = True
+        if numeral:
+            steno_keys.remove('#')
+
+    # Convert the list of steno keys to the RTF/CRE format.
+    return tuple(steno_keys), dictionary_format.toRTFCRE(steno_keys)
+
+
 class Translation :
     """A data model for the mapping between a sequence of Strokes and a string.
 
@@ -200,6 +261,58 @@ class Translation :
         return 0
     
 
+class StrokeIndex :
+    """An index of the stroke sequences that keys in a dictionary extend.
+
+    A dictionary key is a sequence of RTF/CRE strokes joined by a
+    delimiter. This class records every proper prefix of those
+    sequences, so that a Translator looking for the longest translation
+    starting at a given stroke can stop adding strokes as soon as no key
+    begins with the strokes it already has. The class contains the
+    following attributes:
+
+    prefixes -- A container of strings that supports the 'in'
+    operator. A string is in it if it is a proper prefix, made of whole
+    strokes, of some key in the dictionary.
+
+    max_number_of_strokes -- The largest number of strokes in any key
+    in the dictionary.
+
+    """
+
+    def __init__(self, dictionary, delimiter):
+        """Index the keys of a dictionary.
+
+        A dictionary loaded by plover.dictionary.compiled already
+        carries this index in its cache file, in which case it is used
+        as is rather than rebuilt from the keys.
+
+        Arguments:
+
+        dictionary -- A dictionary that maps strings in RTF/CRE format
+        to English phrases or meta commands.
+
+        delimiter -- The string that separates strokes in the keys of
+        the dictionary.
+
+        """
+        if (hasattr(dictionary, 'stroke_prefixes') and
+            dictionary.stroke_delimiter == delimiter):
+            self.prefixes = dictionary.stroke_prefixes
+            self.max_number_of_strokes = dictionary.max_number_of_strokes
+            return
+        self.prefixes = set()
+        self.max_number_of_strokes = 0
+        for rtfcre in dictionary.iterkeys() :
+            strokes = rtfcre.split(delimiter)
+            self.max_number_of_strokes = max(self.max_number_of_strokes,
+                                             len(strokes))
+            prefix = strokes[0]
+            for stroke in strokes[1:] :
+                self.prefixes.add(prefix)
+                prefix = prefix + delimiter + stroke
+
+
 class Translator :
     """Converts a stenotype key stream to a translation stream.
 
@@ -211,7 +324,10 @@ class Translator :
     translated into a sequence of Translation objects. The resulting
     sequence of Translations is compared to those previously emitted
     by the state machine and a sequence of new Translations (some
-    corrections and some new) is emitted.
+    corrections and some new) is emitted. Only the Translations that
+    could include the newest Stroke are translated again, so the work
+    per Stroke depends on the longest dictionary entry rather than on
+    the length of the FIFO.
 
     The internal Stroke FIFO is translated in a greedy fashion; the
     Translator finds a translation for the longest sequence of Strokes
@@ -258,24 +374,23 @@ class Translator :
         FIFO. This should generally be the longest sequence of strokes
         expected to be a valid translation. If None, this value
         defaults to the longest sequence of strokes found in the
-        dictionary argument. This value should generally be left
-        unchanged from its default of None.
+        dictionary argument, as recorded by its StrokeIndex. This
+        value should generally be left unchanged from its default of
+        None.
 
         """
         self.steno_machine = steno_machine
-        self.strokes = []
         self.translations = []
         self.overflow = None
         self.dictionary = dictionary
         self.dictionary_format = dictionary_format
         self.subscribers = []
+        self.stroke_index = StrokeIndex(dictionary,
+                                        dictionary_format.STROKE_DELIMITER)
         if max_number_of_strokes is None :
-            max_number_of_strokes = 0
-            delimiter = dictionary_format.STROKE_DELIMITER
-            for rtfcre in dictionary.keys() :
-                max_number_of_strokes = max(max_number_of_strokes, 
-                                            len(rtfcre.split(delimiter)))
+            max_number_of_strokes = self.stroke_index.max_number_of_strokes
         self.max_number_of_strokes = max_number_of_strokes
+        self.strokes = collections.deque(maxlen=max_number_of_strokes)
         self.steno_machine.add_callback(self.consume_steno_keys)
 
     def consume_steno_keys(self, steno_keys):
@@ -287,7 +402,8 @@ class Translator :
 
         Arguments:
 
-        steno_keys -- The raw output from a stenotype machine.
+        steno_keys -- The raw output from a stenotype machine, either
+        a sequence of steno keys or their mask.
 
         """
         if steno_keys :
@@ -306,35 +422,47 @@ class Translator :
         """
         # If stroke buffer is full, discard all strokes of oldest
         # translation to make room for the new stroke.
-        if stroke.is_correction and len(self.strokes) > 0:
+        corrected = stroke.is_correction and len(self.strokes) > 0
+        if corrected:
             self.strokes.pop()
         self.overflow = None
         if len(self.strokes) >= self.max_number_of_strokes:
             self.overflow = self.translations.pop(0)
             for s0 in self.overflow.strokes:
-                s1 = self.strokes.pop(0) 
+                s1 = self.strokes.popleft()
                 if s0 != s1:
                     raise(RuntimeError("Steno stroke buffers out of sync."))
+        # The index of the stroke that was just undone or is added.
+        changed = len(self.strokes)
         if not stroke.is_correction:
             self.strokes.append(stroke)
 
-        # Convert Strokes to Translations.  Strokes are converted
-        # oldest to newest and each Translation is constructed to use
-        # as many Strokes as possible. If a Translation with a proper
-        # dictionary entry can't be constructed, then a Translation
-        # containing only the first Stroke is created.
-        new_translations = []
-        n = 0 
+        # Translations are built greedily from the oldest stroke, so
+        # only those that start close enough to the changed stroke to
+        # include it can differ. Keep the translations before them and
+        # walk back from the end of the buffer to find where to resume.
+        reach = max(self.stroke_index.max_number_of_strokes, 1)
+        kept = len(self.translations)
+        n = changed + 1 if corrected else changed
+        while kept > 0:
+            start = n - len(self.translations[kept - 1])
+            if start + reach <= changed:
+                break
+            kept -= 1
+            n = start
+
+        # Convert the remaining Strokes to Translations.  Strokes are
+        # converted oldest to newest and each Translation is
+        # constructed to use as many Strokes as possible. If a
+        # Translation with a proper dictionary entry can't be
+        # constructed, then a Translation containing only the first
+        # Stroke is created.
+        new_translations = self.translations[:kept]
         while n != len(self.strokes):
-            unused = self.strokes[n:]
-            for i in range(len(unused),0,-1):
-                longest_translation = Translation(unused[:i], self.dictionary)
-                if longest_translation.english != None:
-                    break
-            else:
-                longest_translation = Translation(unused[0:1], self.dictionary)
-            new_translations.append(longest_translation)
-            n += len(longest_translation)
+            i = self._longest_match(n)
+            strokes = list(itertools.islice(self.strokes, n, n + i))
+            new_translations.append(Translation(strokes, self.dictionary))
+            n += i
 
         # Update translation buffer, but keep track of previous state.
         old_translations = self.translations
@@ -342,8 +470,10 @@ class Translator :
 
         # Compare old translations to the new translations and
         # reconcile them by emitting one or more tokens, where a token
-        # is either a correction or a translation.
-        for i in range(min(len(old_translations), len(new_translations))):
+        # is either a correction or a translation. The kept
+        # translations are the same on both sides.
+        for i in range(kept, min(len(old_translations),
+                                 len(new_translations))):
             if old_translations[i] != new_translations[i]:
                 # Emit corrections for each remaining element in
                 # old_translations after the two lists differ.
@@ -366,6 +496,25 @@ class Translator :
                 for t in new_translations[len(old_translations):] :
                     self._emit_translation(t)
 
+    def _longest_match(self, start):
+        # Return the number of strokes, starting at index start of the
+        # stroke buffer, in the longest sequence with a dictionary
+        # entry, or 1 if there is none. Strokes are added one at a
+        # time until the stroke index shows that no key continues the
+        # sequence, so each stroke is looked at once.
+        delimiter = self.dictionary_format.STROKE_DELIMITER
+        prefixes = self.stroke_index.prefixes
+        match = 1
+        rtfcre = self.strokes[start].rtfcre
+        i = 1
+        while True:
+            if self.dictionary.get(rtfcre) is not None:
+                match = i
+            if start + i == len(self.strokes) or rtfcre not in prefixes:
+                return match
+            rtfcre = rtfcre + delimiter + self.strokes[start + i].rtfcre
+            i += 1
+
     def add_callback(self, callback) :
         """Subscribes a function to receive new trasnlations.
 
@@ -0,0 +1,530 @@
+# Copyright (c) 2011 Pragma Nolint.
+# See LICENSE.txt for details.
+
+"""
+Analyze the session files of strokes typed and write a summary of them.
+
+The strokes of every session are loaded into numpy arrays, one per column
+of the stroke records, and everything is worked out with array operations:
+how long each chord takes to type, how often each chord, key and finger is
+typed wrong, and how the speed on each lesson changes over the sessions.
+The summary is what word choosers use to weight chords by how hard the
+user finds them.
+
+Call from main game directory to analyze every session:
+    python -m statistics.analyze
+
+or give session files to analyze only those.
+"""
+
+# Hack so that all modules can be imported from Fly,
+# but this can be run just by calling it as a script.
+import sys, os
+sys.path.append(os.path.dirname(os.getcwd()))
+
+import glob
+import zlib
+import argparse
+
+import numpy
+
+import logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+import fly.utils.files as fileutils
+from fly.statistics import summary as summaryfile
+from fly.statistics.helpers import strokelog
+from fly.translation import chordfeatures
+
+# Stroke records as laid out in session files, see strokelog.RECORD.
+RECORD_DTYPE = numpy.dtype([('milliseconds', '<u4'), ('latency', '<u4'),
+                            ('target', '<u2'), ('entered', '<u2'),
+                            ('lesson', '<u2'), ('outcome', 'u1')])
+
+# Percentiles of the time taken to type each chord.
+PERCENTILES = (50, 90, 99)
+
+# Words taking longer than this are counted as taking this long for speed,
+# so that breaks don't count as typing.
+MAX_WORD_SECONDS = 10.0
+
+# Chords typed fewer times than this get no difficulty.
+MIN_ATTEMPTS = 3
+
+# Difficulty of a chord is its time to type relative to the median chord,
+# raised by its error rate times ERROR_FACTOR, within these bounds.
+ERROR_FACTOR = 4.0
+MIN_DIFFICULTY = 0.5
+MAX_DIFFICULTY = 4.0
+
+# Finger that presses each steno key, as usually fingered.
+FINGERS = {'#': "number bar",
+           'S-': "left pinky", 'T-': "left ring", 'K-': "left ring",
+           'P-': "left middle", 'W-': "left middle", 'H-': "left index",
+           'R-': "left index", 'A-': "left thumb", 'O-': "left thumb",
+           '*': "index", '-E': "right thumb", '-U': "right thumb",
+           '-F': "right index", '-R': "right index", '-P': "right middle",
+           '-B': "right middle", '-L': "right ring", '-G': "right ring",
+           '-T': "right pinky", '-S': "right pinky", '-D': "right pinky",
+           '-Z': "right pinky"}
+
+COLUMNS = {"chords": ["attempts", "errors", "error_rate"] +
+                     ["p%d" % percentile for percentile in PERCENTILES] +
+                     ["difficulty"],
+           "keys": ["attempts", "errors", "error_rate"],
+           "fingers": ["attempts", "errors", "error_rate"],
+           "lessons": ["sessions", "words", "words_per_min",
+                       "fraction_accurate", "words_per_min_change"],
+           "speeds": ["start_time", "lesson", "words", "words_per_min",
+                      "fraction_accurate"]}
+
+
+class SessionStrokes(object):
+
+    """Strokes of many sessions, with one numpy array per column.
+
+    Chords and lesson names are numbers in C{names}, shared by all
+    sessions.
+
+    Attributes:
+        - names: chords and lesson names
+        - start_times: when each session started, in seconds since the
+          epoch
+        - session: session of each stroke
+        - time: when each stroke was captured, in seconds since the epoch
+        - latency: seconds since the previous word was finished
+        - target, entered, lesson: chord to type, chord entered and lesson
+          of each stroke, as numbers in names
+        - outcome: strokelog.RIGHT, WRONG or UNFINISHED
+    """
+
+    def __init__(self, names, start_times, session, milliseconds, latency,
+                 target, entered, lesson, outcome):
+        self.names = names
+        self.start_times = numpy.asarray(start_times, dtype=numpy.float64)
+        self.session = session
+        self.time = self.start_times[session] + milliseconds / 1000.0
+        self.latency = latency / 1000.0
+        self.target = target
+        self.entered = entered
+        self.lesson = lesson
+        self.outcome = outcome
+
+    def __len__(self):
+        return len(self.session)
+
+
+def load_sessions(file_paths):
+
+    """Load the strokes of session files into arrays.
+
+    Files that are not session files are logged and left out.
+
+    @param file_paths: session files
+    @type file_paths: list of str
+
+    @rtype: L{SessionStrokes}
+    """
+
+    names = []
+    numbers = {}
+    start_times = []
+    blocks = []
+    for file_path in file_paths:
+        try:
+            start_time, session_blocks = strokelog.read_blocks(file_path)
+        except (IOError, ValueError, zlib.error) as e:
+            logger.warning("Skipping %s: %s" % (file_path, e))
+            continue
+        session = len(start_times)
+        start_times.append(start_time)
+        for table_strings, count, records in session_blocks:
+            # Numbers of the block's table in the shared names.
+            renumbered = []
+            for string in table_strings:
+                if string not in numbers:
+                    numbers[string] = len(names)
+                    names.append(string)
+                renumbered.append(numbers[string])
+            renumbered = numpy.array(renumbered, dtype=numpy.int32)
+            block = numpy.frombuffer(records, dtype=RECORD_DTYPE,
+                                     count=count)
+            blocks.append((numpy.full(count, session, dtype=numpy.int32),
+                           block, renumbered))
+
+    def join(column):
+        if not blocks:
+            return numpy.zeros(0, dtype=RECORD_DTYPE[column])
+        return numpy.concatenate([block[column] for _, block, _ in blocks])
+
+    def join_numbers(column):
+        if not blocks:
+            return numpy.zeros(0, dtype=numpy.int32)
+        return numpy.concatenate([renumbered[block[column]]
+                                  for _, block, renumbered in blocks])
+
+    session = numpy.concatenate([sessions for sessions, _, _ in blocks]) \
+              if blocks else numpy.zeros(0, dtype=numpy.int32)
+    return SessionStrokes(names, start_times, session,
+                          join('milliseconds').astype(numpy.float64),
+                          join('latency').astype(numpy.float64),
+                          join_numbers('target'), join_numbers('entered'),
+                          join_numbers('lesson'), join('outcome'))
+
+
+def get_latency_percentiles(strokes, percentiles=PERCENTILES):
+
+    """Work out percentiles of the time taken to type each chord right.
+
+    @param strokes: strokes loaded
+    @param percentiles: percentiles to work out, from 0 to 100
+
+    @type strokes: L{SessionStrokes}
+    @type percentiles: sequence of float
+
+    @return: row for each name, column for each percentile, in seconds,
+             NaN for names never typed right
+    @rtype: numpy array of float
+    """
+
+    right = strokes.outcome == strokelog.RIGHT
+    target = strokes.target[right]
+    latency = strokes.latency[right]
+    order = numpy.lexsort((latency, target))
+    latency = latency[order]
+
+    counts = numpy.bincount(target, minlength=len(strokes.names))
+    starts = numpy.cumsum(counts) - counts
+    typed = counts > 0
+    result = numpy.full((len(strokes.names), len(percentiles)), numpy.nan)
+    for column, percentile in enumerate(percentiles):
+        # Interpolate between the latencies either side, as numpy does.
+        position = starts[typed] + (counts[typed] - 1) * (percentile / 100.0)
+        below = numpy.floor(position).astype(numpy.int64)
+        above = numpy.ceil(position).astype(numpy.int64)
+        fraction = position - below
+        result[typed, column] = (latency[below] * (1 - fraction) +
+                                 latency[above] * fraction)
+    return result
+
+
+def get_chord_errors(strokes):
+
+    """Count how often each chord was typed, and typed wrong.
+
+    @param strokes: strokes loaded
+    @type strokes: L{SessionStrokes}
+
+    @return: finished attempts and errors of each name
+    @rtype: tuple of (numpy array of int, numpy array of int)
+    """
+
+    count = len(strokes.names)
+    finished = strokes.outcome != strokelog.UNFINISHED
+    wrong = strokes.outcome == strokelog.WRONG
+    return (numpy.bincount(strokes.target[finished], minlength=count),
+            numpy.bincount(strokes.target[wrong], minlength=count))
+
+
+def get_key_matrix(chords):
+
+    """Find the keys pressed in each chord, over all its strokes.
+
+    @param chords: steno chords
+    @type chords: list of str
+
+    @return: row for each chord, column for each of
+             L{chordfeatures.STENO_KEYS}, true where the key is pressed
+    @rtype: numpy array of bool
+    """
+
+    columns = dict((key, column)
+                   for column, key in enumerate(chordfeatures.STENO_KEYS))
+    matrix = numpy.zeros((len(chords), len(columns)), dtype=bool)
+    for row, chord in enumerate(chords):
+        for stroke in chord.split(chordfeatures.STROKE_DELIMITER):
+            for key in chordfeatures.get_stroke_keys(stroke):
+                matrix[row, columns[key]] = True
+    return matrix
+
+
+def get_key_errors(strokes, key_matrix):
+
+    """Count how often each key was used, and got wrong.
+
+    A key is got wrong in a stroke that finished a word wrong if it was
+    pressed and should not have been, or should have been and was not.
+
+    @param strokes: strokes loaded
+    @param key_matrix: keys of each name, from L{get_key_matrix}
+
+    @type strokes: L{SessionStrokes}
+    @type key_matrix: numpy array of bool
+
+    @return: attempts and errors of each key
+    @rtype: tuple of (numpy array of int, numpy array of int)
+    """
+
+    used, wrong_keys = _get_key_use(strokes, key_matrix)
+    return used.sum(axis=0), wrong_keys.sum(axis=0)
+
+
+def get_finger_errors(strokes, key_matrix, fingers):
+
+    """Count how often each finger was used, and got a key wrong.
+
+    @param strokes: strokes loaded
+    @param key_matrix: keys of each name, from L{get_key_matrix}
+    @param fingers: finger names, in the order to count them
+
+    @type strokes: L{SessionStrokes}
+    @type key_matrix: numpy array of bool
+    @type fingers: list of str
+
+    @return: attempts and errors of each finger
+    @rtype: tuple of (numpy array of int, numpy array of int)
+    """
+
+    finger_matrix = numpy.array([[FINGERS[key] == finger
+                                  for finger in fingers]
+                                 for key in chordfeatures.STENO_KEYS],
+                                dtype=numpy.int32)
+    used, wrong_keys = _get_key_use(strokes, key_matrix)
+    used_fingers = used.astype(numpy.int32).dot(finger_matrix) > 0
+    wrong_fingers = wrong_keys.astype(numpy.int32).dot(finger_matrix) > 0
+    return used_fingers.sum(axis=0), wrong_fingers.sum(axis=0)
+
+
+def _get_key_use(strokes, key_matrix):
+
+    """Find the keys used in each finished stroke, and those got wrong.
+
+    @return: row for each finished stroke, column for each key
+    @rtype: tuple of (numpy array of bool, numpy array of bool)
+    """
+
+    finished = strokes.outcome != strokelog.UNFINISHED
+    target_keys = key_matrix[strokes.target[finished]]
+    entered_keys = key_matrix[strokes.entered[finished]]
+    wrong = (strokes.outcome[finished] == strokelog.WRONG)[:, numpy.newaxis]
+    return target_keys | entered_keys, (target_keys ^ entered_keys) & wrong
+
+
+def get_speeds(strokes):
+
+    """Work out the speed and accuracy in each session on each lesson.
+
+    @param strokes: strokes loaded
+    @type strokes: L{SessionStrokes}
+
+    @return: session, lesson, words typed right, words per minute and
+             fraction accurate of each session on each lesson, ordered by
+             lesson then session
+    @rtype: tuple of numpy arrays
+    """
+
+    finished = strokes.outcome != strokelog.UNFINISHED
+    session = strokes.session[finished]
+    lesson = strokes.lesson[finished]
+    right = strokes.outcome[finished] == strokelog.RIGHT
+    seconds = numpy.minimum(strokes.latency[finished], MAX_WORD_SECONDS)
+
+    session_count = len(strokes.start_times)
+    groups, group = numpy.unique(lesson.astype(numpy.int64) * session_count +
+                                 session, return_inverse=True)
+    words = numpy.bincount(group, weights=right).astype(numpy.int64)
+    attempts = numpy.bincount(group)
+    seconds = numpy.bincount(group, weights=seconds)
+    words_per_min = 60.0 * words / numpy.maximum(seconds, 0.001)
+    fraction_accurate = words / attempts.astype(numpy.float64)
+    return (groups % session_count, groups // session_count, words,
+            words_per_min, fraction_accurate)
+
+
+def get_trends(lesson, values):
+
+    """Fit a line to values of each lesson over its sessions.
+
+    @param lesson: lesson of each value, ordered by lesson then session
+    @param values: e.g. words per minute in each session
+
+    @type lesson: numpy array of int
+    @type values: numpy array of float
+
+    @return: lessons, and change in value per session of each, 0 if only
+             one session
+    @rtype: tuple of (numpy array of int, numpy array of float)
+    """
+
+    lessons, first, group = numpy.unique(lesson, return_index=True,
+                                         return_inverse=True)
+    # Number of each session within its lesson.
+    x = numpy.arange(len(lesson)) - first[group]
+    counts = numpy.bincount(group).astype(numpy.float64)
+    x_offset = x - (numpy.bincount(group, weights=x) / counts)[group]
+    y_offset = values - (numpy.bincount(group, weights=values) / counts)[group]
+    covariance = numpy.bincount(group, weights=x_offset * y_offset)
+    variance = numpy.bincount(group, weights=x_offset * x_offset)
+    slopes = numpy.zeros(len(lessons))
+    fitted = variance > 0
+    slopes[fitted] = covariance[fitted] / variance[fitted]
+    return lessons, slopes
+
+
+def get_difficulties(attempts, errors, median_latency):
+
+    """Score how hard each chord is for the user, around 1.
+
+    @param attempts: finished attempts of each chord
+    @param errors: errors of each chord
+    @param median_latency: median seconds to type each chord right
+
+    @type attempts: numpy array of int
+    @type errors: numpy array of int
+    @type median_latency: numpy array of float
+
+    @return: difficulty of each chord, NaN if typed too few times
+    @rtype: numpy array of float
+    """
+
+    typed = attempts >= MIN_ATTEMPTS
+    error_rate = errors / numpy.maximum(attempts, 1).astype(numpy.float64)
+    timed = typed & ~numpy.isnan(median_latency)
+    relative_latency = numpy.ones(len(attempts))
+    if timed.any():
+        typical = numpy.median(median_latency[timed])
+        if typical > 0:
+            relative_latency[timed] = median_latency[timed] / typical
+    difficulties = numpy.clip((1 + ERROR_FACTOR * error_rate) *
+                              relative_latency, MIN_DIFFICULTY,
+                              MAX_DIFFICULTY)
+    difficulties[~typed] = numpy.nan
+    return difficulties
+
+
+def summarize(strokes):
+
+    """Work out the summary of the strokes.
+
+    @param strokes: strokes loaded
+    @type strokes: L{SessionStrokes}
+
+    @return: summary, as written by L{statistics.summary.write_summary}
+    @rtype: dict
+    """
+
+    names = strokes.names
+    attempts, errors = get_chord_errors(strokes)
+    latencies = get_latency_percentiles(strokes)
+    difficulties = get_difficulties(attempts, errors, latencies[:, 0])
+    chords = {}
+    for row in numpy.flatnonzero(attempts):
+        chords[names[row]] = _get_row(
+            [attempts[row], errors[row], errors[row] / float(attempts[row])] +
+            list(latencies[row]) + [difficulties[row]])
+
+    key_matrix = get_key_matrix(names)
+    fingers = sorted(set(FINGERS.values()))
+    tables = {"chords": chords}
+    for table, labels, (used, wrong) in [
+        ("keys", chordfeatures.STENO_KEYS,
+         get_key_errors(strokes, key_matrix)),
+        ("fingers", fingers,
+         get_finger_errors(strokes, key_matrix, fingers))]:
+        tables[table] = dict(
+            (label, _get_row([used[i], wrong[i],
+                              wrong[i] / float(max(used[i], 1))]))
+            for i, label in enumerate(labels) if used[i])
+
+    session, lesson, words, words_per_min, fraction_accurate = \
+        get_speeds(strokes)
+    speeds = [_get_row([strokes.start_times[session[i]], names[lesson[i]],
+                        words[i], words_per_min[i], fraction_accurate[i]])
+              for i in xrange(len(session))]
+    lessons = {}
+    trend_lessons, slopes = get_trends(lesson, words_per_min)
+    last = numpy.searchsorted(lesson, trend_lessons, side='right') - 1
+    for i, row in enumerate(trend_lessons):
+        sessions = numpy.count_nonzero(lesson == row)
+        lessons[names[row]] = _get_row(
+            [sessions, words[lesson == row].sum(), words_per_min[last[i]],
+             fraction_accurate[last[i]], slopes[i]])
+    tables.update(lessons=lessons, speeds=speeds)
+
+    return dict(tables, columns=COLUMNS, sessions=len(strokes.start_times),
+                strokes=len(strokes))
+
+
+def _get_row(values):
+
+    """Make a row of the summary JSON friendly and short.
+
+    @rtype: list
+    """
+
+    row = []
+    for value in values:
+        if isinstance(value, (int, long, numpy.integer)):
+            row.append(int(value))
+        elif isinstance(value, (float, numpy.floating)):
+            row.append(None if numpy.isnan(value) else round(value, 3))
+        else:
+            row.append(value)
+    return row
+
+
+def report(summary, count=10):
+
+    """Print what the user finds hardest, and how fast they are typing."""
+
+    def print_hardest(table, column):
+        rows = summaryfile.get_rows(summary, table)
+        hardest = sorted((row for row in rows.iteritems()
+                          if row[1][column] is not None),
+                         key=lambda row: -row[1][column])[:count]
+        print("Hardest %s by %s:" % (table, column))
+        for name, row in hardest:
+            print("  %-20s %8.3f  (%d attempts)" % (name, row[column],
+                                                     row["attempts"]))
+
+    print("%d strokes in %d sessions" % (summary["strokes"],
+                                         summary["sessions"]))
+    print_hardest("chords", "difficulty")
+    print_hardest("keys", "error_rate")
+    print_hardest("fingers", "error_rate")
+    print("Speed on each lesson:")
+    lessons = summaryfile.get_rows(summary, "lessons")
+    for name, row in sorted(lessons.iteritems()):
+        print("  %-20s %6.1f wpm, %+.1f wpm per session over %d" %
+              (name, row["words_per_min"], row["words_per_min_change"],
+               row["sessions"]))
+
+
+def main(argv=None):
+
+    """Analyze the session files given on the command line."""
+
+    parser = argparse.ArgumentParser(description="Summarize the session "
+                                     "files of strokes typed.")
+    parser.add_argument("sessions", nargs="*", help="session files, by "
+                        "default every one in the sessions directory")
+    parser.add_argument("--output", help="summary file to write, by "
+                        "default the one the game reads")
+    parser.add_argument("--top", type=int, default=10, help="how many of "
+                        "the hardest chords, keys and fingers to print")
+    arguments = parser.parse_args(argv)
+
+    file_paths = arguments.sessions or sorted(glob.glob(os.path.join(
+        fileutils.get_sessions_directory(),
+        "*" + strokelog.SESSION_FILE_EXTENSION)))
+    logger.info("Loading %d session files..." % len(file_paths))
+    strokes = load_sessions(file_paths)
+    summary = summarize(strokes)
+    summaryfile.write_summary(summary, arguments.output)
+    report(summary, arguments.top)
+    logger.info("Done.")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,30 +3,194 @@
 
 """Gathers statistics about user performance, such as speed and accuracy."""
 
+import time
+
+import logging
+logger = logging.getLogger(__name__)
+
+from fly import config
+from fly.statistics.helpers import clock
 from fly.statistics.helpers.timer import Timer
 from fly.statistics.helpers.accuracy import AccuracyMeter
+from fly.statistics.helpers.strokelog import StrokeRecord
+from fly.statistics.helpers import speed
+from fly.statistics.helpers import quantiles
+
+# Percentiles of time taken per word, as fractions.
+LATENCY_PERCENTILES = (0.5, 0.9, 0.99)
+
+# Names sketches of time taken per word are stored under, over every lesson
+# and for each lesson.
+LATENCY_SKETCH_NAME = "latency"
+LESSON_LATENCY_SKETCH_NAME = "latency/%s"
 
 
 class StatisticGatherer(object):
 
     """Provides stats."""
 
-    def __init__(self):
+    def __init__(self, stroke_log=None, progress_store=None):
+
+        """
+        @param stroke_log: where each stroke is recorded, if anywhere
+        @param progress_store: where sketches of this session are merged
+                               into those of every session, if anywhere
+
+        @type stroke_log: L{statistics.helpers.strokelog.StrokeLog}
+        @type progress_store: L{statistics.progress.ProgressStore}
+        """
+
         self.timer = Timer()
         self.accuracy_meter = AccuracyMeter()
+        self.stroke_log = stroke_log
+        # When the word being typed was shown, see on_word_shown.
+        self.last_word_time = time.time()
+        self.recent_meter = get_recent_meter()
+        self.progress_store = progress_store
+        # Sketches of seconds taken per word typed right this session, by
+        # lesson name, and over every lesson under None.
+        self.latency_sketches = {}
+
+    def on_stroke(self, capture_time, target_chord, entered_chord, correct,
+                  lesson_name=""):
+
+        """Record a stroke in the stroke log.
+
+        @param capture_time: when the stroke was captured, in seconds since
+                             the epoch
+        @param target_chord: chord the user should type
+        @param entered_chord: chord the user typed
+        @param correct: True if the word was typed right, False if wrong,
+                        None if not finished
+        @param lesson_name: lesson the chord is from
+
+        @type capture_time: float
+        @type target_chord: str
+        @type entered_chord: str
+        @type correct: bool
+        @type lesson_name: str
+        """
+
+        latency = capture_time - self.last_word_time
+        if correct is not None:
+            self.last_word_time = capture_time
+        if correct:
+            self.__add_latency(latency, None)
+            if lesson_name:
+                self.__add_latency(latency, lesson_name)
+        if self.stroke_log is not None:
+            self.stroke_log.record(StrokeRecord(capture_time, target_chord,
+                                                entered_chord, correct,
+                                                latency, lesson_name))
+
+    def on_word_shown(self, show_time=None):
+
+        """Time the word being typed from now on, e.g. when a lesson
+        starts, so time spent loading or choosing lessons is not counted.
+
+        Recent speed and accuracy start afresh from then too, as they are
+        for the lesson shown. Words shown when the one before is typed 
+        right are timed from that stroke, and need not call this.
+
+        @param show_time: when the word was shown, in seconds since the
+                          epoch, by default now
+        @type show_time: float
+        """
+
+        if show_time is None:
+            show_time = time.time()
+        self.last_word_time = show_time
+        if self.recent_meter is not None:
+            self.recent_meter.reset(clock.from_wall_time(show_time))
+
+    def __add_latency(self, latency, lesson_name):
+
+        """Add time taken for a word to the sketch of a lesson, or of every
+        lesson if lesson_name is None."""
+
+        if lesson_name not in self.latency_sketches:
+            self.latency_sketches[lesson_name] = quantiles.TDigest(
+                config.LATENCY_SKETCH_COMPRESSION)
+        self.latency_sketches[lesson_name].add(latency)
+
+    def get_latency_percentiles(self, lesson_name=None):
 
-    def on_right_word_entered(self):
+        """Estimate percentiles of the time taken per word this session.
 
-        """Record that correct word has been entered."""
+        @param lesson_name: lesson to give them for, or None for every 
+                            lesson
+        @type lesson_name: str
+
+        @return: seconds at each of LATENCY_PERCENTILES, or None if no word
+                 has been typed right
+        @rtype: tuple of float
+        """
+
+        sketch = self.latency_sketches.get(lesson_name)
+        if sketch is None:
+            return None
+        return tuple(sketch.quantile(fraction)
+                     for fraction in LATENCY_PERCENTILES)
+
+    def close(self):
+
+        """Write what is left of the stroke log, and merge the sketches of
+        this session into those of every session in the progress store."""
+
+        if self.stroke_log is not None:
+            self.stroke_log.close()
+        if self.progress_store is not None and self.latency_sketches:
+            stored = self.progress_store.get_sketches()
+            for lesson_name, sketch in self.latency_sketches.iteritems():
+                if lesson_name is None:
+                    name = LATENCY_SKETCH_NAME
+                else:
+                    name = LESSON_LATENCY_SKETCH_NAME % lesson_name
+                if name in stored:
+                    try:
+                        lifetime = quantiles.deserialize(stored[name])
+                        lifetime.merge(sketch)
+                        sketch = lifetime
+                    except ValueError as e:
+                        logger.warning("Replacing sketch %s: %s" % (name, e))
+                self.progress_store.put_sketch(name, sketch.serialize())
+
+    def on_right_word_entered(self, entered_time=None):
+
+        """Record that correct word has been entered.
+
+        @param entered_time: when its last stroke was captured, in seconds
+                             since the epoch, by default now
+        @type entered_time: float
+        """
 
         self.timer.on_right_word_entered()
         self.accuracy_meter.on_right_word_entered()
+        self.__meter_word_entered(True, entered_time)
 
-    def on_wrong_word_entered(self):
+    def on_wrong_word_entered(self, entered_time=None):
 
-        """Record that incorrect word has been entered."""
+        """Record that incorrect word has been entered.
+
+        @param entered_time: when its last stroke was captured, in seconds
+                             since the epoch, by default now
+        @type entered_time: float
+        """
 
         self.accuracy_meter.on_wrong_word_entered()
+        self.__meter_word_entered(False, entered_time)
+
+    def __meter_word_entered(self, right, entered_time):
+
+        """Record a word finished in the recent meter, at the time its
+        stroke was captured rather than when the frame got to it."""
+
+        if self.recent_meter is None:
+            return
+        now = None
+        if entered_time is not None:
+            now = clock.from_wall_time(entered_time)
+        self.recent_meter.on_word_entered(right, now)
 
     def get_words_per_min(self):
 
@@ -48,3 +212,44 @@ class StatisticGatherer(object):
         """
 
         return self.accuracy_meter.get_fraction_accurate()
+
+    def get_recent_words_per_min(self):
+
+        """Returns recent typing speed in words per minute, as configured 
+        with config.SPEED_METER.
+
+        @rtype: float
+        """
+
+        if self.recent_meter is None:
+            return self.get_words_per_min()
+        return self.recent_meter.get_words_per_min()
+
+    def get_recent_fraction_accurate(self):
+
+        """Get recent user accuracy as a number between 0 and 1, as 
+        configured with config.SPEED_METER.
+
+        @rtype: float
+        """
+
+        if self.recent_meter is None:
+            return self.get_fraction_accurate()
+        return self.recent_meter.get_fraction_accurate()
+
+
+def get_recent_meter():
+
+    """Create the meter of recent speed and accuracy set in the config.
+
+    @return: meter, or None to use the whole session
+    @rtype: L{statistics.helpers.speed.WindowMeter} or 
+            L{statistics.helpers.speed.DecayingMeter}
+    """
+
+    if config.SPEED_METER == "window":
+        return speed.WindowMeter(config.SPEED_WINDOW_WORDS,
+                                 config.SPEED_WINDOW_SECONDS)
+    if config.SPEED_METER == "decaying":
+        return speed.DecayingMeter(config.SPEED_HALF_LIFE_SECONDS)
+    return None
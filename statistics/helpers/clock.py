@@ -0,0 +1,120 @@
+# Copyright (c) 2011 Pragma Nolint.
+# See LICENSE.txt for details.
+
+"""
+Monotonic clock, for timing that is not upset by the system clock changing.
+
+Python 2 has no monotonic clock of its own, so the operating system's is
+called through ctypes: clock_gettime(CLOCK_MONOTONIC) on Linux and BSD,
+mach_absolute_time on Mac OS X and QueryPerformanceCounter on Windows.
+Where none can be found, time.time is used.
+"""
+
+import sys
+import time
+import ctypes
+import ctypes.util
+
+import logging
+logger = logging.getLogger(__name__)
+
+CLOCK_MONOTONIC = 1
+
+
+class _Timespec(ctypes.Structure):
+    _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+
+class _MachTimebaseInfo(ctypes.Structure):
+    _fields_ = [('numer', ctypes.c_uint32), ('denom', ctypes.c_uint32)]
+
+
+def _get_posix_clock():
+    # clock_gettime is in librt on older Linux, in libc elsewhere.
+    for name in ('rt', 'c'):
+        path = ctypes.util.find_library(name)
+        if path is None:
+            continue
+        library = ctypes.CDLL(path, use_errno=True)
+        if hasattr(library, 'clock_gettime'):
+            break
+    else:
+        return None
+
+    clock_gettime = library.clock_gettime
+    clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(_Timespec)]
+    timespec = _Timespec()
+
+    def monotonic():
+        if clock_gettime(CLOCK_MONOTONIC, ctypes.byref(timespec)) != 0:
+            raise OSError(ctypes.get_errno(), "clock_gettime failed")
+        return timespec.tv_sec + timespec.tv_nsec * 1e-9
+    return monotonic
+
+
+def _get_mac_clock():
+    library = ctypes.CDLL(ctypes.util.find_library('c'))
+    mach_absolute_time = library.mach_absolute_time
+    mach_absolute_time.restype = ctypes.c_uint64
+    timebase = _MachTimebaseInfo()
+    library.mach_timebase_info(ctypes.byref(timebase))
+    scale = timebase.numer / float(timebase.denom) * 1e-9
+
+    def monotonic():
+        return mach_absolute_time() * scale
+    return monotonic
+
+
+def _get_windows_clock():
+    kernel32 = ctypes.windll.kernel32
+    frequency = ctypes.c_int64()
+    kernel32.QueryPerformanceFrequency(ctypes.byref(frequency))
+    counter = ctypes.c_int64()
+
+    def monotonic():
+        kernel32.QueryPerformanceCounter(ctypes.byref(counter))
+        return counter.value / float(frequency.value)
+    return monotonic
+
+
+def _get_clock():
+
+    """Return the best monotonic clock of the operating system.
+
+    @return: function returning seconds since an arbitrary point
+    @rtype: function
+    """
+
+    try:
+        if sys.platform == 'darwin':
+            clock = _get_mac_clock()
+        elif sys.platform == 'win32':
+            clock = _get_windows_clock()
+        else:
+            clock = _get_posix_clock()
+        if clock is not None:
+            clock()
+            return clock
+    except (OSError, AttributeError, TypeError) as e:
+        logger.warning("No monotonic clock, using time.time: %s" % e)
+    return time.time
+
+
+monotonic = _get_clock()
+
+
+def from_wall_time(wall_time):
+
+    """Return the monotonic time of a moment given by time.time, e.g. when
+    a stroke was captured on another thread.
+
+    The system clock is taken not to have changed since, and moments
+    after now are taken as now.
+
+    @param wall_time: seconds since the epoch
+    @type wall_time: float
+
+    @rtype: float
+    """
+
+    return monotonic() - max(time.time() - wall_time, 0)
@@ -0,0 +1,223 @@
+# Copyright (c) 2011 Pragma Nolint.
+# See LICENSE.txt for details.
+
+"""
+Estimate quantiles of a stream of values, such as how long words take to
+type, without keeping every value.
+
+A L{TDigest} keeps a fixed number of centroids, each the mean and weight of
+a run of neighbouring values. Centroids near the median may hold many
+values, those at the tails only a few, so high percentiles such as p99
+stay accurate. New values go into a buffer that is merged into the
+centroids when full, so adding a value takes O(log k) on average for k
+centroids. Two digests can be merged, e.g. the digest of a session into
+the digest of every session before it, and a digest can be serialized to
+a short string to be stored.
+
+See Dunning and Ertl, "Computing Extremely Accurate Quantiles Using
+t-Digests".
+"""
+
+import math
+import struct
+
+SERIALIZATION_VERSION = 1
+
+# Version, compression, count, min, max and number of centroids.
+HEADER = struct.Struct('<BddddI')
+
+# Mean and weight of a centroid.
+CENTROID = struct.Struct('<dd')
+
+
+class TDigest(object):
+
+    """Merging t-digest of a stream of values."""
+
+    # Values buffered for each unit of compression before merging.
+    BUFFER_FACTOR = 5
+
+    def __init__(self, compression=100):
+
+        """
+        @param compression: more keeps more centroids and is more accurate,
+                            there are at most about compression / 2
+        @type compression: float
+        """
+
+        self.compression = float(compression)
+        self.buffer_size = int(self.BUFFER_FACTOR * compression)
+        # (mean, weight) of centroids in order, and values not merged yet.
+        self.centroids = []
+        self.buffer = []
+        self.count = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    def __len__(self):
+        return int(self.count)
+
+    def add(self, value, weight=1.0):
+
+        """Add a value to the digest.
+
+        @param value: value to add
+        @param weight: times the value is added
+
+        @type value: float
+        @type weight: float
+        """
+
+        self.buffer.append((value, weight))
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self.buffer) >= self.buffer_size:
+            self.__compress()
+
+    def merge(self, other):
+
+        """Add every value of another digest to this one.
+
+        @param other: digest to add, left unchanged
+        @type other: L{TDigest}
+        """
+
+        if not other.count:
+            return
+        self.buffer.extend(other.centroids)
+        self.buffer.extend(other.buffer)
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.__compress()
+
+    def quantile(self, fraction):
+
+        """Estimate the value below which a fraction of values fall.
+
+        Values are taken to be spread evenly around the mean of each
+        centroid, and between the smallest value and the first centroid
+        and the last centroid and the largest value.
+
+        @param fraction: between 0 and 1, e.g. 0.99 for p99
+        @type fraction: float
+
+        @return: estimated value, or None if the digest is empty
+        @rtype: float
+        """
+
+        self.__compress()
+        if not self.centroids:
+            return None
+        centroids = self.centroids
+        if len(centroids) == 1:
+            return centroids[0][0]
+
+        index = min(max(fraction, 0.0), 1.0) * self.count
+        first_mean, first_weight = centroids[0]
+        if index < first_weight / 2:
+            return self.min + (first_mean - self.min) * \
+                   index / (first_weight / 2)
+        last_mean, last_weight = centroids[-1]
+        if index > self.count - last_weight / 2:
+            return self.max - (self.max - last_mean) * \
+                   (self.count - index) / (last_weight / 2)
+
+        # Interpolate between the means of the centroids either side.
+        cumulative = first_weight / 2
+        for (left_mean, left_weight), (right_mean, right_weight) in \
+                zip(centroids, centroids[1:]):
+            step = (left_weight + right_weight) / 2
+            if cumulative + step >= index:
+                return left_mean + (right_mean - left_mean) * \
+                       (index - cumulative) / step
+            cumulative += step
+        return last_mean
+
+    def __compress(self):
+
+        """Merge the buffer into the centroids.
+
+        Neighbouring values are merged while the centroid stays within one
+        unit of the scale function k(q) = compression / (2 pi) *
+        asin(2q - 1), which is steep at the tails.
+        """
+
+        if not self.buffer:
+            return
+        values = self.centroids + self.buffer
+        values.sort()
+        self.buffer = []
+
+        merged = []
+        weight_before = 0.0
+        mean, weight = values[0]
+        limit = self.count * self.__get_limit(0.0)
+        for value, value_weight in values[1:]:
+            if weight_before + weight + value_weight <= limit:
+                weight += value_weight
+                mean += (value - mean) * value_weight / weight
+            else:
+                merged.append((mean, weight))
+                weight_before += weight
+                limit = self.count * self.__get_limit(weight_before /
+                                                      self.count)
+                mean, weight = value, value_weight
+        merged.append((mean, weight))
+        self.centroids = merged
+
+    def __get_limit(self, fraction):
+
+        """Return the fraction a centroid starting at fraction may reach.
+
+        @rtype: float
+        """
+
+        scale = self.compression / (2 * math.pi)
+        k = scale * math.asin(2 * min(fraction, 1.0) - 1) + 1
+        return (math.sin(min(k / scale, math.pi / 2)) + 1) / 2
+
+    def serialize(self):
+
+        """Encode the digest as a string, e.g. to store it.
+
+        @rtype: str
+        """
+
+        self.__compress()
+        parts = [HEADER.pack(SERIALIZATION_VERSION, self.compression,
+                             self.count, self.min, self.max,
+                             len(self.centroids))]
+        parts.extend(CENTROID.pack(mean, weight)
+                     for mean, weight in self.centroids)
+        return ''.join(parts)
+
+
+def deserialize(data):
+
+    """Decode a digest encoded with L{TDigest.serialize}.
+
+    @param data: encoded digest
+    @type data: str
+
+    @rtype: L{TDigest}
+    """
+
+    if len(data) < HEADER.size:
+        raise ValueError("Digest is cut short")
+    version, compression, count, minimum, maximum, centroid_count = \
+        HEADER.unpack_from(data)
+    if version != SERIALIZATION_VERSION:
+        raise ValueError("Digest is from another version")
+    if len(data) != HEADER.size + centroid_count * CENTROID.size:
+        raise ValueError("Digest is cut short")
+
+    digest = TDigest(compression)
+    digest.count = count
+    digest.min = minimum
+    digest.max = maximum
+    digest.centroids = [CENTROID.unpack_from(data, HEADER.size +
+                                             i * CENTROID.size)
+                        for i in xrange(centroid_count)]
+    return digest
@@ -0,0 +1,229 @@
+# Copyright (c) 2011 Pragma Nolint.
+# See LICENSE.txt for details.
+
+"""
+Measure recent typing speed and accuracy, for live feedback.
+
+Unlike the timer and accuracy meter, which cover the whole session, these
+meters follow how the user is typing now. Each is updated in constant time
+as words are finished and can be read as often as needed, e.g. every
+frame. Times are taken from the monotonic clock.
+"""
+
+import math
+import collections
+
+from fly.statistics.helpers import clock
+
+SECONDS_PER_MINUTE = 60.0
+
+
+class WindowMeter(object):
+
+    """Speed and accuracy over the last words, or the last seconds, or both.
+
+    Speed is words typed right in the window over the time since the first
+    word in the window was started, so it falls while the user is idle.
+    """
+
+    def __init__(self, max_words=None, max_seconds=None):
+
+        """
+        @param max_words: most words in the window, or None for no limit
+        @param max_seconds: oldest words in the window, or None for no limit
+
+        @type max_words: int
+        @type max_seconds: float
+        """
+
+        self.max_words = max_words
+        self.max_seconds = max_seconds
+        self.reset()
+
+    def reset(self, now=None):
+
+        """Start with an empty window.
+
+        @param now: monotonic time, by default now
+        @type now: float
+        """
+
+        if now is None:
+            now = clock.monotonic()
+        # Start and finish time of each word, and whether it was right.
+        self.words = collections.deque()
+        self.right_count = 0
+        self.last_time = now
+
+    def on_word_entered(self, right, now=None):
+
+        """Record that a word was finished.
+
+        @param right: True if it was typed right
+        @param now: monotonic time, by default now
+
+        @type right: bool
+        @type now: float
+        """
+
+        if now is None:
+            now = clock.monotonic()
+        self.words.append((self.last_time, now, right))
+        self.right_count += right
+        self.last_time = now
+        if self.max_words is not None and len(self.words) > self.max_words:
+            self.__drop_oldest()
+
+    def __drop_oldest(self):
+        _, _, right = self.words.popleft()
+        self.right_count -= right
+
+    def __slide(self, now):
+
+        """Drop words that finished before the window of time."""
+
+        if self.max_seconds is None:
+            return
+        while self.words and self.words[0][1] < now - self.max_seconds:
+            self.__drop_oldest()
+
+    def get_words_per_min(self, now=None):
+
+        """Return the speed over the window.
+
+        @param now: monotonic time, by default now
+        @type now: float
+
+        @rtype: float
+        """
+
+        if now is None:
+            now = clock.monotonic()
+        self.__slide(now)
+        if not self.words:
+            return 0.0
+        start = self.words[0][0]
+        if self.max_seconds is not None:
+            start = max(start, now - self.max_seconds)
+        return SECONDS_PER_MINUTE * self.right_count / max(now - start, 0.001)
+
+    def get_fraction_accurate(self, now=None):
+
+        """Return the fraction of words in the window typed right.
+
+        @param now: monotonic time, by default now
+        @type now: float
+
+        @rtype: float
+        """
+
+        if now is None:
+            now = clock.monotonic()
+        self.__slide(now)
+        if not self.words:
+            return 0
+        return float(self.right_count) / len(self.words)
+
+
+class DecayingMeter(object):
+
+    """Exponentially weighted speed and accuracy.
+
+    Each word counts for less as time passes, halving every half_life
+    seconds, and so does the time spent typing. Speed is the weighted count
+    of words typed right over the weighted time, and accuracy the weighted
+    count of words typed right over the weighted count of words.
+    """
+
+    def __init__(self, half_life):
+
+        """
+        @param half_life: seconds for the weight of a word to halve
+        @type half_life: float
+        """
+
+        self.time_constant = half_life / math.log(2)
+        self.reset()
+
+    def reset(self, now=None):
+
+        """Forget every word.
+
+        @param now: monotonic time, by default now
+        @type now: float
+        """
+
+        if now is None:
+            now = clock.monotonic()
+        self.right_weight = 0.0
+        self.total_weight = 0.0
+        self.time_weight = 0.0
+        self.last_time = now
+
+    def __decayed(self, now):
+
+        """Return the weights as they are at time now.
+
+        @rtype: tuple of (float, float, float)
+        """
+
+        elapsed = max(now - self.last_time, 0)
+        decay = math.exp(-elapsed / self.time_constant)
+        # Time spent since last word, weighted by how long ago each moment
+        # of it was.
+        time_weight = self.time_weight * decay + \
+                      self.time_constant * (1 - decay)
+        return self.right_weight * decay, self.total_weight * decay, \
+               time_weight
+
+    def on_word_entered(self, right, now=None):
+
+        """Record that a word was finished.
+
+        @param right: True if it was typed right
+        @param now: monotonic time, by default now
+
+        @type right: bool
+        @type now: float
+        """
+
+        if now is None:
+            now = clock.monotonic()
+        right_weight, total_weight, self.time_weight = self.__decayed(now)
+        self.right_weight = right_weight + right
+        self.total_weight = total_weight + 1
+        self.last_time = now
+
+    def get_words_per_min(self, now=None):
+
+        """Return the weighted speed.
+
+        @param now: monotonic time, by default now
+        @type now: float
+
+        @rtype: float
+        """
+
+        if now is None:
+            now = clock.monotonic()
+        right_weight, _, time_weight = self.__decayed(now)
+        if time_weight <= 0:
+            return 0.0
+        return SECONDS_PER_MINUTE * right_weight / time_weight
+
+    def get_fraction_accurate(self, now=None):
+
+        """Return the weighted fraction of words typed right.
+
+        Every weight decays alike, so this does not change while the user 
+        is idle.
+
+        @param now: unused, as for L{WindowMeter}
+        @type now: float
+
+        @rtype: float
+        """
+
+        if self.total_weight <= 0:
+            return 0
+        return self.right_weight / self.total_weight
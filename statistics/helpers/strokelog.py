@@ -0,0 +1,367 @@
+# Copyright (c) 2011 Pragma Nolint.
+# See LICENSE.txt for details.
+
+"""
+Record every stroke of a session to a session file.
+
+Strokes are recorded in a ring buffer of fixed size, which takes a few
+microseconds. A writer thread takes them from the buffer in batches and
+appends each batch to the session file as a compressed block. If the writer
+falls so far behind that the buffer fills up, the oldest strokes are
+dropped rather than making the game wait.
+
+A session file starts with a header holding the time the session started.
+Each block then holds a table of the chords and lesson names in it and a
+fixed size record for each stroke. Blocks are compressed separately, so a
+session cut short loses at most its last block.
+"""
+
+import os
+import time
+import zlib
+import struct
+import threading
+import collections
+
+from fly.utils import files as fileutils
+
+import logging
+logger = logging.getLogger(__name__)
+
+SESSION_FILE_EXTENSION = '.session'
+
+MAGIC = 'FLYSES\0\0'
+VERSION = 2
+
+# Magic, version and session start time.
+HEADER = struct.Struct('<8sId')
+
+# Compressed size and number of strokes of a block.
+BLOCK_HEADER = struct.Struct('<II')
+
+# Milliseconds since session start, latency in milliseconds, chord to type,
+# chord entered and lesson as numbers in the block's table, and outcome.
+RECORD = struct.Struct('<IIHHHB')
+
+# Outcome of a stroke: the word was typed wrong, right, or not finished.
+WRONG = 0
+RIGHT = 1
+UNFINISHED = 2
+
+# A stroke: when it was captured, the chord the user should type, the chord
+# entered, True if the word was typed right, False if wrong and None if not
+# finished, seconds since the previous word was finished, and the name of
+# the lesson.
+StrokeRecord = collections.namedtuple("StrokeRecord", "time target entered "
+                                      "correct latency lesson")
+
+
+def get_session_path(start_time=None):
+
+    """Return a file path for a new session file, named by its start time.
+
+    @param start_time: seconds since the epoch, by default now
+    @type start_time: float
+
+    @rtype: str
+    """
+
+    if start_time is None:
+        start_time = time.time()
+    name = time.strftime('%Y%m%d-%H%M%S', time.localtime(start_time))
+    return os.path.join(fileutils.get_sessions_directory(),
+                        name + SESSION_FILE_EXTENSION)
+
+
+class StrokeLog(object):
+
+    """Ring buffer of strokes, written to a session file in the background."""
+
+    def __init__(self, file_path, capacity=4096, batch_size=256,
+                 start_time=None):
+
+        """
+        @param file_path: session file to write, created with the first
+                          block
+        @param capacity: most strokes kept in memory before the oldest are
+                         dropped
+        @param batch_size: strokes to collect before writing a block
+        @param start_time: when the session started in seconds since the
+                           epoch, by default now
+
+        @type file_path: str
+        @type capacity: int
+        @type batch_size: int
+        @type start_time: float
+        """
+
+        self.file_path = file_path
+        self.capacity = capacity
+        self.batch_size = min(batch_size, capacity)
+        if start_time is None:
+            start_time = time.time()
+        self.start_time = start_time
+
+        # Counts of strokes since the start, so recorded - taken strokes
+        # are in the buffer.
+        self.strokes = [None] * capacity
+        self.recorded = 0
+        self.taken = 0
+        self.written = 0
+        self.dropped = 0
+        self.flushing = False
+        self.closed = False
+        self.condition = threading.Condition()
+
+        self.writer = threading.Thread(target=self.__write_blocks,
+                                       name="StrokeLogWriter")
+        self.writer.daemon = True
+        self.writer.start()
+
+    def record(self, stroke):
+
+        """Add a stroke to the buffer.
+
+        @param stroke: stroke to record
+        @type stroke: L{StrokeRecord}
+        """
+
+        with self.condition:
+            self.strokes[self.recorded % self.capacity] = stroke
+            self.recorded += 1
+            if self.recorded - self.taken > self.capacity:
+                self.taken += 1
+                self.written += 1
+                self.dropped += 1
+            if self.recorded - self.taken == self.batch_size:
+                self.condition.notify_all()
+
+    def flush(self):
+
+        """Write the strokes recorded so far, waiting until they are."""
+
+        with self.condition:
+            self.flushing = True
+            self.condition.notify_all()
+            recorded = self.recorded
+            while self.written < recorded and self.writer.is_alive():
+                self.condition.wait(1.0)
+
+    def close(self):
+
+        """Write the strokes recorded so far and stop the writer."""
+
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.writer.join()
+        if self.dropped:
+            logger.warning("Dropped %d strokes from %s" %
+                           (self.dropped, self.file_path))
+
+    def __take_batch(self):
+
+        """Wait for a batch of strokes and take them from the buffer.
+
+        @return: strokes taken, and False once closed and nothing is left
+        @rtype: tuple of (list of L{StrokeRecord}, bool)
+        """
+
+        with self.condition:
+            while self.recorded - self.taken < self.batch_size and \
+                  not self.flushing and not self.closed:
+                self.condition.wait()
+            batch = [self.strokes[i % self.capacity]
+                     for i in xrange(self.taken, self.recorded)]
+            self.taken = self.recorded
+            self.flushing = False
+            return batch, not (self.closed and not batch)
+
+    def __write_blocks(self):
+
+        """Write batches of strokes to the session file until closed."""
+
+        running = True
+        while running:
+            batch, running = self.__take_batch()
+            if batch:
+                try:
+                    self.__append(encode_block(batch, self.start_time))
+                except (IOError, OSError) as e:
+                    logger.warning("Could not write %s: %s" %
+                                   (self.file_path, e))
+            with self.condition:
+                self.written += len(batch)
+                self.condition.notify_all()
+
+    def __append(self, block):
+
+        """Append a block to the session file, writing its header first.
+
+        @param block: encoded block
+        @type block: str
+        """
+
+        directory = os.path.dirname(self.file_path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        new_file = not os.path.exists(self.file_path)
+        with open(self.file_path, 'ab') as f:
+            if new_file:
+                f.write(HEADER.pack(MAGIC, VERSION, self.start_time))
+            f.write(block)
+
+
+def encode_block(strokes, start_time):
+
+    """Encode strokes as a compressed block of a session file.
+
+    @param strokes: strokes to encode
+    @param start_time: when the session started
+
+    @type strokes: list of L{StrokeRecord}
+    @type start_time: float
+
+    @rtype: str
+    """
+
+    numbers = {}
+    table_strings = []
+    def number_of(string):
+        if isinstance(string, unicode):
+            string = string.encode('utf-8')
+        string = string[:255]
+        if string not in numbers:
+            numbers[string] = len(table_strings)
+            table_strings.append(string)
+        return numbers[string]
+
+    records = []
+    for stroke in strokes:
+        if stroke.correct is None:
+            outcome = UNFINISHED
+        else:
+            outcome = RIGHT if stroke.correct else WRONG
+        records.append(RECORD.pack(
+            max(int(round((stroke.time - start_time) * 1000)), 0),
+            max(int(round(stroke.latency * 1000)), 0),
+            number_of(stroke.target), number_of(stroke.entered),
+            number_of(stroke.lesson), outcome))
+
+    table = [struct.pack('<H', len(table_strings))]
+    for string in table_strings:
+        table.append(struct.pack('<B', len(string)))
+        table.append(string)
+    payload = zlib.compress(''.join(table + records))
+    return BLOCK_HEADER.pack(len(payload), len(strokes)) + payload
+
+
+def read_session(file_path):
+
+    """Read the strokes of a session file.
+
+    A block cut short, e.g. because the game was killed, is left out.
+
+    @param file_path: session file
+    @type file_path: str
+
+    @return: when the session started, and its strokes in order
+    @rtype: tuple of (float, list of L{StrokeRecord})
+    """
+
+    start_time, blocks = read_blocks(file_path)
+    strokes = []
+    for table_strings, count, records in blocks:
+        strokes.extend(decode_records(table_strings, count, records,
+                                      start_time))
+    return start_time, strokes
+
+
+def read_blocks(file_path):
+
+    """Read the blocks of a session file, without decoding their strokes.
+
+    A block cut short, e.g. because the game was killed, is left out.
+
+    @param file_path: session file
+    @type file_path: str
+
+    @return: when the session started, and the table, number of strokes 
+             and uncompressed records of each block
+    @rtype: tuple of (float, list of (list of str, int, str))
+    """
+
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise ValueError("%s is not a session file" % file_path)
+    magic, version, start_time = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("%s is not a session file" % file_path)
+
+    blocks = []
+    offset = HEADER.size
+    while offset + BLOCK_HEADER.size <= len(data):
+        size, count = BLOCK_HEADER.unpack_from(data, offset)
+        offset += BLOCK_HEADER.size
+        if offset + size > len(data):
+            break
+        blocks.append(decompress_block(data[offset:offset + size], count))
+        offset += size
+    return start_time, blocks
+
+
+def decompress_block(payload, count):
+
+    """Decompress a block and read its table.
+
+    @param payload: compressed part of block
+    @param count: number of strokes in block
+
+    @type payload: str
+    @type count: int
+
+    @return: chords and lesson names the records refer to, number of 
+             strokes, and the records
+    @rtype: tuple of (list of str, int, str)
+    """
+
+    data = zlib.decompress(payload)
+    string_count, = struct.unpack_from('<H', data)
+    offset = 2
+    table_strings = []
+    for i in xrange(string_count):
+        length = ord(data[offset])
+        table_strings.append(data[offset + 1:offset + 1 + length])
+        offset += 1 + length
+    return table_strings, count, data[offset:offset + count * RECORD.size]
+
+
+def decode_records(table_strings, count, records, start_time):
+
+    """Decode the strokes of a block.
+
+    @param table_strings: chords and lesson names of block
+    @param count: number of strokes in block
+    @param records: records of block
+    @param start_time: when the session started
+
+    @type table_strings: list of str
+    @type count: int
+    @type records: str
+    @type start_time: float
+
+    @rtype: list of L{StrokeRecord}
+    """
+
+    outcomes = {WRONG: False, RIGHT: True, UNFINISHED: None}
+    strokes = []
+    for i in xrange(count):
+        milliseconds, latency, target, entered, lesson, outcome = \
+            RECORD.unpack_from(records, i * RECORD.size)
+        strokes.append(StrokeRecord(start_time + milliseconds / 1000.0,
+                                    table_strings[target], 
+                                    table_strings[entered],
+                                    outcomes[outcome], latency / 1000.0,
+                                    table_strings[lesson]))
+    return strokes
@@ -0,0 +1,384 @@
+# Copyright (c) 2011 Pragma Nolint.
+# See LICENSE.txt for details.
+
+"""
+Progress of the user through lessons, kept between sessions.
+
+Progress is stored in an SQLite database, in write-ahead logging mode so
+that it can be read while it is written. There is one row for each chord
+of each lesson the user has typed, with how often it was typed right and
+wrong and the word chooser's schedule for it, and one row for each lesson
+with the rest of its word chooser's state. Sketches of statistics over
+every session, such as how long words take to type, are kept by name.
+Rows are replaced rather than added to, so the database grows with the
+words learned, not the sessions.
+
+Progress is recorded on whichever thread the game runs on, but only queued
+there. A writer thread writes what has been queued in batches, each in a
+single transaction.
+"""
+
+import json
+import time
+import Queue
+import sqlite3
+import threading
+
+from fly.utils import files as fileutils
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class WordProgress(object):
+
+    """Progress of the user on one chord of a lesson.
+
+    Attributes:
+        - right: times the chord was typed right
+        - wrong: times the chord was typed wrong
+        - spacing, ease, due: schedule of the chord, as the word chooser
+          of the lesson left it, or None
+    """
+
+    __slots__ = ('right', 'wrong', 'spacing', 'ease', 'due')
+
+    def __init__(self, right=0, wrong=0, spacing=None, ease=None, due=None):
+        self.right = right
+        self.wrong = wrong
+        self.spacing = spacing
+        self.ease = ease
+        self.due = due
+
+
+class LessonProgress(object):
+
+    """Progress of the user on a lesson, as read from the store.
+
+    Changes are kept here and queued for the store to write.
+    """
+
+    def __init__(self, store, lesson_name, words, state):
+
+        """
+        @param store: store that progress is written to
+        @param lesson_name: name of lesson
+        @param words: progress on each chord typed before
+        @param state: word chooser state other than for its chords
+
+        @type store: L{ProgressStore}
+        @type lesson_name: str
+        @type words: dict of str: L{WordProgress}
+        @type state: dict
+        """
+
+        self.store = store
+        self.lesson_name = lesson_name
+        self.words = words
+        self.state = state
+
+    def get_word(self, chord):
+
+        """Return progress on chord, recorded so far this session too.
+
+        @param chord: steno chord
+        @type chord: str
+
+        @rtype: L{WordProgress}
+        """
+
+        if chord not in self.words:
+            self.words[chord] = WordProgress()
+        return self.words[chord]
+
+    def record_word(self, chord, right=None, **schedule):
+
+        """Record that chord was answered, and its new schedule if any.
+
+        @param chord: steno chord
+        @param right: True if typed right, False if wrong, None to only
+                      change its schedule
+        @param schedule: new spacing, ease or due position of chord
+
+        @type chord: str
+        @type right: bool
+        @type schedule: float
+        """
+
+        word = self.get_word(chord)
+        if right is True:
+            word.right += 1
+        elif right is False:
+            word.wrong += 1
+        for name, value in schedule.iteritems():
+            setattr(word, name, value)
+        self.store.put_word(self.lesson_name, chord, word)
+
+    def set_state(self, **state):
+
+        """Record word chooser state other than for its chords.
+
+        @param state: values to keep, e.g. index=12. Must be JSON
+                      serializable.
+        """
+
+        self.state.update(state)
+        self.store.put_state(self.lesson_name, self.state)
+
+
+class ProgressStore(object):
+
+    """Database of the progress of the user, with a writer thread."""
+
+    SCHEMA_VERSION = 2
+
+    # Most seconds progress waits in the queue before it is written.
+    WRITE_INTERVAL = 2.0
+
+    def __init__(self, file_path=None):
+
+        """
+        @param file_path: database file, by default in the data directory
+        @type file_path: str
+
+        @raise ValueError: if the database is of a newer version, see
+                           L{__connect}
+        """
+
+        if file_path is None:
+            file_path = fileutils.get_progress_path()
+        self.file_path = file_path
+        self.queue = Queue.Queue()
+
+        # Set up the database before anything reads it.
+        connection = self.__connect()
+        connection.close()
+
+        self.writer = threading.Thread(target=self.__write_batches,
+                                       name="ProgressWriter")
+        self.writer.daemon = True
+        self.writer.start()
+
+    def __connect(self):
+
+        """Open the database, creating its tables if it is new.
+
+        Databases of older versions are upgraded in place. Progress is never
+        dropped, so a database of a newer version is refused.
+
+        @raise ValueError: if the database is of a newer version
+
+        @rtype: sqlite3.Connection
+        """
+
+        connection = sqlite3.connect(self.file_path)
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+        if version > self.SCHEMA_VERSION:
+            connection.close()
+            raise ValueError("%s is from a newer version (%d), this reads "
+                             "up to version %d" % (self.file_path, version,
+                                                   self.SCHEMA_VERSION))
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        if version == 1:
+            # Version 1 only lacked sketches, so progress is kept.
+            with connection:
+                self.__create_sketches_table(connection)
+                connection.execute("PRAGMA user_version=%d" %
+                                   self.SCHEMA_VERSION)
+        elif version == 0:
+            with connection:
+                connection.execute(
+                    "CREATE TABLE words (lesson TEXT, chord TEXT, "
+                    "right INTEGER, wrong INTEGER, spacing REAL, ease REAL, "
+                    "due INTEGER, PRIMARY KEY (lesson, chord))")
+                connection.execute(
+                    "CREATE TABLE lessons (lesson TEXT PRIMARY KEY, "
+                    "state TEXT)")
+                self.__create_sketches_table(connection)
+                connection.execute("PRAGMA user_version=%d" %
+                                   self.SCHEMA_VERSION)
+        return connection
+
+    def __create_sketches_table(self, connection):
+
+        """Create the table of sketches, new in version 2."""
+
+        connection.execute("CREATE TABLE sketches (name TEXT PRIMARY KEY, "
+                           "sketch BLOB)")
+
+    def get_lesson_progress(self, lesson_name):
+
+        """Read the progress on a lesson, including any not written yet.
+
+        @param lesson_name: name of lesson
+        @type lesson_name: str
+
+        @rtype: L{LessonProgress}
+        """
+
+        self.flush()
+        connection = sqlite3.connect(self.file_path)
+        try:
+            words = {}
+            for row in connection.execute(
+                    "SELECT chord, right, wrong, spacing, ease, due "
+                    "FROM words WHERE lesson = ?", (lesson_name,)):
+                words[row[0].encode('utf-8')] = WordProgress(*row[1:])
+            row = connection.execute(
+                "SELECT state FROM lessons WHERE lesson = ?",
+                (lesson_name,)).fetchone()
+        finally:
+            connection.close()
+
+        state = {}
+        if row is not None:
+            state = json.loads(row[0])
+        return LessonProgress(self, lesson_name, words, state)
+
+    def put_word(self, lesson_name, chord, word):
+
+        """Queue progress on a chord to be written.
+
+        @param lesson_name: name of lesson
+        @param chord: steno chord
+        @param word: progress on chord
+
+        @type lesson_name: str
+        @type chord: str
+        @type word: L{WordProgress}
+        """
+
+        self.queue.put((('words', lesson_name, chord),
+                        (lesson_name, chord, word.right, word.wrong,
+                         word.spacing, word.ease, word.due)))
+
+    def put_state(self, lesson_name, state):
+
+        """Queue word chooser state of a lesson to be written.
+
+        @param lesson_name: name of lesson
+        @param state: word chooser state
+
+        @type lesson_name: str
+        @type state: dict
+        """
+
+        self.queue.put((('lessons', lesson_name),
+                        (lesson_name, json.dumps(state))))
+
+    def get_sketches(self):
+
+        """Read every sketch stored, including any not written yet.
+
+        @return: name mapped to sketch, as serialized
+        @rtype: dict of str: str
+        """
+
+        self.flush()
+        connection = sqlite3.connect(self.file_path)
+        try:
+            return dict((name.encode('utf-8'), str(sketch))
+                        for name, sketch in connection.execute(
+                            "SELECT name, sketch FROM sketches"))
+        finally:
+            connection.close()
+
+    def put_sketch(self, name, sketch):
+
+        """Queue a sketch to be written, replacing any of the same name.
+
+        @param name: name of sketch
+        @param sketch: sketch, as serialized
+
+        @type name: str
+        @type sketch: str
+        """
+
+        self.queue.put((('sketches', name), (name, sqlite3.Binary(sketch))))
+
+    def flush(self):
+
+        """Write all progress queued so far, waiting until it is written."""
+
+        if not self.writer.is_alive():
+            return
+        written = threading.Event()
+        self.queue.put((None, written))
+        written.wait()
+
+    def close(self):
+
+        """Write all progress queued so far and stop the writer."""
+
+        if self.writer.is_alive():
+            self.queue.put((None, None))
+            self.writer.join()
+
+    def __write_batches(self):
+
+        """Write queued progress in batches, until closed.
+
+        Only the last progress queued for each row is written. A batch is
+        written WRITE_INTERVAL seconds after its first progress was queued,
+        or straight away when flushed or closed.
+        """
+
+        connection = self.__connect()
+        rows = {}
+        deadline = None
+        running = True
+        while running:
+            try:
+                if deadline is None:
+                    key, value = self.queue.get()
+                else:
+                    timeout = max(deadline - time.time(), 0)
+                    key, value = self.queue.get(timeout=timeout)
+            except Queue.Empty:
+                key, value = None, False
+            if key is not None:
+                rows[key] = value
+                if deadline is None:
+                    deadline = time.time() + self.WRITE_INTERVAL
+                continue
+
+            try:
+                self.__write(connection, rows)
+            except sqlite3.Error:
+                logger.exception("Could not write progress to %s" %
+                                 self.file_path)
+            rows = {}
+            deadline = None
+            if value is None:
+                running = False
+            elif value is not False:
+                value.set()
+        connection.close()
+
+    def __write(self, connection, rows):
+
+        """Write rows in one transaction.
+
+        @param connection: database connection of the writer thread
+        @param rows: rows to write, by table and key
+
+        @type connection: sqlite3.Connection
+        @type rows: dict of tuple: tuple
+        """
+
+        if not rows:
+            return
+        words = [row for key, row in rows.iteritems() if key[0] == 'words']
+        lessons = [row for key, row in rows.iteritems()
+                   if key[0] == 'lessons']
+        sketches = [row for key, row in rows.iteritems()
+                    if key[0] == 'sketches']
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO words VALUES (?, ?, ?, ?, ?, ?, ?)",
+                words)
+            connection.executemany(
+                "INSERT OR REPLACE INTO lessons VALUES (?, ?)", lessons)
+            connection.executemany(
+                "INSERT OR REPLACE INTO sketches VALUES (?, ?)", sketches)
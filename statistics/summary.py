@@ -0,0 +1,123 @@
+# Copyright (c) 2011 Pragma Nolint.
+# See LICENSE.txt for details.
+
+"""
+Summary of the sessions the user has typed, as written by
+L{statistics.analyze}.
+
+The summary is a small JSON file, so the game can read it at startup
+without going through the session files. Tables in it hold one row of
+numbers per chord, key, finger or session, with the names of the columns
+given once in C{"columns"}.
+"""
+
+import os
+import json
+
+from fly.utils import files as fileutils
+
+import logging
+logger = logging.getLogger(__name__)
+
+SUMMARY_VERSION = 1
+
+
+def read_summary(file_path=None):
+
+    """Read the summary of the sessions.
+
+    @param file_path: summary file, by default the one in the sessions
+                      directory
+    @type file_path: str
+
+    @return: summary, or None if there is none or it can't be read
+    @rtype: dict
+    """
+
+    if file_path is None:
+        file_path = fileutils.get_summary_path()
+    if not os.path.exists(file_path):
+        return None
+    try:
+        with open(file_path) as f:
+            summary = json.load(f)
+    except (IOError, ValueError) as e:
+        logger.warning("Could not read %s: %s" % (file_path, e))
+        return None
+    if summary.get("version") != SUMMARY_VERSION:
+        logger.warning("Ignoring %s, it is from another version" % file_path)
+        return None
+    return summary
+
+
+def write_summary(summary, file_path=None):
+
+    """Write the summary of the sessions, replacing any before.
+
+    @param summary: summary, without version
+    @param file_path: summary file, by default the one in the sessions
+                      directory
+
+    @type summary: dict
+    @type file_path: str
+    """
+
+    if file_path is None:
+        file_path = fileutils.get_summary_path()
+    directory = os.path.dirname(file_path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    summary = dict(summary, version=SUMMARY_VERSION)
+    with open(file_path, 'w') as f:
+        json.dump(summary, f, sort_keys=True, separators=(',', ':'))
+
+
+def get_rows(summary, table):
+
+    """Return the rows of a table of the summary as dicts.
+
+    @param summary: summary as read
+    @param table: name of table, e.g. "chords"
+
+    @type summary: dict
+    @type table: str
+
+    @return: name of each row mapped to its columns by name
+    @rtype: dict of str: dict
+    """
+
+    columns = summary["columns"][table]
+    rows = {}
+    for name, row in summary[table].iteritems():
+        if isinstance(name, unicode):
+            name = name.encode('utf-8')
+        rows[name] = dict(zip(columns, row))
+    return rows
+
+
+def load_difficulty_weights(file_path=None):
+
+    """Return how hard the user finds each chord, from the summary.
+
+    Chords the user has not typed often enough to tell are left out.
+
+    @param file_path: summary file, by default the one in the sessions
+                      directory
+    @type file_path: str
+
+    @return: chord mapped to a weight around 1, higher for harder chords,
+             for L{models.wordchooser.randomized.RetrieveRandomized}
+    @rtype: dict of str: float
+    """
+
+    summary = read_summary(file_path)
+    if summary is None:
+        return {}
+    try:
+        chords = get_rows(summary, "chords")
+    except (KeyError, AttributeError) as e:
+        logger.warning("Summary has no chords: %s" % e)
+        return {}
+    return dict((chord, row["difficulty"])
+                for chord, row in chords.iteritems()
+                if row.get("difficulty") is not None)
@@ -0,0 +1,149 @@
+# Copyright (c) 2011 Pragma Nolint. 
+# See LICENSE.txt for details.
+
+"""Test the table of chord features."""
+
+# Hack so that all modules can be imported from Fly, 
+# but this can be run just by calling it as a script.
+import sys, os
+sys.path.append(os.path.dirname(os.getcwd()))
+
+import unittest
+
+import numpy
+
+from fly.translation import chordfeatures
+
+
+class StrokeFeaturesTest(unittest.TestCase):
+
+    """Keys of a stroke are counted on the right part of the keyboard."""
+
+    def test_left_vowels_and_right(self):
+        self.assertEqual(chordfeatures.get_stroke_features("PHAEUD"),
+                         (2, 3, 1, False, False))
+
+    def test_right_only(self):
+        self.assertEqual(chordfeatures.get_stroke_features("-PBLG"),
+                         (0, 0, 4, False, False))
+
+    def test_same_letter_on_both_sides(self):
+        self.assertEqual(chordfeatures.get_stroke_features("RAEUR"),
+                         (1, 3, 1, False, False))
+
+    def test_asterisk(self):
+        self.assertEqual(chordfeatures.get_stroke_features("KPA*"),
+                         (2, 1, 0, True, False))
+
+    def test_number_bar(self):
+        self.assertEqual(chordfeatures.get_stroke_features("1-9"),
+                         (1, 0, 1, False, True))
+        self.assertEqual(chordfeatures.get_stroke_features("#S"),
+                         (1, 0, 0, False, True))
+
+    def test_keys(self):
+        self.assertEqual(chordfeatures.get_stroke_keys("RAEUR"),
+                         ['R-', 'A-', '-E', '-U', '-R'])
+        self.assertEqual(chordfeatures.get_stroke_keys("1-9"),
+                         ['#', 'S-', '-T'])
+        self.assertEqual(chordfeatures.get_stroke_keys("KPA*"),
+                         ['K-', 'P-', 'A-', '*'])
+
+
+class ChordFeatureTableTest(unittest.TestCase):
+
+    """Features of chords are added up over their strokes."""
+
+    def setUp(self):
+        self.table = chordfeatures.ChordFeatureTable(
+            ["PHAEUD/A*ES", "-F", "12K", "WE/WE"])
+
+    def test_features(self):
+        self.assertEqual(list(self.table.stroke_count), [2, 1, 1, 2])
+        self.assertEqual(list(self.table.key_count), [10, 1, 4, 4])
+        self.assertEqual(list(self.table.asterisk), 
+                         [True, False, False, False])
+        self.assertEqual(list(self.table.number_bar), 
+                         [False, False, True, False])
+
+    def test_select(self):
+        table = self.table
+        self.assertEqual(table.select(table.stroke_count == 1),
+                         ["-F", "12K"])
+        self.assertEqual(table.select(table.key_count <= 4, ["WE/WE", "-F"]),
+                         ["WE/WE", "-F"])
+
+    def test_easiest_rows(self):
+        groups = numpy.array([0, 1, 0, 1])
+        self.assertEqual(list(self.table.get_easiest_rows(groups)), [2, 1])
+
+    def test_empty(self):
+        table = chordfeatures.ChordFeatureTable([])
+        self.assertEqual(len(table), 0)
+        groups = numpy.zeros(0, dtype=numpy.int32)
+        self.assertEqual(len(table.get_easiest_rows(groups)), 0)
+
+
+class SourceHashDictionary(dict):
+
+    """Dictionary with a source hash, like a compiled dictionary."""
+
+    def __init__(self, entries, source_hash):
+        dict.__init__(self, entries)
+        self.source_hash = source_hash
+
+
+class SharedTableTest(unittest.TestCase):
+
+    """Dictionaries share a table only if built from the same source."""
+
+    def test_same_source(self):
+        first = SourceHashDictionary({"WE": "we"}, "a" * 20)
+        second = SourceHashDictionary({"WE": "we"}, "a" * 20)
+        self.assertTrue(chordfeatures.get_feature_table(first) is
+                        chordfeatures.get_feature_table(second))
+
+    def test_no_source_hash(self):
+        first = SourceHashDictionary({"WE": "we"}, "\0" * 20)
+        second = SourceHashDictionary({"-F": "of"}, "\0" * 20)
+        self.assertEqual(chordfeatures.get_feature_table(second).chords,
+                         ["-F"])
+        self.assertEqual(chordfeatures.get_feature_table(first).chords,
+                         ["WE"])
+        self.assertEqual(chordfeatures.get_feature_table({"S": "is"}).chords,
+                         ["S"])
+
+
+class EasiestChordTest(unittest.TestCase):
+
+    """The easiest chord of several for the same word is found."""
+
+    def test_fewer_strokes(self):
+        self.assertEqual(chordfeatures.get_easiest_chord(["WE/WE", "WE"]), 
+                         "WE")
+
+    def test_ties(self):
+        # Same score, so fewer keys wins, then the first given.
+        self.assertEqual(chordfeatures.get_easiest_chord(["TK", "-D"]), "-D")
+        self.assertEqual(chordfeatures.get_easiest_chord(["-D", "-Z"]), "-D")
+
+    def test_same_as_table(self):
+        chords = ["#S", "STKPW", "SKWR/-D", "-FRPB", "*E", "O", "S-P", "-SZ"]
+        table = chordfeatures.ChordFeatureTable(chords)
+        groups = numpy.zeros(len(chords), dtype=numpy.int32)
+        easiest = chords[table.get_easiest_rows(groups)[0]]
+        self.assertEqual(chordfeatures.get_easiest_chord(chords), easiest)
+        for first in chords:
+            for second in chords:
+                pair = [first, second]
+                rows = chordfeatures.ChordFeatureTable(pair)\
+                       .get_easiest_rows(numpy.zeros(2, dtype=numpy.int32))
+                self.assertEqual(chordfeatures.get_easiest_chord(pair),
+                                 pair[rows[0]])
+
+    def test_no_chords(self):
+        self.assertRaises(RuntimeError, chordfeatures.get_easiest_chord, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,6 +9,9 @@ import sys, os
 sys.path.append(os.path.dirname(os.getcwd()))
 
 import os
+import json
+import shutil
+import tempfile
 import unittest
 
 from fly.utils import dictionaryreader as dictreader 
@@ -33,6 +36,86 @@ class DictionaryReaderUtilsTest(unittest.TestCase):
         self.assertTrue(d["-F"] == "of")
 
 
+class CompiledDictionaryTest(unittest.TestCase):
+
+    """Plover dicts are loaded through a compiled, memory-mapped cache."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.temp_dir, "cache")
+        self.dict_path = os.path.join(self.temp_dir, "dict.json")
+        self.write_dict({"WE": "we", "-F": "of", "WA": "was", 
+                         "KAF/AEU": u"caf\xe9"})
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_dict(self, dictionary):
+
+        """Write dictionary to the test dict file as json."""
+
+        with open(self.dict_path, 'w') as f:
+            json.dump(dictionary, f)
+
+    def test_lookup(self):
+
+        """Entries are found without building a dict."""
+
+        d = dictreader.load_plover_dict(self.dict_path, self.cache_dir)
+        self.assertFalse(isinstance(d, dict))
+        self.assertEquals(len(d), 4)
+        self.assertEquals(d["-F"], "of")
+        self.assertEquals(d.get(u"KAF/AEU"), u"caf\xe9")
+        self.assertEquals(d.get("TKOG"), None)
+        self.assertTrue("WA" in d)
+        self.assertFalse("WAS" in d)
+        self.assertRaises(KeyError, lambda: d["WAS"])
+        self.assertEquals(dict(d.iteritems()), 
+                          dictreader.load_dict(self.dict_path))
+
+    def test_stroke_index(self):
+
+        """The cache records stroke prefixes and the longest key."""
+
+        d = dictreader.load_plover_dict(self.dict_path, self.cache_dir)
+        self.assertEquals(d.max_number_of_strokes, 2)
+        self.assertEquals(list(d.stroke_prefixes), [u"KAF"])
+        self.assertTrue("KAF" in d.stroke_prefixes)
+        self.assertFalse("KAF/AEU" in d.stroke_prefixes)
+
+    def test_cache_reused(self):
+
+        """A second load maps the cache written by the first."""
+
+        first = dictreader.load_plover_dict(self.dict_path, self.cache_dir)
+        second = dictreader.load_plover_dict(self.dict_path, self.cache_dir)
+        self.assertEquals(first.cache_path, second.cache_path)
+        self.assertEquals(os.listdir(self.cache_dir), 
+                          [os.path.basename(first.cache_path)])
+
+    def test_stale_cache_rebuilt(self):
+
+        """Changing the json dict invalidates its cache."""
+
+        d = dictreader.load_plover_dict(self.dict_path, self.cache_dir)
+        self.assertEquals(d["WE"], "we")
+
+        self.write_dict({"WE": "wed"})
+        d = dictreader.load_plover_dict(self.dict_path, self.cache_dir)
+        self.assertEquals(len(d), 1)
+        self.assertEquals(d["WE"], "wed")
+
+    def test_touched_dict_keeps_cache(self):
+
+        """A new mtime with unchanged contents does not recompile."""
+
+        d = dictreader.load_plover_dict(self.dict_path, self.cache_dir)
+        os.utime(self.dict_path, (0, 0))
+        d = dictreader.load_plover_dict(self.dict_path, self.cache_dir)
+        self.assertEquals(d.source_mtime, 0)
+        self.assertEquals(d["WA"], "was")
+
+
 if __name__ == '__main__':
     unittest.main()
 
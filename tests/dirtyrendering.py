@@ -0,0 +1,86 @@
+# Copyright (c) 2011 Pragma Nolint. 
+# See LICENSE.txt for details.
+
+"""Test that only the changed parts of the screen are painted."""
+
+# Hack so that all modules can be imported from Fly, 
+# but this can be run just by calling it as a script.
+import sys, os
+sys.path.append(os.path.dirname(os.getcwd()))
+
+import unittest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame
+
+from fly.gui import collection
+from fly.gui import constants
+from fly.gui import genericelements
+
+
+class DirtyRenderingTest(unittest.TestCase):
+
+    """Elements collection repaints only what changed."""
+
+    def setUp(self):
+        pygame.init()
+        genericelements.fonts.clear()
+        genericelements.text_surfaces.clear()
+        self.screen = pygame.Surface((constants.SCREEN_WIDTH, 
+                                      constants.SCREEN_HEIGHT))
+        self.gui = collection.ElementsCollection(["lesson one", "lesson two"])
+
+    def tearDown(self):
+        pygame.quit()
+
+    def assert_same_as_full_redraw(self):
+        full = pygame.Surface(self.screen.get_size())
+        self.gui.redraw_all()
+        self.gui.draw(full)
+        self.assertEquals(pygame.image.tostring(full, "RGB"),
+                          pygame.image.tostring(self.screen, "RGB"))
+
+    def test_first_frame_is_full(self):
+
+        """The first frame paints the whole screen."""
+
+        rects = self.gui.draw(self.screen)
+        self.assertEquals(rects, [self.screen.get_rect()])
+
+    def test_unchanged_frame_paints_nothing(self):
+
+        """Nothing is painted when nothing changed."""
+
+        self.gui.update_speed_bar(0, 1)
+        self.gui.draw(self.screen)
+        self.gui.update_speed_bar(0, 1)
+        self.assertEquals(self.gui.draw(self.screen), [])
+
+    def test_changed_caption(self):
+
+        """A new word to type repaints only its caption."""
+
+        self.gui.draw(self.screen)
+        self.gui.set_word_to_type("KAT", "cat")
+        rects = self.gui.draw(self.screen)
+        self.assertTrue(rects, "actually %s" % rects)
+        area = sum(rect.width * rect.height for rect in rects)
+        screen_area = self.screen.get_width() * self.screen.get_height()
+        self.assertTrue(area < screen_area / 4, 
+                        "actually %s" % area)
+        self.assert_same_as_full_redraw()
+
+    def test_hidden_element(self):
+
+        """An element that is no longer displayed is cleared."""
+
+        self.gui.draw(self.screen)
+        self.gui.info_panel.toggle_info_panel()
+        self.gui.speed_bar.toggle_display()
+        self.gui.toggle_text_field_style()
+        self.assertTrue(self.gui.draw(self.screen))
+        self.assert_same_as_full_redraw()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# Copyright (c) 2011 Pragma Nolint. 
+# See LICENSE.txt for details.
+
+"""Test the shared index of english words to steno chords."""
+
+# Hack so that all modules can be imported from Fly, 
+# but this can be run just by calling it as a script.
+import sys, os
+sys.path.append(os.path.dirname(os.getcwd()))
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from fly.translation import inverseindex
+from fly.utils import dictionaryreader as dictreader 
+
+
+class InverseIndexTest(unittest.TestCase):
+
+    """English words map to every chord that produces them."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.temp_dir, "cache")
+        self.dict_path = os.path.join(self.temp_dir, "dict.json")
+        with open(self.dict_path, 'w') as f:
+            json.dump({"WE": "we", "WE/WE": "we", "-F": "of", 
+                       "KPA*/WE": "We"}, f)
+
+    def tearDown(self):
+        inverseindex._indexes.clear()
+        shutil.rmtree(self.temp_dir)
+
+    def load_index(self):
+
+        """Load the test dict and return its index."""
+
+        dictionary = dictreader.load_plover_dict(self.dict_path, 
+                                                 self.cache_dir)
+        return inverseindex.get_inverse_index(dictionary)
+
+    def test_lookup(self):
+
+        """Exact words come first, then lower case words."""
+
+        index = self.load_index()
+        self.assertEquals(sorted(index["we"]), ["WE", "WE/WE"])
+        self.assertEquals(index.lookup("We").chords, ["KPA*/WE"])
+        self.assertEquals(sorted(index.lookup("WE").chords), ["WE", "WE/WE"])
+        self.assertEquals(index.lookup("Of").chords, ["-F"])
+        self.assertTrue(index.lookup("missing") is None)
+        self.assertFalse("Of" in index)
+
+    def test_canon_chord(self):
+
+        """The easiest chord is worked out when the index is built."""
+
+        index = self.load_index()
+        self.assertEquals(index.get_entry("we").canon_chord, "WE")
+        self.assertTrue(index.get_entry("missing") is None)
+
+    def test_stored_and_shared(self):
+
+        """The index is stored next to the dict cache and shared."""
+
+        index = self.load_index()
+        self.assertTrue(index is self.load_index())
+        self.assertEquals(len(index), 3)
+        index_files = [name for name in os.listdir(self.cache_dir)
+                       if inverseindex.INDEX_FILE_SUFFIX in name]
+        self.assertEquals(len(index_files), 1)
+
+        inverseindex._indexes.clear()
+        self.assertEquals(self.load_index()["of"], ["-F"])
+
+    def test_plain_dict(self):
+
+        """Dicts that are not compiled are indexed in memory."""
+
+        index = inverseindex.get_inverse_index({"-F": "of"})
+        self.assertEquals(index["of"], ["-F"])
+        self.assertRaises(KeyError, lambda: index["missing"])
+
+
+if __name__ == '__main__':
+    unittest.main()
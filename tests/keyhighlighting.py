@@ -125,6 +125,29 @@ class KeyHighlightingTest(unittest.TestCase):
         self.assertTrue(qwerty_letters == ["QA", "U"], 
                         "actually %s" % qwerty_letters)
 
+    def test_get_stroke_index(self):
+
+        """Stroke index points at the chord get_stroke returns."""
+
+        for input_word in ["", "AU", "AI", "AU/ROR", "AU/ROR/RA/RA"]:
+            index = self.klighter.get_stroke_index("AU/ROR/RA", input_word)
+            stroke = self.klighter.get_stroke("AU/ROR/RA", input_word)
+            self.assertTrue("AU/ROR/RA".split("/")[index] == stroke,
+                            "actually %s for %s" % (index, input_word))
+
+    def test_precompute(self):
+
+        """Precomputed highlighting is looked up for every stroke."""
+
+        self.klighter.precompute(["SAEUF/-F"])
+        highlight = self.klighter.highlights[("SAEUF/-F", 1)]
+        self.assertTrue(highlight.qwerty_letters == ("U",), 
+                        "actually %s" % (highlight,))
+        qwerty_letters = self.klighter.get_qwerty_letters_to_type("SAEUF/-F",
+                                                                  "SAEUF")
+        self.assertTrue(qwerty_letters == ["U"], 
+                        "actually %s" % qwerty_letters)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,104 @@
+# Copyright (c) 2011 Pragma Nolint. 
+# See LICENSE.txt for details.
+
+"""Test compiled lesson bundles are read in place like the lesson files."""
+
+# Hack so that all modules can be imported from Fly, 
+# but this can be run just by calling it as a script.
+import sys, os
+sys.path.append(os.path.dirname(os.getcwd()))
+
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+from fly.lessons.helpers import bundle
+
+
+class LessonBundleTest(unittest.TestCase):
+
+    """A bundle holds the contents of a lesson and its chords file."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.lesson_path = os.path.join(self.temp_dir, "poem.les")
+        self.chords_path = os.path.join(self.temp_dir, "poem.chd")
+        self.write(self.lesson_path, 
+                   "<in_order, sentence>\nRoses are red,\nviolets are.\n")
+        self.write(self.chords_path, "\nROEZ R RED/KW-BG\nVOLTS R/TP-PL")
+        self.bundle = bundle.open_bundle(self.lesson_path, self.chords_path)
+
+    def tearDown(self):
+        self.bundle.close()
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, path, content):
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def test_lists(self):
+        self.assertEqual(self.bundle.directive_line, "<in_order, sentence>")
+        self.assertEqual(self.bundle.chords, 
+                         ["ROEZ", "R", "RED/KW-BG", "VOLTS", "R/TP-PL"])
+        self.assertEqual(self.bundle.sentences, 
+                         ["Roses are red,", "violets are."])
+        self.assertEqual(self.bundle.chord_sentences, 
+                         ["ROEZ R RED/KW-BG", "VOLTS R/TP-PL"])
+        self.assertEqual(self.bundle.translations, 
+                         ["roses", "are", "red", ",", "violets", "are", "."])
+        self.assertEqual(self.bundle.chords[-1], "R/TP-PL")
+        self.assertEqual(self.bundle.chords[1:3], ["R", "RED/KW-BG"])
+
+    def test_chord_translations(self):
+        translations = self.bundle.chord_translations
+        self.assertEqual(len(translations), 5)
+        self.assertEqual(translations["ROEZ"], "Roses")
+        self.assertEqual(translations["RED/KW-BG"], "red,")
+        self.assertEqual(translations["R/TP-PL"], "are.")
+        self.assertFalse("WUB" in translations)
+        self.assertRaises(KeyError, lambda: translations["WUB"])
+        self.assertEqual(list(translations.keys()), 
+                         ["ROEZ", "R", "RED/KW-BG", "VOLTS", "R/TP-PL"])
+
+    def test_sentence_map(self):
+        sentence_map = self.bundle.sentence_map
+        self.assertEqual(dict(sentence_map), {0: [0, 1, 2, 3], 
+                                              1: [4, 5, 6]})
+        self.assertEqual(sentence_map.find_sentence(0), 0)
+        self.assertEqual(sentence_map.find_sentence(3), 0)
+        self.assertEqual(sentence_map.find_sentence(4), 1)
+        self.assertEqual(sentence_map.find_sentence(7), None)
+
+    def test_reopened_without_compiling(self):
+        bundle_path = bundle.get_bundle_path(self.lesson_path)
+        modified = int(os.path.getmtime(bundle_path))
+        os.utime(bundle_path, (modified - 10, modified - 10))
+        reopened = bundle.open_bundle(self.lesson_path, self.chords_path)
+        self.assertEqual(os.path.getmtime(bundle_path), modified - 10)
+        self.assertEqual(reopened.chords, self.bundle.chords)
+        reopened.close()
+
+    def test_recompiled_when_lesson_changes(self):
+        self.write(self.lesson_path, "<randomized, word>\nRoses\n")
+        self.write(self.chords_path, "\nROEZ")
+        modified = time.time() + 10
+        os.utime(self.lesson_path, (modified, modified))
+        changed = bundle.open_bundle(self.lesson_path, self.chords_path)
+        self.assertEqual(changed.directive_line, "<randomized, word>")
+        self.assertEqual(changed.chords, ["ROEZ"])
+        changed.close()
+
+    def test_in_memory(self):
+        fingerprint = bundle.get_fingerprint(self.lesson_path, 
+                                             self.chords_path)
+        content = bundle.compile_bundle(self.lesson_path, self.chords_path,
+                                        fingerprint)
+        in_memory = bundle.LessonBundle(content)
+        self.assertEqual(in_memory.chords, self.bundle.chords)
+        self.assertRaises(ValueError, bundle.LessonBundle, content[:-3])
+
+
+if __name__ == '__main__':
+    unittest.main()
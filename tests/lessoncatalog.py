@@ -0,0 +1,209 @@
+# Copyright (c) 2011 Pragma Nolint. 
+# See LICENSE.txt for details.
+
+"""Test the lesson catalog and preparing lessons when they are chosen."""
+
+# Hack so that all modules can be imported from Fly, 
+# but this can be run just by calling it as a script.
+import sys, os
+sys.path.append(os.path.dirname(os.getcwd()))
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from fly.lessons import control
+from fly.lessons.helpers.catalog import LessonCatalog
+from fly.utils import files as fileutils
+
+
+class LessonDirectoryTestCase(unittest.TestCase):
+
+    """Sets up a directory of three lessons."""
+
+    def setUp(self):
+        self.lessons_dir = tempfile.mkdtemp()
+        for name, directive in (("1_first", "randomized"), 
+                                ("2_second", "spaced"),
+                                ("3_third", "in_order")):
+            self.write_lesson(name, "<%s, word>\nwe of\n" % directive)
+
+    def tearDown(self):
+        shutil.rmtree(self.lessons_dir)
+
+    def write_lesson(self, name, text):
+        with open(os.path.join(self.lessons_dir, name + ".les"), 'w') as f:
+            f.write(text)
+
+
+class LessonCatalogTest(LessonDirectoryTestCase):
+
+    """Directives of lessons used before are known without reading them."""
+
+    def test_new_lessons(self):
+        lessons = LessonCatalog(self.lessons_dir).find_lessons()
+        self.assertEqual([lesson.nice_name for lesson in lessons],
+                         ["1 First", "2 Second", "3 Third"])
+        self.assertEqual(lessons[1].retrieval_directive, None)
+
+    def test_recorded_lessons(self):
+        catalog = LessonCatalog(self.lessons_dir)
+        lesson = catalog.find_lessons()[1]
+        lesson.retrieval_directive = "spaced"
+        lesson.display_directive = "word"
+        catalog.record(lesson)
+        catalog.save()
+
+        lessons = LessonCatalog(self.lessons_dir).find_lessons()
+        self.assertEqual(lessons[1].name, "2_second")
+        self.assertEqual(lessons[1].retrieval_directive, "spaced")
+        self.assertEqual(lessons[0].retrieval_directive, None)
+
+    def test_changed_lesson(self):
+        catalog = LessonCatalog(self.lessons_dir)
+        lesson = catalog.find_lessons()[1]
+        lesson.retrieval_directive = "spaced"
+        catalog.record(lesson)
+        catalog.save()
+        self.write_lesson("2_second", "<randomized, word>\nwe of we\n")
+
+        lessons = LessonCatalog(self.lessons_dir).find_lessons()
+        self.assertEqual(lessons[1].retrieval_directive, None)
+
+
+class LessonControlTestCase(LessonDirectoryTestCase):
+
+    """Sets up lesson control of the directory of lessons."""
+
+    def setUp(self):
+        LessonDirectoryTestCase.setUp(self)
+        self.get_lessons_directory = fileutils.get_lessons_directory
+        fileutils.get_lessons_directory = lambda: self.lessons_dir
+        self.control = control.LessonControl()
+        self.control.set_dictionary({"WE": "we", "-F": "of"})
+
+    def tearDown(self):
+        # Lessons are prepared in the background; let them finish before
+        # the directory goes.
+        for thread in (self.control.chooser, self.control.prefetcher):
+            if thread is not None:
+                thread.join()
+        fileutils.get_lessons_directory = self.get_lessons_directory
+        LessonDirectoryTestCase.tearDown(self)
+
+
+class LessonOnDemandTest(LessonControlTestCase):
+
+    """Lessons are read and translated when chosen, the next one ahead."""
+
+    def test_only_first_lesson_prepared(self):
+        self.control.prepare_lessons("2 Second")
+        self.assertEqual([self.control.is_lesson_ready(name) for name in 
+                          self.control.get_lesson_names()],
+                         [False, True, False])
+
+    def test_chosen_lesson_prepared(self):
+        word_chooser = self.control.get_word_chooser("2 Second")
+        self.assertEqual(word_chooser.get_word_and_translation(), 
+                         ("WE", "we"))
+        lesson = self.control.get_lesson("2_second")
+        self.assertEqual(lesson.retrieval_directive, "spaced")
+
+        self.control.prefetcher.join()
+        self.assertTrue(self.control.is_lesson_ready("3_third"))
+        self.assertFalse(self.control.is_lesson_ready("1_first"))
+
+        lessons = LessonCatalog(self.lessons_dir).find_lessons()
+        self.assertEqual([lesson.retrieval_directive for lesson in lessons],
+                         [None, "spaced", "in_order"])
+
+
+class LessonSwitchingTest(LessonControlTestCase):
+
+    """Lessons chosen are prepared in the background and kept warm."""
+
+    def choose(self, lesson_name, on_ready=None):
+        self.control.choose_lesson(lesson_name, on_ready)
+        self.control.chooser.join()
+
+    def test_word_chooser_taken_once(self):
+        ready = []
+        self.choose("2 Second", lambda: ready.append(True))
+        self.assertEqual(ready, [True])
+        word_chooser = self.control.take_word_chooser()
+        self.assertEqual(word_chooser.get_word_and_translation(), 
+                         ("WE", "we"))
+        self.assertEqual(self.control.take_word_chooser(), None)
+
+    def test_only_last_choice_kept(self):
+        self.choose("2 Second")
+        self.control.choose_lesson("3 Third")
+        self.assertEqual(self.control.take_word_chooser(), None)
+        self.control.chooser.join()
+        # The lesson in use only changes once its word chooser is taken.
+        self.assertEqual(self.control.current_lesson, None)
+        self.assertNotEqual(self.control.take_word_chooser(), None)
+        self.assertEqual(self.control.current_lesson.name, "3_third")
+
+    def test_failed_choice_raised(self):
+        ready = []
+        os.remove(os.path.join(self.lessons_dir, "2_second.les"))
+        self.choose("2 Second", lambda: ready.append(True))
+        self.assertEqual(ready, [True])
+        self.assertEqual(self.control.take_word_chooser(), None)
+        self.assertRaises(IOError, self.control.raise_choice_error)
+
+        # Only the lesson last chosen counts.
+        self.choose("3 Third")
+        self.control.raise_choice_error()
+        self.assertNotEqual(self.control.take_word_chooser(), None)
+
+    def test_lesson_in_use_not_chosen_again(self):
+        self.control.get_word_chooser("2 Second")
+        self.choose("2 Second")
+        self.assertEqual(self.control.take_word_chooser(), None)
+
+    def test_least_recently_used_released(self):
+        self.control.WARM_LESSON_COUNT = 2
+        word_chooser = self.control.get_word_chooser("1 First")
+        self.control.prefetcher.join()
+        self.control.prepare_lesson(self.control.get_lesson("3_third"))
+        self.assertEqual([self.control.is_lesson_ready(name) for name in 
+                          self.control.get_lesson_names()],
+                         [True, False, True])
+
+        # Released lessons are prepared again when chosen.
+        self.choose("2 Second")
+        self.assertTrue(self.control.is_lesson_ready("2_second"))
+        self.assertNotEqual(word_chooser.get_word_and_translation(), None)
+
+    def test_sentence_lesson_in_use_kept(self):
+        # Sentence word choosers read their lesson as they go, so it must
+        # stay prepared while other lessons come and go.
+        self.write_lesson("4_fourth", "<in_order, sentence>\nwe of\n")
+        self.control.lesson_list = \
+            LessonCatalog(self.lessons_dir).find_lessons()
+        self.control.WARM_LESSON_COUNT = 1
+        self.choose("4 Fourth")
+        word_chooser = self.control.take_word_chooser()
+        for name in ("1 First", "2 Second"):
+            self.choose(name)
+            self.control.prefetcher.join()
+            self.assertTrue(self.control.is_lesson_ready("4_fourth"))
+
+        self.assertEqual(word_chooser.get_word_and_translation(), 
+                         ("WE", "we"))
+        self.assertEqual(word_chooser.get_display_word_and_translation(),
+                         ("WE -F", "we of"))
+        self.assertEqual(word_chooser.return_inputs("WE", "we"),
+                         ("WE", "we"))
+
+        # Once another lesson is taken, it can be released.
+        self.control.take_word_chooser()
+        self.control.prepare_lesson(self.control.get_lesson("1_first"))
+        self.assertFalse(self.control.is_lesson_ready("4_fourth"))
+
+
+if __name__ == '__main__':
+    unittest.main()
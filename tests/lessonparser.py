@@ -0,0 +1,58 @@
+# Copyright (c) 2011 Pragma Nolint. 
+# See LICENSE.txt for details.
+
+"""Test that lesson files are parsed in one pass."""
+
+# Hack so that all modules can be imported from Fly, 
+# but this can be run just by calling it as a script.
+import sys, os
+sys.path.append(os.path.dirname(os.getcwd()))
+
+import os
+import unittest
+
+from fly.lessons.helpers import parser
+from fly.utils import files as fileutils
+
+
+class LessonParserTest(unittest.TestCase):
+
+    """Everything in a lesson file is collected from its lines."""
+
+    def setUp(self):
+        self.text = parser.parse_lesson_lines(
+            ['<randomized, sentence>\n', 
+             'Roses are red,\n',
+             '\n',
+             ' \n',
+             '" Violets <b> are blue."\n'])
+
+    def test_directive_line(self):
+        self.assertEqual(self.text.directive_line, '<randomized, sentence>')
+
+    def test_sentences(self):
+        self.assertEqual(self.text.sentences_list, 
+                         ['Roses are red,', ' '])
+
+    def test_translations_and_sentence_map(self):
+        self.assertEqual(self.text.translation_list,
+                         ['roses', 'are', 'red', ','])
+        self.assertEqual(self.text.sentence_map, {0: [0, 1, 2, 3]})
+
+    def test_tokens(self):
+        # Blank lines are translated too, so chords line up with tokens.
+        self.assertEqual(self.text.token_list,
+                         ['Roses', 'are', 'red,', '{}', '{}', '{}', '{"^}', 
+                          'Violets', 'are', 'blue."'])
+
+    def test_chords_file(self):
+        chords_path = os.path.join(fileutils.get_test_data_directory(),
+                                   "test.chd")
+        sentences, chords = parser.parse_chords_file(chords_path)
+        self.assertEqual(sentences, ['WUB TWO THRE', 'TPOUR TPEUF SEUBGS'])
+        self.assertEqual(chords, ['WUB', 'TWO', 'THRE', 
+                                  'TPOUR', 'TPEUF', 'SEUBGS'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+# Copyright (c) 2011 Pragma Nolint. 
+# See LICENSE.txt for details.
+
+"""Test that chords files are only regenerated when they would change."""
+
+# Hack so that all modules can be imported from Fly, 
+# but this can be run just by calling it as a script.
+import sys, os
+sys.path.append(os.path.dirname(os.getcwd()))
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from fly.lessons.helpers import tochords
+from fly.plover.dictionary import compiled
+
+
+class LessonToChordsTest(unittest.TestCase):
+
+    """Chords files are rebuilt when their lesson or its words change."""
+
+    def setUp(self):
+        self.lessons_dir = tempfile.mkdtemp()
+        self.dictionary = {"WE": "we", "-F": "of", "TK": "do", "-R": "are"}
+        self.write_lesson("first", "<in_order, words>\nwe of\n")
+        self.write_lesson("second", "<in_order, words>\ndo are\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.lessons_dir)
+
+    def write_lesson(self, name, text):
+        with open(self.get_lesson_path(name), 'w') as f:
+            f.write(text)
+
+    def get_lesson_path(self, name):
+        return os.path.join(self.lessons_dir, name + ".les")
+
+    def read_chords(self, name):
+        with open(tochords.get_chords_path(self.get_lesson_path(name))) as f:
+            return f.read()
+
+    def build(self, processes=1):
+
+        """Build both lessons and return the names of those regenerated."""
+
+        for name in ("first", "second"):
+            chords_path = tochords.get_chords_path(self.get_lesson_path(name))
+            if os.path.exists(chords_path):
+                with open(chords_path, 'a') as f:
+                    f.write("\nunchanged")
+        helper = tochords.LessonToChords(self.dictionary, processes)
+        paths = [self.get_lesson_path(name) for name in ("first", "second")]
+        built = [path for path, _ in helper.build(paths)]
+        self.assertEqual(sorted(built), sorted(paths))
+        return sorted(name for name in ("first", "second")
+                      if not self.read_chords(name).endswith("unchanged"))
+
+    def test_missing_chords_are_generated(self):
+        self.assertEqual(self.build(), ["first", "second"])
+        self.assertEqual(self.read_chords("first"), "\nWE -F")
+
+    def test_up_to_date_chords_are_kept(self):
+        self.build()
+        self.assertEqual(self.build(), [])
+
+    def test_changed_lesson_is_regenerated(self):
+        self.build()
+        self.write_lesson("second", "<in_order, words>\nare do\n")
+        self.assertEqual(self.build(), ["second"])
+        self.assertEqual(self.read_chords("second"), "\n-R TK")
+
+    def test_changed_entry_regenerates_lessons_using_it(self):
+        self.build()
+        # A changed dictionary is a new one, as when plover reloads it.
+        self.dictionary = dict(self.dictionary)
+        del self.dictionary["-F"]
+        self.dictionary["-FL"] = "of"
+        self.assertEqual(self.build(), ["first"])
+        self.assertEqual(self.read_chords("first"), "\nWE -FL")
+
+    def test_added_entry_regenerates_lessons_using_it(self):
+        self.write_lesson("second", "<in_order, words>\ndo were\n")
+        self.build()
+        self.dictionary = dict(self.dictionary, WR="were")
+        self.assertEqual(self.build(), ["second"])
+        self.assertEqual(self.read_chords("second"), "\nTK WR")
+
+    def test_lessons_translated_in_pool(self):
+        self.assertEqual(self.build(processes=2), ["first", "second"])
+        self.assertEqual(self.read_chords("second"), "\nTK -R")
+        self.assertEqual(self.build(processes=2), [])
+
+    def test_compiled_dictionary_in_pool(self):
+        cache_path = os.path.join(self.lessons_dir, "dictionary.cdict")
+        compiled.compile_dictionary(self.dictionary, cache_path)
+        self.dictionary = compiled.CompiledDictionary(cache_path)
+        self.assertEqual(self.build(processes=2), ["first", "second"])
+        self.assertEqual(self.read_chords("first"), "\nWE -F")
+        # Compiled without a source hash, so its words are still checked.
+        self.assertEqual(
+            tochords.LessonToChords(self.dictionary).dictionary_hash, None)
+
+    def test_no_pool_while_threads_run(self):
+        stop = threading.Event()
+        thread = threading.Thread(target=stop.wait)
+        thread.start()
+        try:
+            self.assertEqual(self.build(processes=2), ["first", "second"])
+        finally:
+            stop.set()
+            thread.join()
+        self.assertEqual(self.read_chords("second"), "\nTK -R")
+
+    def test_single_lesson(self):
+        helper = tochords.LessonToChords(self.dictionary, 1)
+        path = helper.get_chords_file_path(self.get_lesson_path("first"))
+        self.assertEqual(path, tochords.get_chords_path(
+            self.get_lesson_path("first")))
+        self.assertEqual(self.read_chords("first"), "\nWE -F")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+# Copyright (c) 2011 Pragma Nolint.
+# See LICENSE.txt for details.
+
+"""Test keeping the user's progress on lessons between sessions."""
+
+# Hack so that all modules can be imported from Fly,
+# but this can be run just by calling it as a script.
+import sys, os
+sys.path.append(os.path.dirname(os.getcwd()))
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from fly.statistics import progress
+from fly.models.wordchooser import spaced
+from fly.models.wordchooser import inorder
+
+
+class ProgressStoreTestCase(unittest.TestCase):
+
+    """Sets up a store in a temporary directory."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.directory, "progress.sqlite")
+        self.store = progress.ProgressStore(self.file_path)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def reopen(self):
+        self.store.close()
+        self.store = progress.ProgressStore(self.file_path)
+
+
+class ProgressStoreTest(ProgressStoreTestCase):
+
+    """Progress is written in the background and read back."""
+
+    def test_no_progress(self):
+        lesson_progress = self.store.get_lesson_progress("1_first")
+        self.assertEqual(lesson_progress.words, {})
+        self.assertEqual(lesson_progress.state, {})
+
+    def test_progress_read_back(self):
+        lesson_progress = self.store.get_lesson_progress("1_first")
+        lesson_progress.record_word("WE", True, spacing=2.0, ease=2.1, due=3)
+        lesson_progress.record_word("WE", False)
+        lesson_progress.record_word("-F", True)
+        lesson_progress.set_state(position=4)
+        self.store.get_lesson_progress("2_second").set_state(index=1)
+        self.reopen()
+
+        lesson_progress = self.store.get_lesson_progress("1_first")
+        word = lesson_progress.words["WE"]
+        self.assertEqual((word.right, word.wrong, word.spacing, word.ease,
+                          word.due), (1, 1, 2.0, 2.1, 3))
+        self.assertEqual(lesson_progress.words["-F"].spacing, None)
+        self.assertEqual(lesson_progress.state, {"position": 4})
+
+    def test_queued_progress_read(self):
+        lesson_progress = self.store.get_lesson_progress("1_first")
+        lesson_progress.record_word("WE", True)
+        lesson_progress = self.store.get_lesson_progress("1_first")
+        self.assertEqual(lesson_progress.words["WE"].right, 1)
+
+    def test_upgrade_keeps_progress(self):
+        self.store.get_lesson_progress("1_first").record_word("WE", True)
+        self.store.close()
+        # Make it look like a database from before sketches were kept.
+        connection = sqlite3.connect(self.file_path)
+        with connection:
+            connection.execute("DROP TABLE sketches")
+            connection.execute("PRAGMA user_version=1")
+        connection.close()
+        self.reopen()
+
+        self.assertEqual(self.store.get_lesson_progress("1_first")
+                         .words["WE"].right, 1)
+        self.store.put_sketch("latency", "sketch")
+        self.assertEqual(self.store.get_sketches(), {"latency": "sketch"})
+
+    def test_newer_version_refused(self):
+        self.store.get_lesson_progress("1_first").record_word("WE", True)
+        self.store.close()
+        connection = sqlite3.connect(self.file_path)
+        with connection:
+            connection.execute("PRAGMA user_version=%d" %
+                               (progress.ProgressStore.SCHEMA_VERSION + 1))
+        connection.close()
+        self.assertRaises(ValueError, progress.ProgressStore, self.file_path)
+
+        # Its progress is still there for the newer version.
+        connection = sqlite3.connect(self.file_path)
+        rows = connection.execute("SELECT chord, right FROM words").fetchall()
+        connection.close()
+        self.assertEqual(rows, [("WE", 1)])
+
+
+class WordChooserProgressTest(ProgressStoreTestCase):
+
+    """Word choosers carry on where they were left."""
+
+    def setUp(self):
+        ProgressStoreTestCase.setUp(self)
+        self.words = ["W%d" % i for i in range(10)]
+        self.word_translation_dict = dict((word, word.lower())
+                                          for word in self.words)
+
+    def get_word_chooser(self, word_chooser_class):
+        word_chooser = word_chooser_class(self.word_translation_dict,
+                                          self.words)
+        word_chooser.set_progress(self.store.get_lesson_progress("lesson"))
+        return word_chooser
+
+    def type_words(self, word_chooser, count):
+        shown = []
+        for i in range(count):
+            shown.append(word_chooser.get_word_and_translation()[0])
+            word_chooser.on_right_word_entered()
+        return shown
+
+    def test_spaced(self):
+        word_chooser = self.get_word_chooser(spaced.RetrieveSpaced)
+        self.type_words(word_chooser, 20)
+        queue = sorted(word_chooser.queue)
+        new_words = list(word_chooser.new_queue)
+        self.reopen()
+
+        resumed = self.get_word_chooser(spaced.RetrieveSpaced)
+        self.assertEqual([entry[::2] for entry in sorted(resumed.queue)],
+                         [entry[::2] for entry in queue])
+        self.assertEqual(list(resumed.new_queue), new_words)
+        self.assertEqual(resumed.position, word_chooser.position)
+        self.assertEqual(resumed.ease, word_chooser.ease)
+
+    def test_spaced_learned_words_not_drilled(self):
+        word_chooser = self.get_word_chooser(spaced.RetrieveSpaced)
+        self.type_words(word_chooser, 200)
+        self.assertTrue(word_chooser.is_done())
+        self.reopen()
+
+        self.assertTrue(self.get_word_chooser(spaced.RetrieveSpaced)
+                        .is_done())
+
+    def test_in_order(self):
+        word_chooser = self.get_word_chooser(inorder.RetrieveInOrder)
+        self.type_words(word_chooser, 3)
+        word_chooser.get_word_and_translation()
+        self.reopen()
+
+        resumed = self.get_word_chooser(inorder.RetrieveInOrder)
+        self.assertEqual(resumed.get_word_and_translation()[0], "W3")
+        self.assertEqual(self.store.get_lesson_progress("lesson")
+                         .words["W0"].right, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
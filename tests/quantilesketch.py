@@ -0,0 +1,122 @@
+# Copyright (c) 2011 Pragma Nolint.
+# See LICENSE.txt for details.
+
+"""Test estimating percentiles of a stream with t-digests."""
+
+# Hack so that all modules can be imported from Fly,
+# but this can be run just by calling it as a script.
+import sys, os
+sys.path.append(os.path.dirname(os.getcwd()))
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from fly.statistics import gatherer
+from fly.statistics import progress
+from fly.statistics.helpers import quantiles
+
+
+class TDigestTest(unittest.TestCase):
+
+    """Percentiles are close to exact ones, in a fixed number of 
+    centroids."""
+
+    FRACTIONS = (0.5, 0.9, 0.99)
+
+    def setUp(self):
+        generator = random.Random(1)
+        self.values = [generator.lognormvariate(0, 0.8)
+                       for i in range(20000)]
+
+    def get_digest(self, values):
+        digest = quantiles.TDigest()
+        for value in values:
+            digest.add(value)
+        return digest
+
+    def assert_close(self, digest, values):
+        for fraction in self.FRACTIONS:
+            exact = numpy.percentile(values, fraction * 100)
+            self.assertTrue(abs(digest.quantile(fraction) - exact) <
+                            0.03 * exact, fraction)
+
+    def test_percentiles(self):
+        digest = self.get_digest(self.values)
+        self.assert_close(digest, self.values)
+        self.assertEqual(len(digest), 20000)
+        self.assertTrue(len(digest.centroids) <= digest.compression)
+        self.assertEqual(digest.quantile(0), min(self.values))
+        self.assertEqual(digest.quantile(1), max(self.values))
+
+    def test_merge(self):
+        digest = self.get_digest(self.values[:5000])
+        digest.merge(self.get_digest(self.values[5000:]))
+        self.assert_close(digest, self.values)
+        self.assertEqual(len(digest), 20000)
+
+    def test_serialize(self):
+        digest = self.get_digest(self.values)
+        read = quantiles.deserialize(digest.serialize())
+        self.assertEqual(read.centroids, digest.centroids)
+        self.assertEqual(read.quantile(0.99), digest.quantile(0.99))
+        self.assertRaises(ValueError, quantiles.deserialize,
+                          digest.serialize()[:-1])
+
+    def test_few_values(self):
+        digest = quantiles.TDigest()
+        self.assertEqual(digest.quantile(0.5), None)
+        digest.add(2.0)
+        self.assertEqual(digest.quantile(0.9), 2.0)
+        digest.add(4.0)
+        self.assertEqual(digest.quantile(0.5), 3.0)
+
+
+class GathererLatencyTest(unittest.TestCase):
+
+    """Time taken per word is sketched per lesson, and over every session
+    in the progress store."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = progress.ProgressStore(os.path.join(self.directory,
+                                                         "progress.sqlite"))
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def type_session(self, latencies):
+        stats = gatherer.StatisticGatherer(progress_store=self.store)
+        stats.last_word_time = 0.0
+        now = 0.0
+        for lesson_name, latency in latencies:
+            now += latency
+            stats.on_stroke(now, "WE", "WE", True, lesson_name)
+        stats.on_stroke(now + 10.0, "WE", "W", None, "first")
+        return stats
+
+    def test_percentiles(self):
+        stats = self.type_session([("first", 1.0), ("first", 3.0),
+                                   ("second", 2.0)])
+        self.assertEqual(stats.get_latency_percentiles("first")[0], 2.0)
+        self.assertEqual(stats.get_latency_percentiles()[0], 2.0)
+        self.assertEqual(stats.get_latency_percentiles("third"), None)
+
+    def test_merged_between_sessions(self):
+        self.type_session([("first", 1.0)]).close()
+        self.type_session([("first", 3.0), ("second", 2.0)]).close()
+        sketches = self.store.get_sketches()
+        self.assertEqual(sorted(sketches), ["latency", "latency/first",
+                                            "latency/second"])
+        lifetime = quantiles.deserialize(sketches["latency/first"])
+        self.assertEqual(len(lifetime), 2)
+        self.assertEqual(lifetime.quantile(0.5), 2.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+# Copyright (c) 2011 Pragma Nolint.
+# See LICENSE.txt for details.
+
+"""Test analyzing session files and reading back their summary."""
+
+# Hack so that all modules can be imported from Fly,
+# but this can be run just by calling it as a script.
+import sys, os
+sys.path.append(os.path.dirname(os.getcwd()))
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from fly.statistics import analyze
+from fly.statistics import summary
+from fly.statistics.helpers import strokelog
+from fly.statistics.helpers.strokelog import StrokeRecord
+
+
+class SessionAnalysisTest(unittest.TestCase):
+
+    """Strokes of many sessions are loaded into arrays and summarized."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file_paths = []
+        # WE is typed right in 0.1 to 1.0 seconds, -F is typed wrong as TP
+        # once in four and takes 2 seconds.
+        strokes = []
+        for i in range(10):
+            strokes.append(("WE", "WE", True, 0.1 * (i + 1), "first"))
+            strokes.append(("-F", "TP" if i % 4 == 0 else "-F",
+                            i % 4 != 0, 2.0, "first"))
+        self.write_session(1000.0, strokes[:12])
+        self.write_session(2000.0, strokes[12:] +
+                           [("WE", "W", None, 0.5, "second"),
+                            ("WE", "WE", True, 0.5, "second")])
+        self.strokes = analyze.load_sessions(self.file_paths)
+        self.names = self.strokes.names
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_session(self, start_time, strokes):
+        file_path = os.path.join(self.directory, "%d.session" % start_time)
+        log = strokelog.StrokeLog(file_path, batch_size=5,
+                                  start_time=start_time)
+        for i, (target, entered, correct, latency, lesson) in \
+                enumerate(strokes):
+            log.record(StrokeRecord(start_time + i, target, entered, correct,
+                                    latency, lesson))
+        log.close()
+        self.file_paths.append(file_path)
+
+    def test_load(self):
+        strokes = self.strokes
+        self.assertEqual(len(strokes), 22)
+        self.assertEqual(list(strokes.session), [0] * 12 + [1] * 10)
+        self.assertEqual(strokes.time[12], 2000.0)
+        self.assertEqual(self.names[strokes.target[1]], "-F")
+        self.assertEqual(self.names[strokes.entered[20]], "W")
+        self.assertEqual(self.names[strokes.lesson[21]], "second")
+        self.assertEqual(strokes.outcome[20], strokelog.UNFINISHED)
+
+    def test_latency_percentiles(self):
+        latencies = analyze.get_latency_percentiles(self.strokes)
+        we = self.names.index("WE")
+        expected = numpy.percentile([0.1 * (i + 1) for i in range(10)] +
+                                    [0.5], analyze.PERCENTILES)
+        self.assertTrue(numpy.allclose(latencies[we], expected))
+        self.assertTrue(numpy.isnan(latencies[self.names.index("TP")]).all())
+
+    def test_chord_errors(self):
+        attempts, errors = analyze.get_chord_errors(self.strokes)
+        f = self.names.index("-F")
+        self.assertEqual((attempts[f], errors[f]), (10, 3))
+        self.assertEqual(attempts[self.names.index("WE")], 11)
+
+    def test_key_and_finger_errors(self):
+        key_matrix = analyze.get_key_matrix(self.names)
+        attempts, errors = analyze.get_key_errors(self.strokes, key_matrix)
+        keys = analyze.chordfeatures.STENO_KEYS
+        errors = dict(zip(keys, errors))
+        # -F typed as TP gets -F, T- and P- wrong.
+        self.assertEqual([errors[key] for key in ("-F", "T-", "P-", "W-")],
+                         [3, 3, 3, 0])
+        self.assertEqual(dict(zip(keys, attempts))["-F"], 10)
+
+        fingers = ["left ring", "right index", "right thumb"]
+        attempts, errors = analyze.get_finger_errors(self.strokes,
+                                                     key_matrix, fingers)
+        self.assertEqual(list(errors), [3, 3, 0])
+
+    def test_speeds_and_trends(self):
+        session, lesson, words, words_per_min, fraction_accurate = \
+            analyze.get_speeds(self.strokes)
+        self.assertEqual([self.names[number] for number in lesson],
+                         ["first", "first", "second"])
+        self.assertEqual(list(session), [0, 1, 1])
+        self.assertEqual(list(words), [10, 7, 1])
+        seconds = sum(0.1 * (i + 1) for i in range(6)) + 6 * 2.0
+        self.assertAlmostEqual(words_per_min[0], 60 * 10 / seconds, 2)
+
+        lessons, slopes = analyze.get_trends(lesson, words_per_min)
+        self.assertAlmostEqual(slopes[0], words_per_min[1] - words_per_min[0])
+        self.assertEqual(slopes[1], 0)
+
+    def test_summary_weights(self):
+        file_path = os.path.join(self.directory, "summary.json")
+        summary.write_summary(analyze.summarize(self.strokes), file_path)
+        read = summary.read_summary(file_path)
+        self.assertEqual(read["sessions"], 2)
+        chords = summary.get_rows(read, "chords")
+        self.assertEqual(chords["-F"]["errors"], 3)
+
+        weights = summary.load_difficulty_weights(file_path)
+        self.assertEqual(sorted(weights), ["-F", "WE"])
+        self.assertTrue(weights["-F"] > 1 > weights["WE"])
+        self.assertEqual(
+            summary.load_difficulty_weights(os.path.join(self.directory,
+                                                         "missing.json")),
+            {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+# Copyright (c) 2011 Pragma Nolint. 
+# See LICENSE.txt for details.
+
+"""Test measuring recent typing speed and accuracy."""
+
+# Hack so that all modules can be imported from Fly, 
+# but this can be run just by calling it as a script.
+import sys, os
+sys.path.append(os.path.dirname(os.getcwd()))
+
+import time
+import unittest
+
+from fly.statistics import gatherer
+from fly.statistics.helpers import clock
+from fly.statistics.helpers import speed
+
+
+class ClockTest(unittest.TestCase):
+
+    def test_monotonic(self):
+        first = clock.monotonic()
+        self.assertTrue(clock.monotonic() >= first)
+
+    def test_from_wall_time(self):
+        now = clock.monotonic()
+        self.assertTrue(abs(clock.from_wall_time(time.time() - 5) - 
+                            (now - 5)) < 0.5)
+        self.assertTrue(clock.from_wall_time(time.time() + 5) <= 
+                        clock.monotonic())
+
+
+class WindowMeterTest(unittest.TestCase):
+
+    """Only the last words or seconds count."""
+
+    def type_words(self, meter, outcomes, interval=1.0):
+        for i, right in enumerate(outcomes):
+            meter.on_word_entered(right, now=(i + 1) * interval)
+
+    def test_last_words(self):
+        meter = speed.WindowMeter(max_words=4)
+        meter.reset(now=0)
+        self.type_words(meter, [False] * 10 + [True] * 4)
+        self.assertEqual(meter.get_fraction_accurate(now=14), 1.0)
+        self.assertEqual(meter.get_words_per_min(now=14), 60.0)
+
+        # Speed falls while the user is idle.
+        self.assertEqual(meter.get_words_per_min(now=18), 30.0)
+
+    def test_last_seconds(self):
+        meter = speed.WindowMeter(max_seconds=10)
+        meter.reset(now=0)
+        self.type_words(meter, [True] * 20 + [False] * 10, interval=0.5)
+        self.assertEqual(meter.get_fraction_accurate(now=15.25), 0.5)
+        self.assertEqual(meter.get_words_per_min(now=15.25), 60.0)
+        self.assertEqual(meter.get_words_per_min(now=100), 0.0)
+
+
+class DecayingMeterTest(unittest.TestCase):
+
+    """Older words count less."""
+
+    def test_steady_speed(self):
+        meter = speed.DecayingMeter(half_life=5)
+        meter.reset(now=0)
+        for i in range(200):
+            meter.on_word_entered(True, now=(i + 1) * 0.5)
+        self.assertTrue(abs(meter.get_words_per_min(now=100.25) - 120) < 2)
+        self.assertEqual(meter.get_fraction_accurate(), 1.0)
+
+    def test_recent_words_count_more(self):
+        meter = speed.DecayingMeter(half_life=5)
+        meter.reset(now=0)
+        for i in range(100):
+            meter.on_word_entered(False, now=i + 1)
+        for i in range(20):
+            meter.on_word_entered(True, now=101 + i)
+        self.assertTrue(meter.get_fraction_accurate() > 0.9)
+
+        # Speed falls while the user is idle.
+        self.assertTrue(meter.get_words_per_min(now=130) <
+                        meter.get_words_per_min(now=120) / 2)
+
+
+
+class GathererMeterTest(unittest.TestCase):
+
+    """The recent meter of the statistics times words from when they were
+    shown to when their stroke was captured."""
+
+    def test_word_timed_from_shown(self):
+        stats = gatherer.StatisticGatherer()
+        stats.recent_meter = speed.WindowMeter(max_words=10)
+        now = time.time()
+        stats.on_right_word_entered(now - 30)
+        stats.on_word_shown(now - 3)
+        stats.on_right_word_entered(now - 2)
+        stats.on_wrong_word_entered(now - 1.5)
+
+        words = list(stats.recent_meter.words)
+        self.assertEqual([right for _, _, right in words], [True, False])
+        self.assertTrue(abs(words[0][1] - words[0][0] - 1.0) < 0.01)
+        self.assertTrue(abs(words[1][1] - words[1][0] - 0.5) < 0.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+# Copyright (c) 2011 Pragma Nolint. 
+# See LICENSE.txt for details.
+
+"""Test loading the dictionary and lessons in the background."""
+
+# Hack so that all modules can be imported from Fly, 
+# but this can be run just by calling it as a script.
+import sys, os
+sys.path.append(os.path.dirname(os.getcwd()))
+
+import unittest
+
+from fly import loader
+
+
+class PloverControlStandIn(object):
+
+    """Loads a small dictionary as if it were read in two chunks."""
+
+    def load_dictionary(self, progress=None):
+        progress(50, 100)
+        progress(100, 100)
+        self.dictionary = {"KAT": "cat"}
+        return self.dictionary
+
+    def get_dictionary(self):
+        return self.dictionary
+
+
+class LessonControlStandIn(object):
+
+    """Prepares two lessons, the first one given first."""
+
+    def __init__(self):
+        self.dictionary = None
+        self.prepared = []
+
+    def set_dictionary(self, dictionary):
+        self.dictionary = dictionary
+
+    def prepare_lessons(self, first_lesson_name=None, progress=None):
+        for lesson in [first_lesson_name, "other"]:
+            self.prepared.append(lesson)
+            progress(len(self.prepared), 2)
+
+    def is_lesson_ready(self, name):
+        return name in self.prepared
+
+
+class StartupLoaderTest(unittest.TestCase):
+
+    """Progress is reported and lessons become ready as they load."""
+
+    def setUp(self):
+        self.percentages = []
+        self.lesson_control = LessonControlStandIn()
+        self.loader = loader.StartupLoader(PloverControlStandIn(),
+                                           self.lesson_control, "first",
+                                           self.on_progress)
+
+    def on_progress(self):
+        self.percentages.append(self.loader.get_percent_done())
+
+    def test_progress(self):
+
+        """Progress only goes up, and reaches 100% when finished."""
+
+        self.assertEquals(self.loader.get_percent_done(), 0)
+        self.loader.start()
+        self.loader.join()
+        self.assertTrue(self.loader.finished)
+        self.assertEquals(self.percentages, sorted(self.percentages))
+        self.assertEquals(self.percentages[0], 25)
+        self.assertEquals(self.percentages[-1], 100)
+
+    def test_lessons_ready(self):
+
+        """Lessons are ready once prepared, the first lesson first."""
+
+        self.assertFalse(self.loader.is_lesson_ready("first"))
+        self.loader.start()
+        self.loader.join()
+        self.assertEquals(self.lesson_control.dictionary, {"KAT": "cat"})
+        self.assertEquals(self.lesson_control.prepared, ["first", "other"])
+        self.assertTrue(self.loader.is_lesson_ready("first"))
+        self.loader.raise_error()
+
+    def test_other_lessons_ready_after_loading(self):
+
+        """Once loading has finished, other lessons are prepared on demand."""
+
+        self.lesson_control.prepare_lessons = \
+            lambda first_lesson_name, progress: progress(1, 1)
+        self.loader.start()
+        self.loader.join()
+        self.assertTrue(self.loader.is_lesson_ready("unprepared"))
+
+    def test_error(self):
+
+        """An error while loading is raised in the caller."""
+
+        self.lesson_control.prepare_lessons = None
+        self.loader.start()
+        self.loader.join()
+        self.assertTrue(self.loader.finished)
+        self.assertRaises(TypeError, self.loader.raise_error)
+
+
+if __name__ == '__main__':
+    unittest.main()
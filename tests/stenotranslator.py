@@ -0,0 +1,218 @@
+# Copyright (c) 2011 Pragma Nolint. 
+# See LICENSE.txt for details.
+
+"""Test of plover's strokes and stroke to translation state machine."""
+
+# Hack so that all modules can be imported from Fly, 
+# but this can be run just by calling it as a script.
+import sys, os
+sys.path.append(os.path.dirname(os.getcwd()))
+
+import shutil
+import tempfile
+import unittest
+
+from fly.plover import steno
+from fly.plover import formatting
+from fly.plover.dictionary import compiled
+from fly.plover.dictionary import dcat
+from fly.plover.dictionary import eclipse
+
+
+DICTIONARY = {"KAT": "cat",
+              "-S": "{^s}",
+              "KAT/HROG": "catalogue",
+              "KAT/HROG/-S": "catalogues",
+              "TKOG": "dog",
+              "TKOG/HOUS/KAT": "doghouse cat"}
+
+STENO_KEYS = {"KAT": ["K-", "A-", "-T"],
+              "HROG": ["H-", "R-", "O-", "-G"],
+              "-S": ["-S"],
+              "TKOG": ["T-", "K-", "O-", "-G"],
+              "HOUS": ["H-", "O-", "-U", "-S"]}
+
+
+class DummyMachine(object):
+
+    """Stands in for a stenotype machine."""
+
+    def add_callback(self, callback):
+        pass
+
+
+class StrokeTest(unittest.TestCase):
+
+    """Strokes are backed by a mask of their steno keys."""
+
+    def test_mask_and_keys_agree(self):
+
+        """A stroke made from a mask equals one made from key names."""
+
+        keys = ["-T", "A-", "K-", "A-"]
+        mask = steno.steno_keys_to_mask(keys)
+        self.assertEquals(steno.mask_to_steno_keys(mask), ["K-", "A-", "-T"])
+        by_keys = steno.Stroke(keys, eclipse)
+        by_mask = steno.Stroke(mask, eclipse)
+        self.assertEquals(by_keys, by_mask)
+        self.assertEquals(hash(by_keys), mask)
+        self.assertEquals(by_mask.rtfcre, "KAT")
+        self.assertNotEquals(by_mask, steno.Stroke(["K-", "A-"], eclipse))
+
+    def test_formats(self):
+
+        """Each dictionary format formats a mask its own way."""
+
+        mask = steno.steno_keys_to_mask(["O-", "-E"])
+        self.assertEquals(steno.Stroke(mask, eclipse).rtfcre, "OE")
+        self.assertEquals(steno.Stroke(mask, dcat).rtfcre, "O-E")
+
+    def test_number_bar(self):
+
+        """Number bar strokes become numbers."""
+
+        stroke = steno.Stroke(["#", "S-", "-T"], eclipse)
+        self.assertEquals(stroke.steno_keys, ("1-", "-9"))
+        self.assertEquals(stroke.rtfcre, "1-9")
+        self.assertTrue(steno.Stroke(["*"], eclipse).is_correction)
+
+
+class StenoTranslatorTest(unittest.TestCase):
+
+    """The translator finds the longest translations of its strokes."""
+
+    def setUp(self):
+        self.emitted = []
+
+    def make_translator(self, dictionary):
+        translator = steno.Translator(DummyMachine(), dictionary, eclipse)
+        translator.add_callback(
+                lambda t, overflow: self.emitted.append((t.is_correction, 
+                                                         t.english)))
+        return translator
+
+    def stroke(self, translator, rtfcre):
+        translator.consume_stroke(steno.Stroke(STENO_KEYS[rtfcre], eclipse))
+
+    def test_stroke_index(self):
+
+        """Every proper stroke prefix of a key is indexed."""
+
+        index = steno.StrokeIndex(DICTIONARY, "/")
+        self.assertEquals(index.max_number_of_strokes, 3)
+        self.assertEquals(index.prefixes, 
+                          set(["KAT", "KAT/HROG", "TKOG", "TKOG/HOUS"]))
+
+    def test_longest_translation(self):
+
+        """Multi stroke words correct the shorter words they extend."""
+
+        translator = self.make_translator(DICTIONARY)
+        self.assertEquals(translator.max_number_of_strokes, 3)
+        for rtfcre in ["KAT", "HROG", "-S", "TKOG", "HOUS"]:
+            self.stroke(translator, rtfcre)
+        self.assertEquals(self.emitted, 
+                          [(False, "cat"), 
+                           (True, "cat"), (False, "catalogue"), 
+                           (True, "catalogue"), (False, "catalogues"), 
+                           (False, "dog"), 
+                           (False, None)])
+
+    def test_untranslatable_prefix(self):
+
+        """A prefix without its own entry is split when not completed."""
+
+        translator = self.make_translator(DICTIONARY)
+        for rtfcre in ["TKOG", "HOUS", "KAT"]:
+            self.stroke(translator, rtfcre)
+        self.assertEquals(self.emitted[-3:], 
+                          [(True, "dog"), (True, None), 
+                           (False, "doghouse cat")])
+
+    def test_stable_translations_kept(self):
+
+        """Translations out of reach of a new stroke are not redone."""
+
+        translator = steno.Translator(DummyMachine(), DICTIONARY, eclipse, 
+                                      max_number_of_strokes=10)
+        for rtfcre in ["TKOG", "KAT", "TKOG", "TKOG"]:
+            self.stroke(translator, rtfcre)
+        first = translator.translations[0]
+        self.stroke(translator, "KAT")
+        self.stroke(translator, "HROG")
+        self.assertTrue(translator.translations[0] is first)
+        self.assertEquals([t.english for t in translator.translations], 
+                          ["dog", "cat", "dog", "dog", "catalogue"])
+
+        translator.consume_stroke(steno.Stroke(["*"], eclipse))
+        self.assertTrue(translator.translations[0] is first)
+        self.assertEquals([t.english for t in translator.translations], 
+                          ["dog", "cat", "dog", "dog", "cat"])
+
+    def test_compiled_dictionary(self):
+
+        """A compiled dictionary translates like the dict it came from."""
+
+        cache_dir = tempfile.mkdtemp()
+        try:
+            cache_path = os.path.join(cache_dir, "dict.cdict")
+            compiled.compile_dictionary(DICTIONARY, cache_path)
+            d = compiled.CompiledDictionary(cache_path)
+            translator = self.make_translator(d)
+            self.assertEquals(translator.stroke_index.prefixes, 
+                              d.stroke_prefixes)
+            for rtfcre in ["KAT", "HROG", "TKOG", "HOUS", "KAT"]:
+                self.stroke(translator, rtfcre)
+            expected = self.emitted
+            d.close()
+
+            self.emitted = []
+            translator = self.make_translator(DICTIONARY)
+            for rtfcre in ["KAT", "HROG", "TKOG", "HOUS", "KAT"]:
+                self.stroke(translator, rtfcre)
+            self.assertEquals(self.emitted, expected)
+        finally:
+            shutil.rmtree(cache_dir)
+
+
+class RecordingOutput(object):
+
+    """Records what a formatter types."""
+
+    def __init__(self):
+        self.text = ""
+
+    def send_backspaces(self, number_of_backspaces):
+        if number_of_backspaces:
+            self.text = self.text[:-number_of_backspaces]
+
+    def send_string(self, s):
+        self.text += s
+
+    def send_key_combination(self, combo):
+        self.text += "<%s>" % combo
+
+
+class FormatterTest(unittest.TestCase):
+
+    """The formatter only types what changed."""
+
+    def test_typed_text(self):
+
+        """Corrections and overflowing translations are typed right."""
+
+        translator = steno.Translator(DummyMachine(), DICTIONARY, eclipse)
+        output = RecordingOutput()
+        formatter = formatting.Formatter(translator, output)
+        for rtfcre in ["TKOG", "KAT", "HROG", "-S", "KAT", "-S", "TKOG"]:
+            translator.consume_stroke(steno.Stroke(STENO_KEYS[rtfcre], 
+                                                   eclipse))
+        self.assertEquals(output.text, "dog catalogues cats dog")
+        self.assertEquals(formatter.keystrokes, "cats dog")
+        translator.consume_stroke(steno.Stroke(["*"], eclipse))
+        translator.consume_stroke(steno.Stroke(["*"], eclipse))
+        self.assertEquals(output.text, "dog catalogues cat")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+# Copyright (c) 2011 Pragma Nolint.
+# See LICENSE.txt for details.
+
+"""Test recording strokes to session files."""
+
+# Hack so that all modules can be imported from Fly,
+# but this can be run just by calling it as a script.
+import sys, os
+sys.path.append(os.path.dirname(os.getcwd()))
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from fly.statistics import gatherer
+from fly.statistics.helpers import strokelog
+from fly.statistics.helpers.strokelog import StrokeRecord
+
+
+class StrokeLogTest(unittest.TestCase):
+
+    """Strokes are written in blocks and read back."""
+
+    START_TIME = 1000000.0
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.directory, "sessions",
+                                      "test.session")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def get_log(self, **kwargs):
+        return strokelog.StrokeLog(self.file_path,
+                                   start_time=self.START_TIME, **kwargs)
+
+    def get_strokes(self, count):
+        return [StrokeRecord(self.START_TIME + i, "WE", ["WE", "-F"][i % 2],
+                             [True, False, None][i % 3], 0.25, "1_first")
+                for i in range(count)]
+
+    def test_strokes_read_back(self):
+        log = self.get_log(batch_size=4)
+        strokes = self.get_strokes(10)
+        for stroke in strokes:
+            log.record(stroke)
+        log.close()
+
+        start_time, read_strokes = strokelog.read_session(self.file_path)
+        self.assertEqual(start_time, self.START_TIME)
+        self.assertEqual(read_strokes, strokes)
+
+    def test_flush(self):
+        log = self.get_log()
+        strokes = self.get_strokes(3)
+        for stroke in strokes:
+            log.record(stroke)
+        log.flush()
+        self.assertEqual(strokelog.read_session(self.file_path)[1], strokes)
+        log.close()
+
+    def test_no_strokes_no_file(self):
+        self.get_log().close()
+        self.assertFalse(os.path.exists(self.file_path))
+
+    def test_oldest_strokes_dropped(self):
+        log = self.get_log(capacity=4, batch_size=4)
+        strokes = self.get_strokes(6)
+        with log.condition:
+            # The writer can't take strokes while the lock is held.
+            for stroke in strokes:
+                log.record(stroke)
+        log.close()
+
+        self.assertEqual(log.dropped, 2)
+        self.assertEqual(strokelog.read_session(self.file_path)[1],
+                         strokes[2:])
+
+    def test_block_cut_short(self):
+        log = self.get_log()
+        strokes = self.get_strokes(4)
+        for stroke in strokes[:2]:
+            log.record(stroke)
+        log.flush()
+        for stroke in strokes[2:]:
+            log.record(stroke)
+        log.close()
+        with open(self.file_path, 'rb+') as f:
+            f.truncate(os.path.getsize(self.file_path) - 1)
+
+        self.assertEqual(strokelog.read_session(self.file_path)[1],
+                         strokes[:2])
+
+
+class GathererStrokeTest(unittest.TestCase):
+
+    """Latency of strokes is since the previous word was finished, or the
+    word was shown."""
+
+    class Log(object):
+        def __init__(self):
+            self.strokes = []
+        def record(self, stroke):
+            self.strokes.append(stroke)
+
+    def test_latency(self):
+        log = self.Log()
+        stats = gatherer.StatisticGatherer(log)
+        stats.last_word_time = 10.0
+        stats.on_stroke(11.0, "WE", "WE", True)
+        stats.on_stroke(11.5, "-F", "TP", None)
+        stats.on_stroke(12.0, "-F", "-F", True)
+        self.assertEqual([stroke.latency for stroke in log.strokes],
+                         [1.0, 0.5, 1.0])
+
+    def test_latency_from_word_shown(self):
+        # Time before the first word of a lesson is shown is not counted.
+        log = self.Log()
+        stats = gatherer.StatisticGatherer(log)
+        stats.on_word_shown(100.0)
+        stats.on_stroke(101.5, "WE", "WE", True)
+        self.assertEqual(log.strokes[0].latency, 1.5)
+        self.assertEqual(stats.get_latency_percentiles(), (1.5, 1.5, 1.5))
+
+
+if __name__ == '__main__':
+    unittest.main()
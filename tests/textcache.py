@@ -0,0 +1,66 @@
+# Copyright (c) 2011 Pragma Nolint. 
+# See LICENSE.txt for details.
+
+"""Test the shared fonts and the rendered text cache."""
+
+# Hack so that all modules can be imported from Fly, 
+# but this can be run just by calling it as a script.
+import sys, os
+sys.path.append(os.path.dirname(os.getcwd()))
+
+import unittest
+
+import pygame
+
+from fly.gui import genericelements
+
+
+class TextCacheTest(unittest.TestCase):
+
+    """Fonts are loaded once and rendered text is reused."""
+
+    def setUp(self):
+        pygame.font.init()
+        self.fonts = genericelements.FontRegistry()
+        self.cache = genericelements.TextSurfaceCache(self.fonts, max_size=2)
+
+    def tearDown(self):
+        pygame.font.quit()
+
+    def test_font_shared(self):
+
+        """The same face and size give the same font."""
+
+        self.assertTrue(self.fonts.get_font(None, 16) is 
+                        self.fonts.get_font(None, 16))
+        self.assertFalse(self.fonts.get_font(None, 16) is 
+                         self.fonts.get_font(None, 20))
+
+    def test_render_reused(self):
+
+        """Rendering the same text twice is served from the cache."""
+
+        first = self.cache.render("STKPW", 16, (0, 0, 0))
+        self.assertTrue(first is self.cache.render("STKPW", 16, (0, 0, 0)))
+        self.assertFalse(first is self.cache.render("STKPW", 16, (1, 0, 0)))
+        stats = self.cache.get_stats()
+        self.assertEquals(stats["hits"], 1)
+        self.assertEquals(stats["misses"], 2)
+        self.assertAlmostEquals(stats["hit_rate"], 1/3.0)
+
+    def test_least_recently_used_evicted(self):
+
+        """The cache never holds more than its maximum size."""
+
+        first = self.cache.render("a", 16, (0, 0, 0))
+        self.cache.render("b", 16, (0, 0, 0))
+        self.cache.render("a", 16, (0, 0, 0))
+        self.cache.render("c", 16, (0, 0, 0))
+        self.assertEquals(self.cache.get_stats()["size"], 2)
+        self.assertTrue(first is self.cache.render("a", 16, (0, 0, 0)))
+        self.cache.render("b", 16, (0, 0, 0))
+        self.assertEquals(self.cache.get_stats()["misses"], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+# Copyright (c) 2011 Pragma Nolint.
+# See LICENSE.txt for details.
+
+"""Test of retrieving words randomly, weighted by an alias table."""
+
+# Hack so that all modules can be imported from Fly,
+# but this can be run just by calling it as a script.
+import sys, os
+sys.path.append(os.path.dirname(os.getcwd()))
+
+import random
+import unittest
+
+from fly.models.wordchooser import randomized
+
+
+class AliasSamplerTest(unittest.TestCase):
+
+    """Indices are drawn in proportion to their weights."""
+
+    def draw(self, weights, draws=20000):
+        sampler = randomized.AliasSampler(weights, random.Random(1))
+        counts = [0] * len(weights)
+        for i in range(draws):
+            counts[sampler.sample()] += 1
+        return [count / float(draws) for count in counts]
+
+    def test_equal_weights(self):
+        for share in self.draw([1, 1, 1, 1]):
+            self.assertAlmostEqual(share, 0.25, places=1)
+
+    def test_weights(self):
+        shares = self.draw([1, 0, 3, 6])
+        self.assertEqual(shares[1], 0)
+        for share, expected in zip(shares, [0.1, 0, 0.3, 0.6]):
+            self.assertAlmostEqual(share, expected, places=1)
+
+    def test_no_positive_weight(self):
+        self.assertRaises(ValueError, randomized.AliasSampler, [0, 0])
+
+    def test_sample_other(self):
+        sampler = randomized.AliasSampler([1, 0, 3, 6], random.Random(1))
+        for i in range(1000):
+            self.assertNotEqual(sampler.sample_other(3), 3)
+        self.assertEqual(randomized.AliasSampler([2]).sample_other(0), 0)
+
+
+class RetrieveRandomizedTest(unittest.TestCase):
+
+    """Words are drawn randomly, never the same translation twice in a row."""
+
+    def setUp(self):
+        self.word_translation_dict = {"WE": "we", "-F": "of", "THE": "the",
+                                      "-T": "the", "A": "a"}
+
+    def get_words(self, word_chooser, count=500):
+        return [word_chooser.get_word_and_translation()
+                for i in range(count)]
+
+    def test_no_immediate_repeat(self):
+        word_chooser = randomized.RetrieveRandomized(
+            self.word_translation_dict, [], seed=1)
+        words = self.get_words(word_chooser)
+        for (_, previous), (_, translation) in zip(words, words[1:]):
+            self.assertNotEqual(previous, translation)
+        self.assertEqual(set(words), set(self.word_translation_dict.items()))
+
+    def test_seed(self):
+        first = randomized.RetrieveRandomized(self.word_translation_dict,
+                                              [], seed="benchmark")
+        second = randomized.RetrieveRandomized(self.word_translation_dict,
+                                               [], seed="benchmark")
+        self.assertEqual(self.get_words(first), self.get_words(second))
+
+    def test_weights(self):
+        weights = {"WE": 0, "-F": 0, "THE": 0, "-T": 0}
+        word_chooser = randomized.RetrieveRandomized(
+            self.word_translation_dict, [], weights=weights, seed=1)
+        self.assertEqual(word_chooser.get_word_and_translation(), ("A", "a"))
+
+        # Only one translation has any weight, so the others only come up
+        # to avoid a repeat.
+        words = self.get_words(word_chooser)
+        self.assertEqual(words[1::2], [("A", "a")] * 250)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+# Copyright (c) 2011 Pragma Nolint. 
+# See LICENSE.txt for details.
+
+"""Test of retrieving words by spaced repetition."""
+
+# Hack so that all modules can be imported from Fly, 
+# but this can be run just by calling it as a script.
+import sys, os
+sys.path.append(os.path.dirname(os.getcwd()))
+
+import unittest
+
+from fly.models.wordchooser import spaced
+
+
+class RetrieveSpacedTest(unittest.TestCase):
+
+    """Words are introduced in order, then come back spaced out."""
+
+    def setUp(self):
+        self.words = ["W%d" % i for i in range(10)]
+        self.word_translation_dict = dict((word, word.lower()) 
+                                          for word in self.words)
+        self.word_chooser = spaced.RetrieveSpaced(self.word_translation_dict,
+                                                  self.words + self.words)
+
+    def type_words(self, count, wrong_words=()):
+        shown = []
+        for i in range(count):
+            word, translation = self.word_chooser.get_word_and_translation()
+            self.assertEqual(translation, word.lower())
+            shown.append(word)
+            if word in wrong_words:
+                self.word_chooser.on_wrong_word_entered()
+            self.word_chooser.on_right_word_entered()
+        return shown
+
+    def test_new_words_in_order(self):
+        shown = self.type_words(3)
+        self.assertEqual(shown, ["W0", "W1", "W2"])
+
+    def test_minimum_queue_size(self):
+        # New words are only introduced while few words are queued.
+        word_chooser = self.word_chooser
+        while word_chooser.new_queue:
+            queued = len(word_chooser.queue)
+            new_words = len(word_chooser.new_queue)
+            self.type_words(1)
+            if queued < word_chooser.minimum_queue_size:
+                self.assertEqual(len(word_chooser.new_queue), new_words - 1)
+            else:
+                self.assertEqual(len(word_chooser.new_queue), new_words)
+
+    def test_no_immediate_repeat(self):
+        shown = self.type_words(100, wrong_words=["W0", "W3"])
+        for previous, word in zip(shown, shown[1:]):
+            if not self.word_chooser.is_done():
+                self.assertNotEqual(previous, word)
+
+    def test_ease(self):
+        self.type_words(40, wrong_words=["W1"])
+        ease = self.word_chooser.ease
+        self.assertEqual(ease["W1"], self.word_chooser.minimum_ease)
+        self.assertTrue(ease["W2"] > self.word_chooser.initial_ease)
+
+    def test_is_done(self):
+        shown = self.type_words(200)
+        self.assertTrue(self.word_chooser.is_done())
+        self.assertEqual(set(shown), set(self.words))
+
+        # The last word stays on display once done.
+        self.assertEqual(self.word_chooser.get_word_and_translation()[0],
+                         shown[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
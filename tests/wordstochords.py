@@ -91,6 +91,27 @@ class WordsToChordsTest(unittest.TestCase):
         self.assertEquals(translation, expected)
 
 
+class TranslationCacheTest(unittest.TestCase):
+
+    """Words already translated are remembered."""
+
+    def setUp(self):
+        dictionary = {"WE": "we", "WE/WE": "we", "-F": "of", "PHAEUD": "maid"}
+        self.translator = wordstochords.WordToChordTranslator(dictionary)
+
+    def test_repeated_words(self):
+
+        """Translating a word again is a cache hit with the same chord."""
+
+        words = ["we", "We", "of", "maid's", "we"]
+        chords = [self.translator.translate_word(word) for word in words]
+        self.assertEquals(chords, ["WE", "WE", "-F", "PHAEUD/A*ES", "WE"])
+        stats = self.translator.get_cache_stats()
+        self.assertEquals(stats["hits"], 1)
+        self.assertEquals(stats["misses"], 4)
+        self.assertEquals(stats["size"], 4)
+
+
 if __name__ == '__main__':
     unittest.main()
 
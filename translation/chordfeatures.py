@@ -0,0 +1,336 @@
+# Copyright (c) 2011 Pragma Nolint.
+# See LICENSE.txt for details.
+
+"""
+Features of steno chords that make them easy or hard to type.
+
+The features of every chord in a dictionary are worked out once and kept in
+a table with one numpy array per feature, so that questions about many
+chords, such as which are easiest or which belong in a level, are answered
+by array operations instead of looking at each chord in turn.
+"""
+
+import threading
+
+import numpy
+
+from fly.plover.dictionary import compiled
+
+
+# Steno keys on each side of the keyboard, in steno order.
+LEFT_KEYS = "STKPWHR"
+VOWEL_KEYS = "AOEU"
+RIGHT_KEYS = "FRPBLGTSDZ"
+
+# Names of the keys of the steno keyboard, in steno order. Keys on the left
+# end with a hyphen and keys on the right start with one.
+VOWEL_KEY_NAMES = ('A-', 'O-', '-E', '-U')
+STENO_KEYS = (('#',) + tuple(key + '-' for key in LEFT_KEYS) +
+              VOWEL_KEY_NAMES[:2] + ('*',) + VOWEL_KEY_NAMES[2:] +
+              tuple('-' + key for key in RIGHT_KEYS))
+
+# Keys that the number bar turns into digits, and the side they are on.
+DIGIT_KEYS = {'1': ('S', LEFT_KEYS), '2': ('T', LEFT_KEYS),
+              '3': ('P', LEFT_KEYS), '4': ('H', LEFT_KEYS),
+              '5': ('A', VOWEL_KEYS), '0': ('O', VOWEL_KEYS),
+              '6': ('F', RIGHT_KEYS), '7': ('P', RIGHT_KEYS),
+              '8': ('L', RIGHT_KEYS), '9': ('T', RIGHT_KEYS)}
+
+STROKE_DELIMITER = '/'
+
+# Dictionaries and their tables, shared by everything in the process. The
+# dictionary is kept so that its id, used as key unless it has a source
+# hash of its own, is not reused.
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def get_feature_table(dictionary):
+
+    """Return the shared feature table of every chord in the dictionary.
+
+    @param dictionary: steno to english dictionary
+    @type dictionary: dict or
+                      L{plover.dictionary.compiled.CompiledDictionary}
+
+    @rtype: L{ChordFeatureTable}
+    """
+
+    key = getattr(dictionary, 'source_hash', None)
+    if not key or key == compiled.NO_SOURCE_HASH:
+        key = id(dictionary)
+    with _tables_lock:
+        if key not in _tables:
+            _tables[key] = (dictionary, ChordFeatureTable(dictionary))
+        return _tables[key][1]
+
+
+def get_easiest_chord(chord_list):
+
+    """Get the chord which is the easiest to type.
+
+    @param chord_list: chords for the same english word
+    @type chord_list: list of str
+
+    @return: steno_chord
+    @rtype: str
+    """
+
+    if not chord_list:
+        raise RuntimeError("No chord found...this is a bug.")
+    if len(chord_list) == 1:
+        return chord_list[0]
+    # Words have only a few chords, too few for a table to pay off, so
+    # they are scored one by one the way ChordFeatureTable scores rows.
+    return min(chord_list, key=_get_easiest_order)
+
+
+def _get_easiest_order(chord):
+
+    """Return a key that sorts easier chords first, as in
+    L{ChordFeatureTable.get_easiest_rows}.
+
+    @param chord: steno chord
+    @type chord: str
+
+    @return: minus ease score, then keys pressed
+    @rtype: tuple of (float, int)
+    """
+
+    key_count = 0
+    asterisk = number_bar = False
+    strokes = chord.split(STROKE_DELIMITER)
+    for stroke in strokes:
+        left, vowels, right, stroke_asterisk, stroke_number_bar = \
+            get_stroke_features(stroke)
+        key_count += left + vowels + right
+        asterisk = asterisk or stroke_asterisk
+        number_bar = number_bar or stroke_number_bar
+    key_count += asterisk + number_bar
+    ease = (5*(1.0/max(len(chord), 1)) - number_bar - (len(strokes) - 1))
+    return -ease, key_count
+
+
+def get_stroke_features(stroke):
+
+    """Count the keys of each kind pressed in a single stroke.
+
+    @param stroke: steno stroke, e.g. PHAEUD, -PBLG or 1-9
+    @type stroke: str
+
+    @return: keys on the left, vowel keys, keys on the right, whether the
+             asterisk and whether the number bar are pressed
+    @rtype: tuple of (int, int, int, bool, bool)
+    """
+
+    left = vowels = right = 0
+    asterisk = number_bar = False
+    for key in get_stroke_keys(stroke):
+        if key == '#':
+            number_bar = True
+        elif key == '*':
+            asterisk = True
+        elif key in VOWEL_KEY_NAMES:
+            vowels += 1
+        elif key.endswith('-'):
+            left += 1
+        else:
+            right += 1
+    return left, vowels, right, asterisk, number_bar
+
+
+def get_stroke_keys(stroke):
+
+    """Find the keys pressed in a single stroke.
+
+    @param stroke: steno stroke, e.g. PHAEUD, -PBLG or 1-9
+    @type stroke: str
+
+    @return: keys pressed, named as in L{STENO_KEYS}
+    @rtype: list of str
+    """
+
+    keys = []
+    number_bar = False
+    left_position = right_position = 0
+    on_left = True
+
+    for letter in stroke:
+        side = None
+        if letter == '#':
+            number_bar = True
+            continue
+        if letter in DIGIT_KEYS:
+            number_bar = True
+            letter, side = DIGIT_KEYS[letter]
+        if letter == '-':
+            on_left = False
+            continue
+        if letter == '*':
+            keys.append('*')
+            on_left = False
+            continue
+        if letter in VOWEL_KEYS:
+            keys.append(VOWEL_KEY_NAMES[VOWEL_KEYS.index(letter)])
+            on_left = False
+            continue
+        if on_left and side is not RIGHT_KEYS:
+            position = LEFT_KEYS.find(letter, left_position)
+            if position != -1:
+                keys.append(letter + '-')
+                left_position = position + 1
+                continue
+        position = RIGHT_KEYS.find(letter, right_position)
+        if position != -1:
+            keys.append('-' + letter)
+            right_position = position + 1
+            on_left = False
+
+    if number_bar:
+        keys.insert(0, '#')
+    return keys
+
+
+class ChordFeatureTable(object):
+
+    """One row of features for each chord, with one numpy array per feature.
+
+    Features:
+        - length: characters in the chord as written
+        - stroke_count: strokes in the chord
+        - key_count: keys pressed over all strokes, counting the asterisk
+          and number bar
+        - left_keys, vowel_keys, right_keys: keys pressed on each part of
+          the keyboard over all strokes
+        - asterisk: whether any stroke uses the asterisk
+        - number_bar: whether any stroke uses the number bar
+    """
+
+    def __init__(self, chords):
+
+        """
+        @param chords: steno chords, e.g. the keys of a steno dictionary
+        @type chords: iterable of str
+        """
+
+        self.chords = list(chords)
+        self.rows = dict((chord, row) for row, chord in enumerate(self.chords))
+
+        # Features of each stroke, and the row of the chord it belongs to.
+        stroke_rows = []
+        stroke_features = []
+        for row, chord in enumerate(self.chords):
+            for stroke in chord.split(STROKE_DELIMITER):
+                stroke_rows.append(row)
+                stroke_features.append(get_stroke_features(stroke))
+
+        count = len(self.chords)
+        stroke_rows = numpy.array(stroke_rows, dtype=numpy.int32)
+        columns = numpy.array(stroke_features, dtype=numpy.int16)
+        columns = columns.reshape((len(stroke_rows), 5))
+
+        def add_up(column):
+            return numpy.bincount(stroke_rows, weights=column, 
+                                  minlength=count).astype(numpy.int16)
+
+        self.length = numpy.array([len(chord) for chord in self.chords],
+                                  dtype=numpy.int16)
+        self.stroke_count = numpy.bincount(stroke_rows, minlength=count)\
+                                 .astype(numpy.int16)
+        self.left_keys = add_up(columns[:, 0])
+        self.vowel_keys = add_up(columns[:, 1])
+        self.right_keys = add_up(columns[:, 2])
+        self.asterisk = add_up(columns[:, 3]) > 0
+        self.number_bar = add_up(columns[:, 4]) > 0
+
+        self.key_count = (self.left_keys + self.vowel_keys + self.right_keys +
+                          self.asterisk + self.number_bar).astype(numpy.int16)
+
+    def __len__(self):
+        return len(self.chords)
+
+    def get_rows(self, chords):
+
+        """Return the rows of the chords given.
+
+        @param chords: chords in the table
+        @type chords: iterable of str
+
+        @return: row of each chord
+        @rtype: numpy array of int
+        """
+
+        rows = self.rows
+        return numpy.fromiter((rows[chord] for chord in chords),
+                              dtype=numpy.int32)
+
+    def select(self, mask, chords=None):
+
+        """Return the chords for which mask is true.
+
+        @param mask: one entry per row, e.g. C{table.stroke_count == 1}
+        @param chords: only consider these chords, by default all
+
+        @type mask: numpy array of bool
+        @type chords: list of str
+
+        @return: chords selected, in the order given
+        @rtype: list of str
+        """
+
+        if chords is None:
+            chords = self.chords
+        keep = mask[self.get_rows(chords)]
+        return [chord for chord, kept in zip(chords, keep) if kept]
+
+    def get_ease_scores(self):
+
+        """Score how easy each chord is to type, higher is easier.
+
+        Short chords are easy, each stroke after the first is one point
+        harder and using the number bar is one point harder.
+
+        @return: score of each row
+        @rtype: numpy array of float
+        """
+
+        return (5*(1.0/numpy.maximum(self.length, 1)) - self.number_bar
+                - (self.stroke_count - 1))
+
+    def get_difficulties(self):
+
+        """Score how hard each chord is to type, higher is harder.
+
+        Each key pressed is a point, as is each stroke after the first.
+
+        @return: difficulty of each row
+        @rtype: numpy array of int
+        """
+
+        return self.key_count + (self.stroke_count - 1)
+
+    def get_easiest_rows(self, groups):
+
+        """Find the easiest chord in each group of chords.
+
+        Ties on ease score go to the chord with fewer keys, then to the
+        earlier row.
+
+        @param groups: group number of each row, from 0 up without gaps,
+                       e.g. one group per english word
+        @type groups: numpy array of int
+
+        @return: row of the easiest chord of each group, indexed by group
+        @rtype: numpy array of int
+        """
+
+        rows = numpy.arange(len(self.chords))
+        order = numpy.lexsort((rows, self.key_count,
+                               -self.get_ease_scores(), groups))
+        sorted_groups = groups[order]
+        first_in_group = numpy.ones(len(order), dtype=bool)
+        first_in_group[1:] = sorted_groups[1:] != sorted_groups[:-1]
+        easiest_rows = numpy.zeros(len(order) and sorted_groups[-1] + 1,
+                                   dtype=numpy.int32)
+        easiest_rows[sorted_groups[first_in_group]] = order[first_in_group]
+        return easiest_rows
@@ -0,0 +1,273 @@
+# Copyright (c) 2011 Pragma Nolint.
+# See LICENSE.txt for details.
+
+"""
+Index from english words to the steno chords that produce them.
+
+Building the index means going through the whole steno dictionary, so it is
+built once per version of the dictionary and stored next to plover's
+compiled dictionary cache. Everything in the process that needs it shares
+the same read-only index, see L{get_inverse_index}. The canon chord of each
+english word is worked out when the index is built.
+"""
+
+import os
+import struct
+import threading
+import collections
+
+import numpy
+
+from fly.plover.dictionary import compiled
+from fly.translation import chordfeatures
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+# Added to the name of the compiled dictionary cache for its index, with the
+# version of the index format.
+INDEX_FILE_SUFFIX = '-inverse'
+INDEX_VERSION = 3
+
+# The canon chord and all chords for an english word are stored as one
+# string, separated by this.
+CHORD_SEPARATOR = u'\n'
+
+# What the index holds for an english word.
+IndexEntry = collections.namedtuple("IndexEntry", "canon_chord chords")
+
+# English words contain '/', so split keys on something they never contain.
+NO_STROKE_DELIMITER = '\0'
+
+# Indexes shared by everything in the process, keyed by dictionary version.
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_inverse_index(dictionary):
+
+    """Return the shared index of the dictionary given.
+
+    The index is not loaded or built until it is first used.
+
+    @param dictionary: steno to english dictionary
+    @type dictionary: dict or
+                      L{plover.dictionary.compiled.CompiledDictionary}
+
+    @return: english to chords index of dictionary
+    @rtype: L{InverseIndex}
+    """
+
+    if isinstance(dictionary, compiled.CompiledDictionary):
+        key = (dictionary.source_path, dictionary.source_hash)
+    else:
+        key = id(dictionary)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = InverseIndex(dictionary)
+            _indexes[key] = index
+        return index
+
+
+class InverseIndex(collections.Mapping):
+
+    """Read-only mapping of english words to a list of their chords.
+
+    Each lookup returns a new list, so callers may change it without
+    affecting anybody else.
+    """
+
+    def __init__(self, dictionary):
+
+        """
+        @param dictionary: steno to english dictionary
+        @type dictionary: dict or
+                          L{plover.dictionary.compiled.CompiledDictionary}
+        """
+
+        self.dictionary = dictionary
+        self.table = None
+        self.lock = threading.Lock()
+
+    def __getitem__(self, english):
+        entry = self.get_entry(english)
+        if entry is None:
+            raise KeyError(english)
+        return entry.chords
+
+    def __contains__(self, english):
+        return self.__get_table().get(english) is not None
+
+    def __iter__(self):
+        return iter(self.__get_table())
+
+    def __len__(self):
+        return len(self.__get_table())
+
+    def get_entry(self, english):
+
+        """Return the chords that translate to exactly the english given.
+
+        @param english: english word as it appears in the dictionary
+        @type english: str
+
+        @return: canon chord and all chords, or None if the word is not in 
+                 the dictionary
+        @rtype: L{IndexEntry}
+        """
+
+        return to_entry(self.__get_table().get(english))
+
+    def lookup(self, word):
+
+        """Return chords for word as it is, else for word in lower case.
+
+        @param word: english word
+        @type word: str
+
+        @return: canon chord and all chords for word, or None if neither form
+                 is in the dictionary
+        @rtype: L{IndexEntry}
+        """
+
+        table = self.__get_table()
+        value = table.get(word)
+        if value is None:
+            value = table.get(word.lower())
+        return to_entry(value)
+
+    def __get_table(self):
+
+        """Return the english to joined chords table, loading it if needed."""
+
+        if self.table is None:
+            with self.lock:
+                if self.table is None:
+                    self.table = self.__load_table()
+        return self.table
+
+    def __load_table(self):
+
+        """Read the stored index of the dictionary, or build it.
+
+        @return: english words to chords joined by L{CHORD_SEPARATOR}
+        @rtype: mapping of str to str
+        """
+
+        if not isinstance(self.dictionary, compiled.CompiledDictionary):
+            return build_table(self.dictionary)
+
+        index_path = get_index_path(self.dictionary.cache_path)
+        table = open_table(index_path, self.dictionary)
+        if table is not None:
+            return table
+
+        table = build_table(self.dictionary)
+        try:
+            compiled.compile_dictionary(table, index_path,
+                                        self.dictionary.source_path,
+                                        self.dictionary.source_size,
+                                        self.dictionary.source_mtime,
+                                        self.dictionary.source_hash,
+                                        NO_STROKE_DELIMITER)
+        except (IOError, OSError) as e:
+            logger.warning("Could not store index %s: %s" % (index_path, e))
+            return table
+        return compiled.CompiledDictionary(index_path)
+
+
+def build_table(dictionary):
+
+    """Go through the dictionary to find all chords for each english word.
+
+    Chords are kept in the order the dictionary gives them, after the canon
+    chord. Canon chords are picked for all words at once from the feature
+    table of the dictionary.
+
+    @param dictionary: steno to english dictionary
+    @type dictionary: dict
+
+    @return: english words to canon chord and chords joined by 
+             L{CHORD_SEPARATOR}
+    @rtype: dict of str to str
+    """
+
+    features = chordfeatures.get_feature_table(dictionary)
+    groups = numpy.zeros(len(features), dtype=numpy.int32)
+    english_words = []
+    chords_for_english = {}
+    group_of_english = {}
+    for chord, english in dictionary.iteritems():
+        if english in chords_for_english:
+            chords_for_english[english].append(chord)
+        else:
+            chords_for_english[english] = [chord]
+            group_of_english[english] = len(english_words)
+            english_words.append(english)
+        groups[features.rows[chord]] = group_of_english[english]
+
+    easiest_rows = features.get_easiest_rows(groups)
+    return dict((english, CHORD_SEPARATOR.join(
+                     [features.chords[easiest_rows[group]]] + 
+                     chords_for_english[english]))
+                for group, english in enumerate(english_words))
+
+
+def to_entry(value):
+
+    """Split a value of the index table into an entry.
+
+    @param value: canon chord and chords joined by L{CHORD_SEPARATOR}
+    @type value: str or None
+
+    @rtype: L{IndexEntry} or None
+    """
+
+    if value is None:
+        return None
+    chords = value.split(CHORD_SEPARATOR)
+    return IndexEntry(chords[0], chords[1:])
+
+
+def open_table(index_path, dictionary):
+
+    """Open the stored index if it was built from the same dictionary.
+
+    @param index_path: where the index is stored
+    @param dictionary: dictionary the index must belong to
+
+    @type index_path: str
+    @type dictionary: L{plover.dictionary.compiled.CompiledDictionary}
+
+    @return: stored index, or None if it is missing, unreadable or stale
+    @rtype: L{plover.dictionary.compiled.CompiledDictionary}
+    """
+
+    if not os.path.exists(index_path):
+        return None
+    try:
+        table = compiled.CompiledDictionary(index_path)
+    except (ValueError, struct.error, EnvironmentError) as e:
+        logger.warning("Ignoring unreadable index %s: %s" % (index_path, e))
+        return None
+    if table.source_path == dictionary.source_path and \
+       table.source_hash == dictionary.source_hash:
+        return table
+    table.close()
+    return None
+
+
+def get_index_path(cache_path):
+
+    """Return where the index of a compiled dictionary is stored.
+
+    @param cache_path: path of the compiled dictionary
+    @type cache_path: str
+
+    @rtype: str
+    """
+
+    name, extension = os.path.splitext(cache_path)
+    return '%s%s%d%s' % (name, INDEX_FILE_SUFFIX, INDEX_VERSION, extension)
@@ -37,13 +37,45 @@ class PloverControl(object):
         @type translation_callback_function: function
         """
        
+        self.set_up_machine(translation_callback_function)
+        self.load_dictionary()
+
+    def set_up_machine(self, translation_callback_function):
+
+        """Create the steno machine, without a dictionary to translate with.
+
+        This is quick, so the dictionary can be loaded separately with 
+        L{load_dictionary}, e.g. in the background.
+
+        @param translation_callback_function: function that uses translation.
+            Should take a translation object L{plover.steno.Translation} and
+            an overflow.
+        @type translation_callback_function: function
+        """
+
         machine_module = self.get_machine_module()
         self.steno_machine = machine_module.Stenotype(**self.machine_init)
         self.translation_callback_function = translation_callback_function
 
+    def load_dictionary(self, progress=None):
+
+        """Load plover's dictionary and create the translator that uses it.
+
+        L{set_up_machine} must have been called first.
+
+        @param progress: called with bytes of the dictionary file read so far
+                         and its size while the file is read.
+        @type progress: function of (int, int)
+
+        @return: steno to english dictionary
+        @rtype: dict
+        """
+
         dict_filename = fileutils.get_plover_dict_path()
-        self.dictionary = dictionaryreader.load_dict(dict_filename)
+        self.dictionary = dictionaryreader.load_plover_dict(dict_filename, 
+                                                            progress=progress)
         self.translator = self.create_translator(self.dictionary)
+        return self.dictionary
 
     def get_machine_module(self):
 
@@ -103,12 +135,15 @@ class PloverControl(object):
         """Start translating!"""
 
         self.steno_machine.start_capture()
+        self.running = True
 
     def stop(self):
 
-        """Stop translating."""
+        """Stop translating, if translating was started."""
 
-        self.steno_machine.stop_capture()
+        if self.running:
+            self.steno_machine.stop_capture()
+            self.running = False
 
     def suspend(self):
 
@@ -8,31 +8,43 @@
 import sys, os
 sys.path.append(os.path.dirname(os.getcwd()))
 
-import re, random, types
+import re, random, types, hashlib
+from collections import OrderedDict
 
 from fly.data import alphabetdict as alphabet
 from fly.translation import ploverfacade
+from fly.translation import inverseindex
+from fly.translation import chordfeatures
 from fly.utils import dictionaryreader
 from fly.utils import files as fileutils
 
 import logging
 logger = logging.getLogger(__name__)
 
+# Most words whose translation each WordToChordTranslator remembers.
+TRANSLATION_CACHE_SIZE = 20000
+
+WORD_PATTERN = re.compile('\w+')
+
 
 class ChordHolder(object):
 
     """Store all steno chords for a word, and retrieve several ways."""
 
-    def __init__(self, chord_or_list):
+    def __init__(self, chord_or_list, canon_chord=None):
 
         """
         @param chord: steno chord/list of steno chords
+        @param canon_chord: canon chord among them, if already known
+
         @type chord: str (or list of str)
+        @type canon_chord: str
         """
         if type(chord_or_list) is types.ListType:
             self.chord_list = chord_or_list
         else:
             self.chord_list = [chord_or_list]
+        self.canon_chord = canon_chord
 
     def add_chord(self, new_chord):
 
@@ -43,6 +55,7 @@ class ChordHolder(object):
         """
 
         self.chord_list.append(new_chord)
+        self.canon_chord = None
 
     def get_random_chord(self):
 
@@ -62,7 +75,9 @@ class ChordHolder(object):
         @rtype: str
         """
 
-        return self.get_easiest_chord()
+        if self.canon_chord is None:
+            self.canon_chord = self.get_easiest_chord()
+        return self.canon_chord
 
     def get_easiest_chord(self):
 
@@ -72,24 +87,7 @@ class ChordHolder(object):
         @rtype: str
         """
 
-        chord_points_map = {}
-        for chord in self.chord_list:
-            # The longer it is, the harder it is to type
-            chord_points_map[chord] = 5*(1.0/len(chord))
-            
-            # If it has numbers, we don't want it
-            if re.search('\d', chord):
-                chord_points_map[chord] -= 1
-
-            # The more strokes it has, the harder it is
-            chord_points_map[chord] -= len(re.findall('/', chord))
-            
-        max_points = max(chord_points_map.values())
-        for key, value in chord_points_map.iteritems():
-            if value == max_points:
-                return key
-
-        raise RuntimeError("No chord found...this is a bug.")
+        return chordfeatures.get_easiest_chord(self.chord_list)
 
     def __str__(self):
 
@@ -111,28 +109,36 @@ class WordToChordTranslator(object):
         @type dictionary: dict
         """
 
-        self.inverse_dict = self.__get_inverse_dict(dictionary)
-    
-    def __get_inverse_dict(self, dictionary):
+        # Shared with every other translator of the same dictionary.
+        self.inverse_dict = inverseindex.get_inverse_index(dictionary)
+        self.handlers = self.__get_handler_chain()
+        self.handler = self.handlers[0]
 
-        """Return a dict of english words to chord_holders (list of chords)
-        
-        @param dictionary: steno to english dictionary
-        @type dictionary: dict
+        # Least recently used words first.
+        self.translations = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __get_handler_chain(self):
+
+        """Link the handlers that each try to translate a word in turn.
 
-        @return: dict of {english: chord holder with all steno representations
-                 of english word}
-        @rtype: {str: L{ChordHolder}}
+        @return: handlers in the order they are tried
+        @rtype: list of L{WordCaseHandler}
         """
 
-        inverse_dict = {}
-        for key, value in dictionary.iteritems():
-            if value in inverse_dict:
-                chord_holder = inverse_dict[value]
-                chord_holder.add_chord(key)
-            else:
-                inverse_dict[value] = ChordHolder(key)
-        return inverse_dict
+        first_try_handler = WordAsIsOrLowerCase(self.inverse_dict)
+        second_try_handler = WordPunctuationWithCaret(self.inverse_dict)
+        third_try_handler = WordEndsApostropheEss(self.inverse_dict)
+        fourth_try_handler = WordIsMrOrMrs(self.inverse_dict)
+        default_handler = WordUndefined(self.inverse_dict)
+        
+        first_try_handler.successor = second_try_handler
+        second_try_handler.successor = third_try_handler
+        third_try_handler.successor = fourth_try_handler
+        fourth_try_handler.successor = default_handler
+        return [first_try_handler, second_try_handler, third_try_handler,
+                fourth_try_handler, default_handler]
 
     def translate_from_file(self, testFile):
 
@@ -146,10 +152,22 @@ class WordToChordTranslator(object):
         """
 
         with open(testFile) as f:
-            data = f.readlines()
+            return self.translate_lines(f.readlines())
+
+    def translate_lines(self, lines):
+
+        """Translate lines of english words to lines of steno chords.
+
+        @param lines: lines of english words
+        @type lines: list of str
+
+        @return: line of steno chords for each line
+        @rtype: list of str
+        """
+
         chord_list = []
 
-        for line in data:
+        for line in lines:
             chord_line = []
             for word in self.yield_word(line):
                 chord = self.translate_word(word)
@@ -211,7 +229,7 @@ class WordToChordTranslator(object):
         @rtype: bool
         """
 
-        if re.search('\w+', word_or_punctuation):
+        if WORD_PATTERN.search(word_or_punctuation):
             return False
         return True
 
@@ -226,23 +244,74 @@ class WordToChordTranslator(object):
         @rtype: str
         """
 
-        first_try_handler = WordAsIs(self.inverse_dict)
-        second_try_handler = WordLowerCase(self.inverse_dict)
-        third_try_handler = WordPunctuationWithCaret(self.inverse_dict)
-        fourth_try_handler = WordEndsApostropheEss(self.inverse_dict)
-        fifth_try_handler = WordIsMrOrMrs(self.inverse_dict)
-        default_handler = WordUndefined(self.inverse_dict)
-        
-        first_try_handler.successor = second_try_handler
-        second_try_handler.successor = third_try_handler
-        third_try_handler.successor = fourth_try_handler
-        fourth_try_handler.successor = fifth_try_handler
-        fifth_try_handler.successor = default_handler
-
-        chord_holder = first_try_handler.handle(word)
-        chord = chord_holder.get_canon_chord()
+        chord = self.translations.pop(word, None)
+        if chord is None:
+            self.cache_misses += 1
+            chord = self.handler.handle(word).get_canon_chord()
+            if len(self.translations) >= TRANSLATION_CACHE_SIZE:
+                self.translations.popitem(last=False)
+        else:
+            self.cache_hits += 1
+        self.translations[word] = chord
         return chord
 
+    def get_index_keys(self, word):
+
+        """Return the english words in the index that word's chord uses.
+
+        If the dictionary entries of none of them change, neither does the
+        translation of word. 
+
+        @param word: english word to translate
+        @type word: str
+
+        @rtype: list of str
+        """
+
+        keys = []
+        for handler in self.handlers:
+            keys.extend(handler.get_index_keys(word))
+        return keys
+
+    def get_dependency_hash(self, keys):
+
+        """Fingerprint the dictionary entries of the english words given.
+
+        @param keys: english words, see L{get_index_keys}
+        @type keys: list of str
+
+        @return: hex digest, which changes if any of the entries change
+        @rtype: str
+        """
+
+        digest = hashlib.sha1()
+        for key in keys:
+            entry = self.inverse_dict.get_entry(key)
+            chords = []
+            if entry is not None:
+                chords = [entry.canon_chord] + entry.chords
+            for part in (key, u' '.join(chords)):
+                if isinstance(part, unicode):
+                    part = part.encode('utf-8')
+                digest.update(part + '\0')
+        return digest.hexdigest()
+
+    def get_cache_stats(self):
+
+        """Counters for how often translate_word found a word remembered.
+
+        @return: hits, misses, hit_rate, size and max_size of the cache
+        @rtype: dict
+        """
+
+        lookups = self.cache_hits + self.cache_misses
+        hit_rate = 0.0
+        if lookups:
+            hit_rate = float(self.cache_hits)/lookups
+        return {"hits": self.cache_hits, "misses": self.cache_misses, 
+                "hit_rate": hit_rate, "size": len(self.translations), 
+                "max_size": TRANSLATION_CACHE_SIZE}
+
 
 class WordCaseHandler(object):
 
@@ -251,9 +320,10 @@ class WordCaseHandler(object):
     def __init__(self, inverse_dict):
 
         """
-        @param inverse_dict: dict of {english: chord holder with all steno 
-                             representations of english word}
-        @type inverse_dict: {str: L{ChordHolder}}
+        @param inverse_dict: dict of {english: all steno representations of 
+                             english word}
+        @type inverse_dict: {str: list of str}, such as 
+                            L{inverseindex.InverseIndex}
         """
 
         self.inverse_dict = inverse_dict
@@ -278,6 +348,18 @@ class WordCaseHandler(object):
 
         pass
 
+    def get_index_keys(self, word):
+
+        """Return the english words that handle may look up for word.
+
+        @param word: english word to translate to steno chords
+        @type word: str
+
+        @rtype: list of str
+        """
+
+        return []
+
     def basic_handle(self, word, original_word):
 
         """Convenience method for trying word in dict, or passing on.
@@ -294,7 +376,7 @@ class WordCaseHandler(object):
         """
 
         if word in self.inverse_dict:
-            return self.inverse_dict[word]
+            return ChordHolder(self.inverse_dict[word])
         return self.successor.handle(original_word)
 
 
@@ -305,6 +387,26 @@ class WordAsIs(WordCaseHandler):
     def handle(self, word):
         return self.basic_handle(word, word)
 
+    def get_index_keys(self, word):
+        return [word]
+
+
+class WordAsIsOrLowerCase(WordCaseHandler):
+
+    """Try the word as it appears in text, then in lower case, in one go.
+
+    Needs an L{inverseindex.InverseIndex}, which does both lookups.
+    """
+
+    def handle(self, word):
+        entry = self.inverse_dict.lookup(word)
+        if entry is not None:
+            return ChordHolder(entry.chords, entry.canon_chord)
+        return self.successor.handle(word)
+
+    def get_index_keys(self, word):
+        return [word, word.lower()]
+
 
 class WordLowerCase(WordCaseHandler):
 
@@ -313,6 +415,9 @@ class WordLowerCase(WordCaseHandler):
     def handle(self, word):
         return self.basic_handle(word.lower(), word)
 
+    def get_index_keys(self, word):
+        return [word.lower()]
+
 
 class WordPunctuationWithCaret(WordCaseHandler):
 
@@ -322,6 +427,9 @@ class WordPunctuationWithCaret(WordCaseHandler):
     def handle(self, word):
         return self.basic_handle('{%s^}' % word.strip('{}'), word)
 
+    def get_index_keys(self, word):
+        return ['{%s^}' % word.strip('{}')]
+
 
 class WordEndsApostropheEss(WordCaseHandler):
 
@@ -333,9 +441,9 @@ class WordEndsApostropheEss(WordCaseHandler):
     def __init__(self, inverse_dict):
 
         """
-        @param inverse_dict: dict of {english: chord holder with all steno 
-                             representations of english word}
-        @type inverse_dict: {str: L{ChordHolder}}
+        @param inverse_dict: dict of {english: all steno representations of 
+                             english word}
+        @type inverse_dict: {str: list of str}
         """
 
         WordCaseHandler.__init__(self, inverse_dict)
@@ -344,13 +452,18 @@ class WordEndsApostropheEss(WordCaseHandler):
         if word.endswith("'s"):
             bare_word = word.rstrip("'s")
             if bare_word in self.inverse_dict:
-                chord = self.inverse_dict[bare_word].\
+                chord = ChordHolder(self.inverse_dict[bare_word]).\
                         get_canon_chord()
                 if chord:
                     return ChordHolder('%s/A*ES' % chord)
         # Nope, not applicable. Move on to next handler.
         return self.successor.handle(word)
 
+    def get_index_keys(self, word):
+        if word.endswith("'s"):
+            return [word.rstrip("'s")]
+        return []
+
 
 class WordIsMrOrMrs(WordCaseHandler):
 
@@ -362,11 +475,16 @@ class WordIsMrOrMrs(WordCaseHandler):
     def handle(self, word):
         if word.find("Mr") != -1:
             if word.find("Mrs") != -1:
-                return self.inverse_dict["{Mrs.}{ }{-|}"]
-            return self.inverse_dict["Mr.{ }{-|}"]
+                return ChordHolder(self.inverse_dict["{Mrs.}{ }{-|}"])
+            return ChordHolder(self.inverse_dict["Mr.{ }{-|}"])
         # Nope, not applicable. Move on to next handler.
         return self.successor.handle(word)
 
+    def get_index_keys(self, word):
+        if word.find("Mr") != -1:
+            return ["{Mrs.}{ }{-|}", "Mr.{ }{-|}"]
+        return []
+
 
 class WordUndefined(WordCaseHandler):
 
@@ -419,7 +537,7 @@ if __name__ == "__main__":
 
     plover_control = ploverfacade.PloverControl()
     dict_filename = fileutils.get_plover_dict_path()
-    dictionary = dictionaryreader.load_dict(dict_filename)
+    dictionary = dictionaryreader.load_plover_dict(dict_filename)
 
     translator = WordToChordTranslator(dictionary)
     word = sys.argv[1]
@@ -1,11 +1,10 @@
-# Copyright (c) 2011 Pragma Nolint. 
+# Copyright (c) 2011 Pragma Nolint.
 # See LICENSE.txt for details.
 
 """Loads dictionaries that have been pickled in json."""
 
-import json
-
-ALTERNATIVE_ENCODING = 'latin-1' 
+from fly.plover import config as conf
+from fly.plover.dictionary import compiled
 
 
 def load_dict(dictionary_filename):
@@ -19,14 +18,31 @@ def load_dict(dictionary_filename):
     @rtype: dict
     """
 
-    try:
-        with open(dictionary_filename, 'r') as f:
-            dictionary = json.load(f)
+    return compiled.load_json(dictionary_filename)
+
+
+def load_plover_dict(dictionary_filename, cache_dir=None, progress=None):
+
+    """Load plover's steno dict through the compiled dictionary cache.
 
-    except UnicodeDecodeError:
-        with open(dictionary_filename, 'r') as f:
-            dictionary = json.load(f, ALTERNATIVE_ENCODING)
+    The json file is only parsed when its cache is missing or stale. Plover's
+    StenoEngine shares the same cache, so whichever loads a dict first
+    compiles it for both.
 
-    return dictionary
+    @param dictionary_filename: path to an existing json steno dict
+    @param cache_dir: directory of compiled dicts, defaults to plover's.
+    @param progress: called with bytes of the json file read so far and its
+                     size while the file is read.
 
+    @type dictionary_filename: str
+    @type cache_dir: str
+    @type progress: function of (int, int)
+
+    @return: read-only steno to english dictionary
+    @rtype: L{plover.dictionary.compiled.CompiledDictionary} (or dict if
+            the cache could not be written)
+    """
 
+    if cache_dir is None:
+        cache_dir = conf.DICTIONARY_CACHE_DIR
+    return compiled.load(dictionary_filename, cache_dir, progress)
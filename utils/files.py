@@ -13,11 +13,14 @@ def get_base_directory():
 
 
 def get_plover_dict_path():
-    """Return the file path of the plover dictionary."""
+    """Return the file path of the plover dictionary.
+
+    As in plover, the path may be absolute or relative to plover's config dir.
+    """
     config = conf.get_config()
     dictionary_filename = config.get(conf.DICTIONARY_CONFIG_SECTION,
                                      conf.DICTIONARY_FILE_OPTION)
-    return dictionary_filename
+    return os.path.join(conf.CONFIG_DIR, dictionary_filename)
 
 
 def get_lessons_directory():
@@ -28,3 +31,18 @@ def get_lessons_directory():
 def get_test_data_directory():
     """Return the file path to the directory containing test data."""
     return os.path.join(get_base_directory(), 'tests', 'data')
+
+
+def get_progress_path():
+    """Return the file path of the database of the user's progress."""
+    return os.path.join(get_base_directory(), 'data', 'progress.sqlite')
+
+
+def get_sessions_directory():
+    """Get the directory with the session files of strokes typed."""
+    return os.path.join(get_base_directory(), 'data', 'sessions')
+
+
+def get_summary_path():
+    """Return the file path of the summary of the sessions typed."""
+    return os.path.join(get_sessions_directory(), 'summary.json')